@@ -62,6 +62,48 @@ def create_app(config_name=None):
     app.register_blueprint(health_bp, url_prefix='/api')
     app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     
+    # Buffered access and analytics log writers
+    from app.models.access_log import access_log_writer
+    from app.models.analytics_log import analytics_log_writer
+    access_log_writer.init_app(app, 'ACCESS_LOG')
+    analytics_log_writer.init_app(app, 'ANALYTICS_LOG')
+    
+    # Monthly partition maintenance for the log tables
+    from app.utils.log_partitions import log_partitions
+    log_partitions.init_app(app)
+    
+    # Cold archive for log rows past the retention horizon
+    from app.utils.log_archive import log_archiver
+    log_archiver.init_app(app)
+    
+    # Analytics report cache (live ranges invalidated by analytics_log_writer flushes)
+    from app.services.analytics_cache import analytics_cache
+    analytics_cache.init_app(app)
+    
+    # Heavy historical reports on DuckDB over a Parquet snapshot (optional)
+    from app.services.analytics_columnar import analytics_columnar
+    analytics_columnar.init_app(app)
+    
+    # current_user loader backed by a process-local user cache
+    from app.services.user_cache import user_cache
+    user_cache.init_app(app, jwt)
+    
+    # Per-process journal catalog for search and facet counts
+    from app.services.journal_catalog import journal_catalog
+    journal_catalog.init_app(app)
+    
+    # Token versions: role claims are revoked by bumping the user's version
+    from app.services.token_service import token_versions
+    token_versions.init_app(app, jwt)
+    
+    # bcrypt runs in a bounded process pool, off the request workers
+    from app.services.password_hasher import password_hasher
+    password_hasher.init_app(app)
+    
+    # Thread pool for concurrent dashboard report queries
+    from app.services.report_executor import report_executor
+    report_executor.init_app(app)
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
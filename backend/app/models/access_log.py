@@ -1,8 +1,18 @@
 from datetime import datetime
 from app import db
+from app.utils.log_pipeline import BulkLogWriter
 
 class AccessLog(db.Model):
     __tablename__ = 'access_logs'
+    # Partitioned by month on timestamp in PostgreSQL (app/utils/log_partitions.py),
+    # so every index below exists per partition
+    __table_args__ = (
+        # Per-journal listing and the permanent journal delete
+        db.Index('ix_access_logs_journal_timestamp', 'journal_id', 'timestamp'),
+        db.Index('ix_access_logs_user_timestamp', 'user_id', 'timestamp'),
+        # Newest-first listing and its keyset cursor (app/utils/pagination.py)
+        db.Index('ix_access_logs_timestamp_id', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
@@ -27,7 +37,7 @@ class AccessLog(db.Model):
     request_id = db.Column(db.String(100))  # Unique request identifier
     
     # Timestamps
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __init__(self, journal_id, ip_address, **kwargs):
         self.journal_id = journal_id
@@ -40,31 +50,32 @@ class AccessLog(db.Model):
     
     @classmethod
     def log_access(cls, user_id, journal_id, ip_address, request_data=None, response_data=None):
-        """Create a new access log entry"""
-        log_entry = cls(
-            user_id=user_id,
-            journal_id=journal_id,
-            ip_address=ip_address
-        )
+        """Queue a new access log entry for the background writer"""
+        request_data = request_data or {}
+        response_data = response_data or {}
         
-        if request_data:
-            log_entry.user_agent = request_data.get('user_agent')
-            log_entry.referer = request_data.get('referer')
-            log_entry.request_method = request_data.get('method', 'GET')
-            log_entry.request_path = request_data.get('path')
-            log_entry.request_query = request_data.get('query_string')
-            log_entry.session_id = request_data.get('session_id')
-            log_entry.request_id = request_data.get('request_id')
-        
-        if response_data:
-            log_entry.response_status = response_data.get('status_code')
-            log_entry.response_size = response_data.get('content_length')
-            log_entry.response_time = response_data.get('response_time')
-        
-        db.session.add(log_entry)
-        db.session.commit()
+        # Every row carries the same keys so a batch is one multi-row INSERT
+        row = {
+            'user_id': user_id,
+            'journal_id': journal_id,
+            'proxy_config_id': None,
+            'ip_address': ip_address,
+            'user_agent': request_data.get('user_agent'),
+            'referer': request_data.get('referer'),
+            'request_method': request_data.get('method', 'GET'),
+            'request_path': request_data.get('path'),
+            'request_query': request_data.get('query_string'),
+            'session_id': request_data.get('session_id'),
+            'request_id': request_data.get('request_id'),
+            'response_status': response_data.get('status_code'),
+            'response_size': response_data.get('content_length'),
+            'response_time': response_data.get('response_time'),
+            'timestamp': datetime.utcnow()
+        }
         
-        return log_entry
+        if not access_log_writer.enqueue(row):
+            return None
+        return row
     
     def to_dict(self):
         """Convert access log to dictionary"""
@@ -89,3 +100,7 @@ class AccessLog(db.Model):
     
     def __repr__(self):
         return f'<AccessLog {self.id} - {self.journal_id}>'
+
+
+# Buffered writer behind AccessLog.log_access, configured by create_app
+access_log_writer = BulkLogWriter('access_logs', AccessLog.__table__)
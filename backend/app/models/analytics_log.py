@@ -1,10 +1,36 @@
 from datetime import datetime
 from app import db
+from app.utils.log_pipeline import BulkLogWriter
 import json
 
 class AnalyticsLog(db.Model):
     """OpenAthens benzeri kapsamlı analitik log modeli"""
     __tablename__ = 'analytics_logs'
+    # PostgreSQL'de access_timestamp üzerinden aylık bölümlenmiştir
+    # (app/utils/log_partitions.py); indeksler her bölümde ayrıca bulunur
+    __table_args__ = (
+        # Zaman aralığı sorguları ve kaynak raporu; (access_timestamp) tek
+        # kolon indeksinin yerini alır
+        db.Index('ix_analytics_logs_timestamp_resource', 'access_timestamp', 'resource_name'),
+        # Eşitlik filtresi + zaman aralığı (filtered_query, log listesi)
+        db.Index('ix_analytics_logs_user_timestamp', 'user_id', 'access_timestamp',
+                 postgresql_where=db.text('user_id IS NOT NULL'),
+                 sqlite_where=db.text('user_id IS NOT NULL')),
+        db.Index('ix_analytics_logs_department_timestamp', 'department', 'access_timestamp'),
+        db.Index('ix_analytics_logs_account_type_timestamp', 'account_type', 'access_timestamp'),
+        # Seyrek satırlar için kısmi indeksler (başarısız erişim ve turn-away raporları)
+        db.Index('ix_analytics_logs_failed_timestamp', 'access_timestamp',
+                 postgresql_where=db.text('NOT auth_success'),
+                 sqlite_where=db.text('NOT auth_success')),
+        db.Index('ix_analytics_logs_denied_timestamp', 'access_timestamp',
+                 postgresql_where=db.text('access_denied'),
+                 sqlite_where=db.text('access_denied')),
+        # Geniş aralık taramaları için küçük BRIN indeksi (satırlar zaman sırasıyla eklenir)
+        db.Index('ix_analytics_logs_access_timestamp_brin', 'access_timestamp',
+                 postgresql_using='brin'),
+        # Log listesinin (timestamp, id) keyset sayfalaması
+        db.Index('ix_analytics_logs_timestamp_id', 'access_timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -40,7 +66,7 @@ class AnalyticsLog(db.Model):
     auth_method = db.Column(db.String(50))  # password, sso, oauth
     
     # Erişim Detayları
-    access_timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    access_timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     access_duration = db.Column(db.Integer)  # Erişim süresi (saniye)
     page_views = db.Column(db.Integer, default=1)  # Sayfa görüntüleme sayısı
     downloads = db.Column(db.Integer, default=0)  # İndirme sayısı
@@ -77,42 +103,42 @@ class AnalyticsLog(db.Model):
     
     @classmethod
     def log_resource_access(cls, user_id, resource_name, ip_address, **kwargs):
-        """Kaynak erişim logu oluştur"""
-        log_entry = cls(
-            user_id=user_id,
-            resource_name=resource_name,
-            ip_address=ip_address,
-            access_timestamp=datetime.utcnow()
-        )
-        
-        # Ek parametreleri ayarla
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
-        
-        db.session.add(log_entry)
-        db.session.commit()
+        """Kaynak erişim logunu toplu yazıcıya kuyrukla"""
+        row = {
+            'user_id': user_id,
+            'resource_name': resource_name,
+            'ip_address': ip_address,
+            'access_timestamp': datetime.utcnow()
+        }
+        row.update(cls._prepare_kwargs(kwargs))
         
-        return log_entry
+        if not analytics_log_writer.enqueue(row):
+            return None
+        return row
     
     @classmethod
     def log_auth_attempt(cls, user_id, ip_address, success=True, **kwargs):
-        """Kimlik doğrulama denemesi logu"""
-        log_entry = cls(
-            user_id=user_id,
-            ip_address=ip_address,
-            auth_success=success,
-            access_timestamp=datetime.utcnow()
-        )
-        
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
-        
-        db.session.add(log_entry)
-        db.session.commit()
+        """Kimlik doğrulama denemesi logunu toplu yazıcıya kuyrukla"""
+        row = {
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'auth_success': success,
+            # resource_name zorunlu bir kolon; giriş denemelerinde kaynak yok
+            'resource_name': kwargs.pop('resource_name', 'authentication'),
+            'access_timestamp': datetime.utcnow()
+        }
+        row.update(cls._prepare_kwargs(kwargs))
         
-        return log_entry
+        if not analytics_log_writer.enqueue(row):
+            return None
+        return row
+    
+    @staticmethod
+    def _prepare_kwargs(kwargs):
+        """Ek parametreleri kolon değerlerine çevir (custom_attributes JSON olarak saklanır)"""
+        if isinstance(kwargs.get('custom_attributes'), dict):
+            kwargs['custom_attributes'] = json.dumps(kwargs['custom_attributes'])
+        return kwargs
     
     def set_custom_attributes(self, attributes):
         """Özel öznitelikleri ayarla"""
@@ -180,3 +206,7 @@ class AnalyticsLog(db.Model):
     
     def __repr__(self):
         return f'<AnalyticsLog {self.id} - {self.resource_name}>'
+
+
+# Toplu analitik log yazıcısı (PostgreSQL'de COPY), create_app tarafından yapılandırılır
+analytics_log_writer = BulkLogWriter('analytics_logs', AnalyticsLog.__table__)
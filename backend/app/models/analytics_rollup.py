@@ -0,0 +1,61 @@
+from datetime import datetime
+from app import db
+
+# Gruplama boyutları ve toplanabilir ölçüler (rollup tablolarının kolonları)
+ROLLUP_DIMENSIONS = ('resource_name', 'department', 'account_type', 'country', 'auth_success', 'access_denied')
+ROLLUP_MEASURES = ('event_count', 'page_views', 'downloads', 'searches')
+
+
+class AnalyticsRollupMixin:
+    """Saatlik/günlük analitik özet tablolarının ortak kolonları.
+
+    NULL metin boyutları '' olarak, NULL auth_success True, NULL access_denied
+    False olarak saklanır; böylece unique constraint upsert için çalışır.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.DateTime, nullable=False, index=True)  # Saat/gün başlangıcı
+
+    # Boyutlar
+    resource_name = db.Column(db.String(500), nullable=False, default='')
+    department = db.Column(db.String(255), nullable=False, default='')
+    account_type = db.Column(db.String(50), nullable=False, default='')
+    country = db.Column(db.String(100), nullable=False, default='')
+    auth_success = db.Column(db.Boolean, nullable=False, default=True)
+    access_denied = db.Column(db.Boolean, nullable=False, default=False)
+
+    # Ölçüler
+    event_count = db.Column(db.Integer, nullable=False, default=0)  # Ham log satırı sayısı
+    page_views = db.Column(db.Integer, nullable=False, default=0)
+    downloads = db.Column(db.Integer, nullable=False, default=0)
+    searches = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AnalyticsRollupHourly(AnalyticsRollupMixin, db.Model):
+    """Saatlik analitik özet"""
+    __tablename__ = 'analytics_rollup_hourly'
+    __table_args__ = (
+        db.UniqueConstraint('bucket', *ROLLUP_DIMENSIONS, name='uq_analytics_rollup_hourly_key'),
+    )
+
+
+class AnalyticsRollupDaily(AnalyticsRollupMixin, db.Model):
+    """Günlük analitik özet"""
+    __tablename__ = 'analytics_rollup_daily'
+    __table_args__ = (
+        db.UniqueConstraint('bucket', *ROLLUP_DIMENSIONS, name='uq_analytics_rollup_daily_key'),
+    )
+
+
+class AnalyticsRollupState(db.Model):
+    """Özet tablolarının hangi ham log satırına kadar güncel olduğu (high-water mark)"""
+    __tablename__ = 'analytics_rollup_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)  # Özetlenen son analytics_logs.id
+    seen_max_id = db.Column(db.Integer, nullable=False, default=0)  # Önceki çalışmada görülen en büyük id
+    covered_until = db.Column(db.DateTime)  # Bu andan önceki saatler özetlerden okunabilir
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AnalyticsRollupState {self.name} - {self.last_id}>'
@@ -1,4 +1,6 @@
 from datetime import datetime
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import JSONB
 from app import db
 
 class Journal(db.Model):
@@ -25,7 +27,7 @@ class Journal(db.Model):
     publisher = db.Column(db.String(200))
     issn = db.Column(db.String(20))
     e_issn = db.Column(db.String(20))
-    subject_areas = db.Column(db.JSON)  # List of subject areas
+    subject_areas = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))  # List of subject areas
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -83,3 +85,51 @@ class Journal(db.Model):
     
     def __repr__(self):
         return f'<Journal {self.name}>'
+
+
+# Search indexes (full-text, trigram and subject areas), queried by
+# app/services/journal_search.py. Migrations create these on existing
+# databases; the hooks below cover tables made by db.create_all(), such as
+# the SQLite test database.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(publisher, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"ALTER TABLE journals ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_journals_search_vector ON journals USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_journals_name_trgm ON journals USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_journals_publisher_trgm ON journals USING gin (publisher gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_journals_subject_areas ON journals USING gin (subject_areas)",
+]
+
+# External-content FTS5 index kept in sync with journals by triggers
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS journals_fts USING fts5("
+    "name, description, publisher, content='journals', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS journals_fts_ai AFTER INSERT ON journals BEGIN "
+    "INSERT INTO journals_fts(rowid, name, description, publisher) "
+    "VALUES (new.id, new.name, new.description, new.publisher); END",
+    "CREATE TRIGGER IF NOT EXISTS journals_fts_ad AFTER DELETE ON journals BEGIN "
+    "INSERT INTO journals_fts(journals_fts, rowid, name, description, publisher) "
+    "VALUES ('delete', old.id, old.name, old.description, old.publisher); END",
+    "CREATE TRIGGER IF NOT EXISTS journals_fts_au AFTER UPDATE ON journals BEGIN "
+    "INSERT INTO journals_fts(journals_fts, rowid, name, description, publisher) "
+    "VALUES ('delete', old.id, old.name, old.description, old.publisher); "
+    "INSERT INTO journals_fts(rowid, name, description, publisher) "
+    "VALUES (new.id, new.name, new.description, new.publisher); END",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Journal.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Journal.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(
+    Journal.__table__, 'after_drop',
+    DDL("DROP TABLE IF EXISTS journals_fts").execute_if(dialect='sqlite')
+)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from app import db, bcrypt
+from app import db
 from flask_jwt_extended import create_access_token, create_refresh_token
 
 class User(db.Model):
@@ -14,6 +14,8 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
     last_login = db.Column(db.DateTime)
+    # Bumped to revoke every JWT issued so far (app/services/token_service.py)
+    token_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -28,19 +30,24 @@ class User(db.Model):
         self.last_name = last_name
         self.is_admin = is_admin
         self.is_active = is_active
+        self.token_version = 0
     
     def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        """Hash and set password (in the hashing pool; may raise PasswordHashingBusy)"""
+        from app.services.password_hasher import password_hasher
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Check if provided password matches hash"""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        """Check if provided password matches hash (may raise PasswordHashingBusy)"""
+        from app.services.password_hasher import password_hasher
+        return password_hasher.check(password, self.password_hash)
     
     def generate_tokens(self):
-        """Generate JWT access and refresh tokens"""
-        access_token = create_access_token(identity=str(self.id))
-        refresh_token = create_refresh_token(identity=str(self.id))
+        """Generate JWT access and refresh tokens (with role/active/version claims)"""
+        from app.services.token_service import token_versions
+        claims = token_versions.claims(self)
+        access_token = create_access_token(identity=str(self.id), additional_claims=claims)
+        refresh_token = create_refresh_token(identity=str(self.id), additional_claims=claims)
         return {
             'access_token': access_token,
             'refresh_token': refresh_token
@@ -50,6 +57,8 @@ class User(db.Model):
         """Update last login timestamp"""
         self.last_login = datetime.utcnow()
         db.session.commit()
+        # No user cache invalidation: a cached copy with the previous
+        # last_login is harmless and expires within USER_CACHE_TTL
     
     def to_dict(self):
         """Convert user to dictionary"""
@@ -1,12 +1,20 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from app import db, limiter
 from app.models.user import User
 from app.models.journal import Journal
 from app.models.proxy_config import ProxyConfig
 from app.models.access_log import AccessLog
 from app.services.journal_service import JournalService
+from app.services.journal_search import apply_text_search, subject_filter
 from app.services.proxy_service import ProxyService
+from app.services.config_apply_queue import config_apply_queue
+from app.services.user_cache import user_cache
+from app.services.token_service import token_versions
+from app.services.password_hasher import PasswordHashingBusy
+from app.utils.identity_cache import with_identities
+from app.utils.pagination import keyset_page, estimated_count
+from app.utils.log_archive import log_archiver
 from app.utils.validators import validate_journal_slug, validate_url, sanitize_string, validate_password
 
 admin_bp = Blueprint('admin', __name__)
@@ -16,10 +24,8 @@ proxy_service = ProxyService()
 def admin_required(f):
     """Decorator to require admin access"""
     def decorated_function(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or not user.is_admin:
+        # current_user comes from the JWT user loader (process-local cache)
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         return f(*args, **kwargs)
@@ -105,6 +111,9 @@ def get_users():
                 'user': user.to_dict()
             }), 201
             
+        except PasswordHashingBusy as e:
+            db.session.rollback()
+            return jsonify({'error': 'Server is busy, please try again', 'details': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': 'Failed to create user', 'details': str(e)}), 500
@@ -127,11 +136,16 @@ def update_user(user_id):
         
         # Update allowed fields
         allowed_fields = ['first_name', 'last_name', 'email', 'is_active', 'is_admin']
+        claims_before = (user.is_active, user.is_admin)
         for field, value in data.items():
             if field in allowed_fields and hasattr(user, field):
                 setattr(user, field, value)
         
         db.session.commit()
+        user_cache.invalidate(user.id)
+        # Issued tokens carry the old is_active/is_admin claims
+        if (user.is_active, user.is_admin) != claims_before:
+            token_versions.revoke(user.id)
         
         return jsonify({
             'message': 'User updated successfully',
@@ -160,14 +174,10 @@ def get_journals():
         
         # Apply filters
         if search:
-            query = query.filter(
-                Journal.name.ilike(f'%{search}%') |
-                Journal.description.ilike(f'%{search}%') |
-                Journal.publisher.ilike(f'%{search}%')
-            )
+            query = apply_text_search(query, search)
         
         if subject_area:
-            query = query.filter(Journal.subject_areas.contains([subject_area]))
+            query = query.filter(subject_filter([subject_area]))
         
         if access_level:
             query = query.filter(Journal.access_level == access_level)
@@ -260,6 +270,7 @@ def create_journal():
             'message': 'Journal created successfully and proxy configuration applied',
             'journal': journal.to_dict(),
             'proxy_url': proxy_url,
+            'proxy_generation': config_apply_queue.pending_generation,
             'access_info': {
                 'immediate_access': True,
                 'description': 'Journal is now accessible via proxy URL without additional configuration'
@@ -317,7 +328,8 @@ def update_journal(journal_id):
         
         return jsonify({
             'message': 'Journal updated successfully',
-            'journal': updated_journal.to_dict()
+            'journal': updated_journal.to_dict(),
+            'proxy_generation': config_apply_queue.pending_generation
         }), 200
         
     except Exception as e:
@@ -349,7 +361,8 @@ def delete_journal(journal_id):
         
         return jsonify({
             'message': message,
-            'permanent': permanent
+            'permanent': permanent,
+            'proxy_generation': config_apply_queue.pending_generation
         }), 200
         
     except Exception as e:
@@ -383,7 +396,8 @@ def bulk_delete_journals():
             'message': message,
             'deleted_count': result['deleted_count'],
             'total_requested': result['total_requested'],
-            'permanent': permanent
+            'permanent': permanent,
+            'proxy_generation': result['proxy_generation']
         }
         
         if result['errors']:
@@ -433,8 +447,12 @@ def get_admin_stats():
         total_configs = ProxyConfig.query.count()
         active_configs = ProxyConfig.query.filter_by(is_active=True).count()
         
-        # Access log statistics
-        total_access_logs = AccessLog.query.count()
+        # Access log statistics: the planner estimate instead of a full
+        # COUNT(*) on PostgreSQL, plus the rows moved to the cold archive
+        total_access_logs = estimated_count(AccessLog.query)
+        if total_access_logs is None:
+            total_access_logs = AccessLog.query.count()
+        archived_access_logs = log_archiver.stats()['access_logs']['rows']
         
         # Recent activity
         recent_logs = AccessLog.query.order_by(AccessLog.timestamp.desc()).limit(10).all()
@@ -454,9 +472,10 @@ def get_admin_stats():
                 'active': active_configs
             },
             'access_logs': {
-                'total': total_access_logs
+                'total': total_access_logs,
+                'archived': archived_access_logs
             },
-            'recent_activity': [log.to_dict() for log in recent_logs]
+            'recent_activity': with_identities(recent_logs)
         }), 200
         
     except Exception as e:
@@ -526,49 +545,45 @@ def get_access_logs():
             )
             query = query.filter(search_filter)
         
-        # Order by timestamp (newest first)
-        query = query.order_by(AccessLog.timestamp.desc())
-        
-        # Paginate
-        logs = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        # Get additional info for response
-        logs_with_details = []
-        for log in logs.items:
-            log_dict = log.to_dict()
-            
-            # Add user info if available
-            if log.user_id:
-                user = User.query.get(log.user_id)
-                if user:
-                    log_dict['user'] = {
-                        'id': user.id,
-                        'username': user.username,
-                        'email': user.email
-                    }
+        # Keyset mode (cursor=... or pagination=keyset): seek by (timestamp, id)
+        # instead of COUNT(*) + OFFSET; page/per_page stays for compatibility
+        cursor = request.args.get('cursor')
+        if cursor is not None or request.args.get('pagination') == 'keyset':
+            try:
+                items, next_cursor = keyset_page(query, AccessLog.timestamp, AccessLog.id, cursor, per_page)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
-            # Add journal info if available
-            if log.journal_id:
-                journal = Journal.query.get(log.journal_id)
-                if journal:
-                    log_dict['journal'] = {
-                        'id': journal.id,
-                        'name': journal.name,
-                        'slug': journal.slug
-                    }
+            pagination = {
+                'per_page': per_page,
+                'cursor': cursor,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+            if request.args.get('estimate', 'false').lower() == 'true':
+                pagination['estimated_total'] = estimated_count(query)
+        else:
+            # Order by timestamp (newest first)
+            query = query.order_by(AccessLog.timestamp.desc())
             
-            logs_with_details.append(log_dict)
-        
-        return jsonify({
-            'logs': logs_with_details,
-            'pagination': {
+            # Paginate
+            logs = query.paginate(page=page, per_page=per_page, error_out=False)
+            items = logs.items
+            pagination = {
                 'page': logs.page,
                 'pages': logs.pages,
                 'per_page': logs.per_page,
                 'total': logs.total,
                 'has_next': logs.has_next,
                 'has_prev': logs.has_prev
-            },
+            }
+        
+        # User and journal summaries for the whole page, one IN query each
+        logs_with_details = with_identities(items)
+        
+        return jsonify({
+            'logs': logs_with_details,
+            'pagination': pagination,
             'filters': {
                 'user_id': user_id,
                 'journal_id': journal_id,
@@ -590,9 +605,7 @@ def update_user_password(user_id):
     """Update user password (admin only)"""
     try:
         # Check if current user is admin
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         data = request.get_json()
@@ -613,14 +626,18 @@ def update_user_password(user_id):
         if not target_user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Update password
+        # Update password and sign the user out everywhere
         target_user.set_password(new_password)
         db.session.commit()
+        token_versions.revoke(target_user.id)
         
         return jsonify({
             'message': 'Password updated successfully'
         }), 200
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, please try again', 'details': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update password', 'details': str(e)}), 500
@@ -1,23 +1,66 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from datetime import datetime, timedelta
+from sqlalchemy import desc
 from app import db
-from app.models.user import User
 from app.models.analytics_log import AnalyticsLog
+from app.models.access_log import AccessLog
 from app.services.analytics_service import AnalyticsService
+from app.services.report_executor import report_executor
+from app.utils.log_export import stream_export, ExportError
+from app.utils.log_archive import log_archiver
+from app.utils.pagination import keyset_page, estimated_count
+from app.utils.identity_cache import with_identities
 
 analytics_bp = Blueprint('analytics', __name__)
 analytics_service = AnalyticsService()
 
+def stream_log_export(source, export_format, start_date=None, end_date=None, user_id=None,
+                      resource_name=None, journal_id=None):
+    """Ham log satırlarını (analytics_logs ya da access_logs) akış olarak export et"""
+    if source == 'access':
+        model, timestamp = AccessLog, AccessLog.timestamp
+    else:
+        model, timestamp = AnalyticsLog, AnalyticsLog.access_timestamp
+    
+    conditions = []
+    if start_date:
+        conditions.append(timestamp >= start_date)
+    if end_date:
+        conditions.append(timestamp <= end_date)
+    if user_id:
+        conditions.append(model.user_id == user_id)
+    if resource_name and model is AnalyticsLog:
+        conditions.append(AnalyticsLog.resource_name.ilike(f'%{resource_name}%'))
+    if journal_id and model is AccessLog:
+        conditions.append(AccessLog.journal_id == journal_id)
+    
+    # cursor: kesilen bir export'u son alınan id'den devam ettirir
+    after_id = request.args.get('cursor', type=int)
+    chunk_size = min(request.args.get('chunk_size', 5000, type=int), 50000)
+    
+    # Arşive taşınmış (soğuk) satırlar aynı filtrelerle önce gelir
+    archived = log_archiver.iter_archived(
+        model.__tablename__, start_date, end_date,
+        equals={'user_id': user_id, 'journal_id': journal_id if model is AccessLog else None},
+        contains={'resource_name': resource_name if model is AnalyticsLog else None},
+        after_id=after_id, chunk_size=chunk_size
+    )
+    return stream_export(
+        model.__table__, export_format, conditions,
+        after_id=after_id,
+        gzip=request.args.get('gzip', 'false').lower() == 'true',
+        chunk_size=chunk_size,
+        archived_chunks=archived
+    )
+
 @analytics_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_dashboard_stats():
     """Ana dashboard istatistikleri"""
     try:
         # Admin kontrolü
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         # Tarih filtreleri
@@ -29,34 +72,33 @@ def get_dashboard_stats():
         if end_date:
             end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         
+        # exact=true: HyperLogLog tahminleri yerine kesin tekil sayımlar
+        exact = request.args.get('exact', 'false').lower() == 'true'
+        
         # Son 30 gün varsayılan
         if not start_date:
             start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
             end_date = datetime.utcnow()
         
-        # Genel istatistikler
-        stats = analytics_service.get_usage_statistics(start_date, end_date)
-        
-        # En çok kullanılan kaynaklar (top 10)
-        top_resources = analytics_service.get_resource_usage_report(start_date, end_date, 10)
-        
-        # En aktif kullanıcılar (top 10)
-        top_users = analytics_service.get_user_activity_report(start_date, end_date, 10)
-        
-        # Saatlik kullanım paterni
-        hourly_pattern = analytics_service.get_hourly_usage_pattern(start_date, end_date)
-        
-        # Günlük trend (son 30 gün)
-        daily_trend = analytics_service.get_daily_usage_trend(30)
-        
-        return jsonify({
-            'general_stats': stats,
-            'top_resources': top_resources,
-            'top_users': top_users,
-            'hourly_pattern': hourly_pattern,
-            'daily_trend': daily_trend
-        }), 200
+        # Raporlar birbirinden bağımsız: ayrı bağlantılarda paralel çalıştır
+        results, degraded = report_executor.run({
+            # Genel istatistikler
+            'general_stats': (analytics_service.get_usage_statistics, (start_date, end_date), {'exact': exact}),
+            # En çok kullanılan kaynaklar (top 10)
+            'top_resources': (analytics_service.get_resource_usage_report, (start_date, end_date, 10), {}),
+            # En aktif kullanıcılar (top 10)
+            'top_users': (analytics_service.get_user_activity_report, (start_date, end_date, 10), {}),
+            # Saatlik kullanım paterni
+            'hourly_pattern': (analytics_service.get_hourly_usage_pattern, (start_date, end_date), {'exact': exact}),
+            # Günlük trend (son 30 gün)
+            'daily_trend': (analytics_service.get_daily_usage_trend, (30,), {'exact': exact})
+        })
+        
+        # Süresi dolan ya da hata veren raporlar None döner
+        results['degraded'] = bool(degraded)
+        results['degraded_reports'] = degraded
+        return jsonify(results), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get dashboard stats', 'details': str(e)}), 500
@@ -66,9 +108,7 @@ def get_dashboard_stats():
 def get_resource_report():
     """Kaynak kullanım raporu"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         start_date = request.args.get('start_date')
@@ -95,9 +135,7 @@ def get_resource_report():
 def get_user_report():
     """Kullanıcı aktivite raporu"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         start_date = request.args.get('start_date')
@@ -124,9 +162,7 @@ def get_user_report():
 def get_department_report():
     """Departman kullanım raporu"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         start_date = request.args.get('start_date')
@@ -152,9 +188,7 @@ def get_department_report():
 def get_geographic_report():
     """Coğrafi kullanım raporu"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         start_date = request.args.get('start_date')
@@ -165,7 +199,9 @@ def get_geographic_report():
         if end_date:
             end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         
-        geographic = analytics_service.get_geographic_usage_report(start_date, end_date)
+        exact = request.args.get('exact', 'false').lower() == 'true'
+        
+        geographic = analytics_service.get_geographic_usage_report(start_date, end_date, exact=exact)
         
         return jsonify({
             'geographic': geographic,
@@ -180,9 +216,7 @@ def get_geographic_report():
 def get_failure_analysis():
     """Başarısız erişim analizi"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         start_date = request.args.get('start_date')
@@ -208,9 +242,7 @@ def get_failure_analysis():
 def get_turn_away_analysis():
     """Erişim reddi analizi (Turn-away analysis)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         start_date = request.args.get('start_date')
@@ -236,9 +268,7 @@ def get_turn_away_analysis():
 def get_breakdown_report():
     """Özelleştirilebilir kırılım raporu"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         breakdown_field = request.args.get('field')
@@ -253,8 +283,10 @@ def get_breakdown_report():
         if end_date:
             end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         
+        exact = request.args.get('exact', 'false').lower() == 'true'
+        
         breakdown = analytics_service.get_custom_breakdown_report(
-            breakdown_field, start_date, end_date
+            breakdown_field, start_date, end_date, exact=exact
         )
         
         return jsonify({
@@ -271,17 +303,23 @@ def get_breakdown_report():
 def get_analytics_logs():
     """Detaylı analitik logları"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-        user_id = request.args.get('user_id')
+        user_id = request.args.get('user_id', type=int)
         resource_name = request.args.get('resource_name')
+        export_format = request.args.get('format')
+        
+        if export_format:
+            if start_date:
+                start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+            if end_date:
+                end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            return stream_log_export('analytics', export_format, start_date, end_date, user_id, resource_name)
         
         query = AnalyticsLog.query
         
@@ -296,12 +334,37 @@ def get_analytics_logs():
         if resource_name:
             query = query.filter(AnalyticsLog.resource_name.ilike(f'%{resource_name}%'))
         
+        # Cursor modu (cursor=... ya da pagination=keyset): COUNT(*) + OFFSET
+        # yerine (access_timestamp, id) üzerinden arama; page/per_page korunur
+        cursor = request.args.get('cursor')
+        if cursor is not None or request.args.get('pagination') == 'keyset':
+            try:
+                items, next_cursor = keyset_page(
+                    query, AnalyticsLog.access_timestamp, AnalyticsLog.id, cursor, per_page
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            pagination = {
+                'per_page': per_page,
+                'cursor': cursor,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+            if request.args.get('estimate', 'false').lower() == 'true':
+                pagination['estimated_total'] = estimated_count(query)
+            
+            return jsonify({
+                'logs': with_identities(items),
+                'pagination': pagination
+            }), 200
+        
         logs = query.order_by(desc(AnalyticsLog.access_timestamp)).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         return jsonify({
-            'logs': [log.to_dict() for log in logs.items],
+            'logs': with_identities(logs.items),
             'pagination': {
                 'page': logs.page,
                 'pages': logs.pages,
@@ -312,17 +375,17 @@ def get_analytics_logs():
             }
         }), 200
         
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get analytics logs', 'details': str(e)}), 500
 
 @analytics_bp.route('/export', methods=['GET'])
 @jwt_required()
 def export_analytics_data():
-    """Analitik verileri CSV formatında export"""
+    """Analitik verileri export: rapor JSON'u ya da ham loglar (CSV/NDJSON/Parquet akışı)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
         report_type = request.args.get('type', 'usage')
@@ -334,16 +397,26 @@ def export_analytics_data():
         if end_date:
             end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         
-        # Bu endpoint CSV export için hazırlanabilir
-        # Şimdilik JSON formatında döndürüyoruz
+        exact = request.args.get('exact', 'false').lower() == 'true'
+        
+        # format=csv|ndjson|parquet: ham log satırları akış olarak (source=analytics|access)
+        export_format = request.args.get('format', 'json')
+        if export_format != 'json':
+            return stream_log_export(
+                request.args.get('source', 'analytics'), export_format, start_date, end_date,
+                user_id=request.args.get('user_id', type=int),
+                resource_name=request.args.get('resource_name'),
+                journal_id=request.args.get('journal_id', type=int)
+            )
+        
         if report_type == 'usage':
-            data = analytics_service.get_usage_statistics(start_date, end_date)
+            data = analytics_service.get_usage_statistics(start_date, end_date, exact=exact)
         elif report_type == 'resources':
             data = analytics_service.get_resource_usage_report(start_date, end_date)
         elif report_type == 'users':
             data = analytics_service.get_user_activity_report(start_date, end_date)
         else:
-            data = analytics_service.get_usage_statistics(start_date, end_date)
+            data = analytics_service.get_usage_statistics(start_date, end_date, exact=exact)
         
         return jsonify({
             'data': data,
@@ -351,5 +424,7 @@ def export_analytics_data():
             'exported_at': datetime.utcnow().isoformat()
         }), 200
         
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to export analytics data', 'details': str(e)}), 500
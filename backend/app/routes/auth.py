@@ -4,11 +4,15 @@ from flask_jwt_extended import (
     create_refresh_token, 
     jwt_required, 
     get_jwt_identity,
-    get_jwt
+    get_jwt,
+    current_user
 )
 from app import db, limiter
 from app.models.user import User
 from app.services.auth_service import AuthService
+from app.services.password_hasher import PasswordHashingBusy
+from app.services.user_cache import user_cache
+from app.services.token_service import token_versions
 from app.utils.validators import validate_email, validate_password
 
 auth_bp = Blueprint('auth', __name__)
@@ -51,6 +55,8 @@ def login():
             **tokens
         }), 200
         
+    except PasswordHashingBusy as e:
+        return jsonify({'error': 'Server is busy, please try again', 'details': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': 'Login failed', 'details': str(e)}), 500
 
@@ -107,6 +113,9 @@ def register():
             **tokens
         }), 201
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, please try again', 'details': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed', 'details': str(e)}), 500
@@ -116,14 +125,8 @@ def register():
 def get_profile():
     """Get current user profile"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         return jsonify({
-            'user': user.to_dict()
+            'user': current_user.to_dict()
         }), 200
         
     except Exception as e:
@@ -160,6 +163,7 @@ def update_profile():
                 return jsonify({'error': 'Email already exists'}), 409
         
         db.session.commit()
+        user_cache.invalidate(user.id)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -201,14 +205,19 @@ def change_password():
         if not password_validation['valid']:
             return jsonify({'error': password_validation['message']}), 400
         
-        # Update password
+        # Update password; tokens issued with the old one stop working
         user.set_password(new_password)
         db.session.commit()
+        token_versions.revoke(user.id)
         
         return jsonify({
-            'message': 'Password changed successfully'
+            'message': 'Password changed successfully',
+            **user.generate_tokens()
         }), 200
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, please try again', 'details': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to change password', 'details': str(e)}), 500
@@ -218,8 +227,10 @@ def change_password():
 def logout():
     """User logout endpoint"""
     try:
-        # In a production environment, you might want to blacklist the token
-        # For now, we'll just return a success message
+        # Bump the user's token version: every access and refresh token
+        # issued so far fails the blocklist check from now on
+        token_versions.revoke(current_user.id)
+        
         return jsonify({
             'message': 'Logout successful'
         }), 200
@@ -233,13 +244,16 @@ def refresh():
     """Refresh access token"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
         
+        # Claims come from the database, not the (possibly cached) token user,
+        # so a deactivated or demoted user cannot refresh the old claims
+        user = User.query.get(user_id)
         if not user or not user.is_active:
             return jsonify({'error': 'User not found or inactive'}), 401
         
-        # Generate new access token
-        access_token = create_access_token(identity=user_id)
+        access_token = create_access_token(
+            identity=user_id, additional_claims=token_versions.claims(user)
+        )
         
         return jsonify({
             'access_token': access_token
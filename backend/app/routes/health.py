@@ -1,4 +1,6 @@
-from flask import Blueprint, jsonify
+import hmac
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import verify_jwt_in_request, current_user
 from datetime import datetime
 from app import db
 
@@ -39,3 +41,41 @@ def readiness_check():
             'error': str(e),
             'timestamp': datetime.utcnow().isoformat()
         }), 503
+
+def metrics_authorized():
+    """Scrapers send METRICS_TOKEN as a bearer token; otherwise an admin JWT is required"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        return False
+    return bool(current_user and current_user.is_admin)
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Internal pipeline counters (queue depth, flush latency, drops, cache hits)"""
+    if not metrics_authorized():
+        return jsonify({'error': 'Admin access or metrics token required'}), 401
+    
+    from app.models.access_log import access_log_writer
+    from app.models.analytics_log import analytics_log_writer
+    from app.services.analytics_cache import analytics_cache
+    from app.services.user_cache import user_cache
+    from app.services.password_hasher import password_hasher
+    from app.services.journal_catalog import journal_catalog
+    from app.utils.log_archive import log_archiver
+    from app.services.analytics_columnar import analytics_columnar
+    
+    return jsonify({
+        'timestamp': datetime.utcnow().isoformat(),
+        'access_log_writer': access_log_writer.stats(),
+        'analytics_log_writer': analytics_log_writer.stats(),
+        'analytics_cache': analytics_cache.stats(),
+        'user_cache': user_cache.stats(),
+        'password_hasher': password_hasher.stats(),
+        'journal_catalog': journal_catalog.stats(),
+        'log_archive': log_archiver.stats(),
+        'analytics_columnar': analytics_columnar.stats()
+    }), 200
@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from app import db, limiter
 from app.models.journal import Journal
-from app.models.user import User
 from app.services.journal_service import JournalService
+from app.services.journal_search import apply_text_search, subject_filter, subject_counts, SUBJECT_MATCH_MODES
+from app.services.journal_catalog import journal_catalog
 from app.utils.validators import validate_journal_slug, validate_url, sanitize_string
 
 journals_bp = Blueprint('journals', __name__)
@@ -14,12 +15,6 @@ journal_service = JournalService()
 def get_journals():
     """Get list of available journals"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
@@ -32,14 +27,10 @@ def get_journals():
         
         # Apply filters
         if search:
-            query = query.filter(
-                Journal.name.ilike(f'%{search}%') |
-                Journal.description.ilike(f'%{search}%') |
-                Journal.publisher.ilike(f'%{search}%')
-            )
+            query = apply_text_search(query, search)
         
         if subject_area:
-            query = query.filter(Journal.subject_areas.contains([subject_area]))
+            query = query.filter(subject_filter([subject_area]))
         
         if access_level:
             query = query.filter(Journal.access_level == access_level)
@@ -71,12 +62,6 @@ def get_journals():
 def get_journal(journal_id):
     """Get specific journal details"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         journal = Journal.query.get(journal_id)
         
         if not journal:
@@ -98,11 +83,7 @@ def get_journal(journal_id):
 def request_access(journal_id):
     """Request access to a journal"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user = current_user
         
         journal = Journal.query.get(journal_id)
         
@@ -140,12 +121,6 @@ def request_access(journal_id):
 def get_proxy_url(journal_id):
     """Get proxy URL for journal access"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         journal = Journal.query.get(journal_id)
         
         if not journal:
@@ -174,28 +149,40 @@ def get_proxy_url(journal_id):
 def search_journals():
     """Search journals with advanced filters"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         # Get search parameters
         query_text = request.args.get('q', '')
         publisher = request.args.get('publisher', '')
         issn = request.args.get('issn', '')
         subject_areas = request.args.getlist('subject_areas')
+        subject_match = request.args.get('subject_match', 'all')
         access_level = request.args.get('access_level', '')
         
+        if subject_match not in SUBJECT_MATCH_MODES:
+            return jsonify({'error': f"subject_match must be one of: {', '.join(SUBJECT_MATCH_MODES)}"}), 400
+        
+        # Serve from the in-memory catalog when it is enabled
+        catalog = journal_catalog.index()
+        if catalog is not None:
+            matches, word_hits = catalog.match(
+                query_text=query_text,
+                publisher=publisher,
+                issn=issn,
+                subject_areas=subject_areas,
+                subject_match=subject_match,
+                access_level=access_level
+            )
+            journals = catalog.ranked(matches, word_hits, limit=50)
+            return jsonify({
+                'journals': journals,
+                'total': len(journals),
+                'facets': catalog.facets(matches)
+            }), 200
+        
         # Build search query
         query = Journal.query.filter_by(is_active=True)
         
         if query_text:
-            query = query.filter(
-                Journal.name.ilike(f'%{query_text}%') |
-                Journal.description.ilike(f'%{query_text}%') |
-                Journal.publisher.ilike(f'%{query_text}%')
-            )
+            query = apply_text_search(query, query_text)
         
         if publisher:
             query = query.filter(Journal.publisher.ilike(f'%{publisher}%'))
@@ -206,8 +193,7 @@ def search_journals():
             )
         
         if subject_areas:
-            for subject in subject_areas:
-                query = query.filter(Journal.subject_areas.contains([subject]))
+            query = query.filter(subject_filter(subject_areas, match=subject_match))
         
         if access_level:
             query = query.filter(Journal.access_level == access_level)
@@ -228,16 +214,20 @@ def search_journals():
 def get_subject_areas():
     """Get list of available subject areas"""
     try:
-        # Get all unique subject areas from journals
-        journals = Journal.query.filter_by(is_active=True).all()
-        subject_areas = set()
+        catalog = journal_catalog.index()
+        if catalog is not None:
+            counts = catalog.facets(catalog.active)['subject_areas']
+            return jsonify({
+                'subject_areas': sorted(counts),
+                'counts': counts
+            }), 200
         
-        for journal in journals:
-            if journal.subject_areas:
-                subject_areas.update(journal.subject_areas)
+        # One grouped query over the active journals' subject areas
+        counts = subject_counts(Journal.query.filter_by(is_active=True))
         
         return jsonify({
-            'subject_areas': sorted(list(subject_areas))
+            'subject_areas': sorted(counts),
+            'counts': counts
         }), 200
         
     except Exception as e:
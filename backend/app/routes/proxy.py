@@ -1,11 +1,11 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
 from app import db, limiter
-from app.models.user import User
 from app.models.journal import Journal
 from app.models.proxy_config import ProxyConfig
 from app.services.proxy_service import ProxyService
 from app.services.journal_service import JournalService
+from app.services.config_apply_queue import config_apply_queue
 
 proxy_bp = Blueprint('proxy', __name__)
 proxy_service = ProxyService()
@@ -17,11 +17,7 @@ journal_service = JournalService()
 def generate_proxy_config():
     """Generate new proxy configuration"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user = current_user
         
         data = request.get_json()
         
@@ -62,10 +58,7 @@ def remove_proxy_config(config_id):
     """Remove proxy configuration"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user = current_user
         
         proxy_config = ProxyConfig.query.get(config_id)
         
@@ -100,10 +93,6 @@ def get_proxy_status():
     """Get proxy service status"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
         
         # Get proxy status
         status = proxy_service.get_config_status()
@@ -127,11 +116,7 @@ def get_proxy_status():
 def get_proxy_stats():
     """Get HAProxy statistics"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user = current_user
         
         # Only admins can view detailed stats
         if not user.is_admin:
@@ -151,11 +136,7 @@ def get_proxy_stats():
 def cleanup_expired_configs():
     """Clean up expired proxy configurations"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user = current_user
         
         # Only admins can cleanup
         if not user.is_admin:
@@ -175,11 +156,7 @@ def cleanup_expired_configs():
 def reload_proxy():
     """Reload HAProxy configuration with dynamic journal configurations"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user = current_user
         
         # Only admins can reload
         if not user.is_admin:
@@ -204,16 +181,24 @@ def reload_proxy():
     except Exception as e:
         return jsonify({'error': 'Failed to reload HAProxy', 'details': str(e)}), 500
 
+@proxy_bp.route('/generation', methods=['GET'])
+@jwt_required()
+def get_config_generation():
+    """Get pending and applied HAProxy configuration generations"""
+    try:
+        # A change is live once applied_generation >= the proxy_generation
+        # returned by the journal endpoints
+        return jsonify(config_apply_queue.status()), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get configuration generation', 'details': str(e)}), 500
+
 @proxy_bp.route('/configs', methods=['GET'])
 @jwt_required()
 def get_user_configs():
     """Get user's proxy configurations"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
         
         # Get query parameters
         page = request.args.get('page', 1, type=int)
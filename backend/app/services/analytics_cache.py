@@ -0,0 +1,231 @@
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from datetime import datetime, date, timedelta
+from redis.exceptions import RedisError
+from app.services.analytics_rollup_service import naive_utc
+
+KEY_PREFIX = 'analytics:cache'
+# Canlı girişlerin indeksi: üye "<başlangıç epoch> <anahtar>", skor bitiş epoch'u
+LIVE_INDEX_KEY = f'{KEY_PREFIX}:live'
+
+
+def _epoch(value):
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+def _floor_minute(value):
+    return value.replace(second=0, microsecond=0) if value is not None else None
+
+
+def _ceil_minute(value):
+    floored = _floor_minute(value)
+    return floored + timedelta(minutes=1) if floored is not None and floored < value else floored
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class AnalyticsCache:
+    """AnalyticsService rapor sonuçları için Redis yanıt önbelleği.
+
+    Anahtar metod adı, normalize edilmiş tarih aralığı ve diğer argümanlardan
+    (filtreler, limit, exact) üretilir. Sonu geçmişte kalan kapalı aralıklar
+    ``ANALYTICS_CACHE_TTL`` kadar tutulur. Sonu "şimdi"ye değen (ya da hiç
+    olmayan) canlı aralıklar yalnızca ``ANALYTICS_CACHE_LIVE_TTL`` kadar
+    tutulur. Canlı aralıkların başlangıcı dakikaya yukarı, bitişi dakikaya
+    aşağı yuvarlanır ve metod yuvarlanmış aralıkla çalıştırılır; böylece
+    aynı anahtarı paylaşan istekler, istenen bitişten sonraki satırları
+    içeren bir sonuç almaz.
+
+    Canlı girişler bir sorted set'te aralıklarıyla indekslenir.
+    analytics_log_writer bir batch yazdığında yalnızca yuvarlanmış aralığı
+    batch'in en eski ve en yeni ``access_timestamp``'i arasına değen canlı
+    girişler silinir; geç flush edilen satırlar da böylece önbellekte
+    kalmış bir sonucu eskitemez.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.ttl = 86400
+        self.live_ttl = 60
+        self.live_margin = timedelta(minutes=5)
+        self._lock = threading.Lock()
+        self._listening = False
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Metrik sayaçlarını sıfırla"""
+        with self._lock:
+            self.counters = {}
+            self.invalidations = 0
+
+    def init_app(self, app):
+        """Ayarları oku ve analytics_logs yazıcısına invalidation dinleyicisi ekle"""
+        self.enabled = app.config.get('ANALYTICS_CACHE_ENABLED', self.enabled)
+        self.ttl = app.config.get('ANALYTICS_CACHE_TTL', self.ttl)
+        self.live_ttl = app.config.get('ANALYTICS_CACHE_LIVE_TTL', self.live_ttl)
+        self.live_margin = timedelta(
+            seconds=app.config.get('ANALYTICS_CACHE_LIVE_MARGIN_SECONDS', self.live_margin.total_seconds())
+        )
+
+        if not self._listening:
+            from app.models.analytics_log import analytics_log_writer
+            timestamp_index = analytics_log_writer.columns.index('access_timestamp')
+            analytics_log_writer.add_listener(
+                lambda rows: self.rows_written(row[timestamp_index] for row in rows)
+            )
+            self._listening = True
+
+    def client(self):
+        from app import redis_client
+        return redis_client if self.enabled else None
+
+    # Okuma tarafı
+
+    def cached(self, range_of=None):
+        """Servis metodunu önbellekle.
+
+        ``range_of(arguments)`` metodun (başlangıç, bitiş) aralığını verir;
+        verilmezse ``start_date``/``end_date`` argümanları kullanılır.
+        """
+        def decorator(method):
+            signature = inspect.signature(method)
+            name = method.__name__
+
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                client = self.client()
+                if client is None:
+                    return method(*args, **kwargs)
+
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = dict(bound.arguments)
+                arguments.pop('self', None)
+                start, end = range_of(arguments) if range_of else (
+                    arguments.pop('start_date', None), arguments.pop('end_date', None)
+                )
+                key, live, start, end = self.key(name, start, end, arguments)
+                if start is not None and end is not None and start >= end:
+                    # Dakikadan kısa aralıklar yuvarlanınca boşalır; önbelleğe alınmaz
+                    return method(*args, **kwargs)
+                if live and not range_of:
+                    # Sonuç anahtardaki (yuvarlanmış) aralık için hesaplanır
+                    bound.arguments['start_date'], bound.arguments['end_date'] = start, end
+                    args, kwargs = bound.args, bound.kwargs
+
+                try:
+                    payload = client.get(key)
+                except RedisError as e:
+                    self._count(name, 'errors')
+                    print(f"Analytics cache read failed: {str(e)}")
+                    return method(*args, **kwargs)
+
+                if payload is not None:
+                    self._count(name, 'hits')
+                    return json.loads(payload)
+
+                self._count(name, 'misses')
+                result = method(*args, **kwargs)
+                self.store(client, key, result, live, start, end)
+                return result
+
+            return wrapper
+        return decorator
+
+    def key(self, name, start, end, arguments):
+        """(anahtar, canlı mı, başlangıç, bitiş); canlı aralıklar dakikaya yuvarlanmış döner"""
+        live = end is None or naive_utc(end) >= datetime.utcnow() - self.live_margin
+        if live:
+            # "Son 30 gün" gibi şimdiye göre aralıklar dakika içinde aynı anahtarı paylaşır
+            start, end = _ceil_minute(start), _floor_minute(end)
+
+        normalized = {
+            'start': naive_utc(start).isoformat() if start else None,
+            'end': naive_utc(end).isoformat() if end else 'now',
+            'args': arguments
+        }
+        digest = hashlib.sha1(
+            json.dumps(normalized, sort_keys=True, default=_json_default).encode()
+        ).hexdigest()
+        return f"{KEY_PREFIX}:{name}:{digest}", live, start, end
+
+    def store(self, client, key, result, live, start=None, end=None):
+        try:
+            payload = json.dumps(result, default=_json_default)
+            if not live:
+                client.setex(key, self.ttl, payload)
+                return
+            pipe = client.pipeline(transaction=False)
+            pipe.setex(key, self.live_ttl, payload)
+            start_epoch = _epoch(naive_utc(start)) if start is not None else float('-inf')
+            pipe.zadd(LIVE_INDEX_KEY, {f'{start_epoch!r} {key}': _epoch(naive_utc(end)) if end is not None else float('inf')})
+            # Bitişi bu sınırdan eski girişlerin anahtarları çoktan süresi dolmuş olur
+            pipe.zremrangebyscore(LIVE_INDEX_KEY, '-inf', self._expired_before())
+            pipe.expire(LIVE_INDEX_KEY, self.live_ttl + int(self.live_margin.total_seconds()))
+            pipe.execute()
+        except (RedisError, TypeError) as e:
+            print(f"Analytics cache write failed: {str(e)}")
+
+    def _expired_before(self):
+        return _epoch(datetime.utcnow() - self.live_margin) - self.live_ttl
+
+    # Invalidation
+
+    def rows_written(self, timestamps):
+        """Aralığı yeni log satırlarının [en eski, en yeni] zamanına değen canlı girişleri sil"""
+        client = self.client()
+        if client is None:
+            return
+        timestamps = [naive_utc(ts) for ts in timestamps if isinstance(ts, datetime)]
+        if not timestamps:
+            return
+        oldest, newest = _epoch(min(timestamps)), _epoch(max(timestamps))
+
+        try:
+            members = [
+                member.decode() if isinstance(member, bytes) else member
+                for member in client.zrangebyscore(LIVE_INDEX_KEY, oldest, '+inf')
+            ]
+            stale = [member for member in members if float(member.split(' ', 1)[0]) <= newest]
+            if stale:
+                pipe = client.pipeline(transaction=False)
+                pipe.delete(*(member.split(' ', 1)[1] for member in stale))
+                pipe.zrem(LIVE_INDEX_KEY, *stale)
+                pipe.execute()
+                with self._lock:
+                    self.invalidations += len(stale)
+        except RedisError as e:
+            print(f"Analytics cache invalidation failed: {str(e)}")
+
+    # Metrikler
+
+    def _count(self, name, outcome):
+        with self._lock:
+            counters = self.counters.setdefault(name, {'hits': 0, 'misses': 0, 'errors': 0})
+            counters[outcome] += 1
+
+    def stats(self):
+        """Metrik endpoint'i için isabet/ıskalama sayaçları"""
+        with self._lock:
+            hits = sum(c['hits'] for c in self.counters.values())
+            misses = sum(c['misses'] for c in self.counters.values())
+            return {
+                'enabled': self.enabled,
+                'hits': hits,
+                'misses': misses,
+                'errors': sum(c['errors'] for c in self.counters.values()),
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'invalidations': self.invalidations,
+                'methods': {name: dict(c) for name, c in self.counters.items()}
+            }
+
+
+# AnalyticsService metodlarının ortak önbelleği, create_app tarafından yapılandırılır
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,304 @@
+import itertools
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+from app import db
+from app.models.analytics_log import AnalyticsLog
+from app.services.analytics_rollup_service import naive_utc, floor_day
+from app.utils.log_archive import log_archiver
+from app.utils.log_export import iter_chunks, encode_parquet
+
+BACKENDS = ('postgres', 'columnar', 'auto')
+STATE_FILE = 'state.json'
+
+
+class ColumnarUnavailable(Exception):
+    """DuckDB/pyarrow kurulu değil, snapshot yok ya da sorgu DuckDB'de çalışmadı"""
+
+
+class ColumnarAnalytics:
+    """analytics_logs'un Parquet snapshot'ı üzerinde DuckDB ile rapor sorguları.
+
+    ``refresh`` tabloyu gün başına bir Parquet dosyası olarak
+    ``directory/YYYY-MM/YYYY-MM-DD.parquet`` altına yazar. İlk çalışmada
+    bütün günler, sonrasında yalnızca id high-water mark'ından sonra satır
+    almış günler, bugün/dün (geç commit edilen satırlar) ve soğuk arşive
+    yeni taşınmış günler yeniden yazılır. Arşive taşınmış satırlar
+    (log_archiver) da snapshot'a dahildir, yani snapshot tüm geçmişi tutar.
+
+    ``fetch_all`` AnalyticsService'in kurduğu SQLAlchemy sorgusunu
+    PostgreSQL diyalektiyle derler ve aynı SQL'i DuckDB'de Parquet
+    dosyaları üzerinde çalıştırır; satırlar aynı kolon adlarıyla döner, bu
+    yüzden rapor metodları aynı çıktıyı üretir. Hangi motorun kullanılacağı
+    sorgu başına ``backend`` ayarı ve tarih aralığına göre seçilir; arşive
+    taşınmış günlere uzanan aralıklar her zaman snapshot'tan okunur. DuckDB
+    kurulu değilse ya da sorgu hata verirse PostgreSQL'e dönülür.
+    """
+
+    # Bir günün satırları bu büyüklükte parçalar (Parquet row group) halinde yazılır
+    BATCH_SIZE = 50000
+
+    def __init__(self):
+        self.backend = 'postgres'
+        self.directory = 'analytics_columnar'
+        self.min_days = 31
+        self.max_lag = timedelta(minutes=30)
+        self.threads = 2
+        self._dialect = postgresql.dialect(paramstyle='qmark')
+        self._lock = threading.Lock()
+        self._connection = None
+        self._state = (None, None)
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Metrik sayaçlarını sıfırla"""
+        with self._lock:
+            self.counters = {'columnar': 0, 'postgres': 0, 'fallbacks': 0}
+
+    def init_app(self, app):
+        """Ayarları app config'ten oku"""
+        self.backend = app.config.get('ANALYTICS_BACKEND', self.backend)
+        self.directory = app.config.get('ANALYTICS_COLUMNAR_DIR', self.directory)
+        self.min_days = app.config.get('ANALYTICS_COLUMNAR_MIN_DAYS', self.min_days)
+        self.max_lag = timedelta(
+            seconds=app.config.get('ANALYTICS_COLUMNAR_MAX_LAG_SECONDS', self.max_lag.total_seconds())
+        )
+        self.threads = app.config.get('ANALYTICS_COLUMNAR_THREADS', self.threads)
+        if self.backend not in BACKENDS:
+            raise ValueError(f"ANALYTICS_BACKEND must be one of {', '.join(BACKENDS)}")
+        with self._lock:
+            self._connection = None
+            self._state = (None, None)
+
+    def stats(self):
+        state = self.state()
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'backend': self.backend,
+            'refreshed_at': state['refreshed_at'] if state else None,
+            'days': len(state['days']) if state else 0,
+            'rows': sum(state['days'].values()) if state else 0,
+            **counters
+        }
+
+    # Motor seçimi
+
+    def serves(self, start_date=None, end_date=None):
+        """Bu aralıktaki bir rapor sorgusu DuckDB snapshot'ından mı okunmalı"""
+        if self.backend == 'postgres':
+            return False
+        state = self.state()
+        if state is None:
+            return False
+
+        # Arşive taşınmış günler artık yalnızca snapshot'ta; bu aralıklar
+        # snapshot geride kalmış olsa da PostgreSQL'den okunmaz
+        start_date, end_date = naive_utc(start_date), naive_utc(end_date)
+        horizon = log_archiver.horizon(AnalyticsLog.__tablename__)
+        if horizon is not None and (start_date is None or start_date < horizon):
+            return True
+
+        # Son refresh'ten sonrasını kapsayan aralıklar (canlı raporlar) için
+        # snapshot en fazla max_lag kadar geride olabilir
+        refreshed_at = datetime.fromisoformat(state['refreshed_at'])
+        if (end_date is None or end_date > refreshed_at) and datetime.utcnow() - refreshed_at > self.max_lag:
+            return False
+
+        if self.backend == 'columnar' or start_date is None:
+            return True
+        return (end_date or datetime.utcnow()) - start_date >= timedelta(days=self.min_days)
+
+    def fetch_all(self, query, start_date=None, end_date=None):
+        """``query.all()``; aralık uygunsa DuckDB'de, değilse ya da DuckDB başarısızsa PostgreSQL'de"""
+        if self.serves(start_date, end_date):
+            try:
+                rows = self._execute(query)
+                self._count('columnar')
+                return rows
+            except ColumnarUnavailable as e:
+                print(f"Using PostgreSQL for analytics query: {str(e)}")
+                self._count('fallbacks')
+        self._count('postgres')
+        return query.all()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _execute(self, query):
+        cursor = self._cursor()
+        import duckdb
+
+        compiled = query.statement.compile(dialect=self._dialect)
+        params = [self._param(compiled.params[name]) for name in compiled.positiontup]
+        Row = namedtuple('Row', [column['name'] for column in query.column_descriptions], rename=True)
+
+        try:
+            return [Row(*row) for row in cursor.execute(str(compiled), params).fetchall()]
+        except duckdb.Error as e:
+            raise ColumnarUnavailable(str(e))
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _param(value):
+        # Parquet'teki zamanlar naive UTC
+        return naive_utc(value) if isinstance(value, datetime) else value
+
+    def _cursor(self):
+        """Paylaşılan DuckDB bağlantısından thread'e özel cursor"""
+        with self._lock:
+            if self._connection is None:
+                try:
+                    import duckdb
+                except ImportError:
+                    raise ColumnarUnavailable('The duckdb package is not installed')
+                connection = duckdb.connect(database=':memory:')
+                connection.execute(f'SET threads TO {int(self.threads)}')
+                # Dosya listesi her sorguda yeniden okunur; refresh'le eklenen
+                # günler bağlantı yenilenmeden görünür
+                pattern = os.path.join(self.directory, '*', '*.parquet').replace("'", "''")
+                connection.execute(
+                    f"CREATE VIEW analytics_logs AS "
+                    f"SELECT * FROM read_parquet('{pattern}', union_by_name = true)"
+                )
+                self._connection = connection
+            return self._connection.cursor()
+
+    # Snapshot
+
+    def state(self):
+        """Son refresh'in durumu (state.json, değiştikçe yeniden okunur); yoksa None"""
+        path = os.path.join(self.directory, STATE_FILE)
+        try:
+            modified = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        cached_at, state = self._state
+        if cached_at != modified:
+            with open(path) as state_file:
+                state = json.load(state_file)
+            self._state = (modified, state)
+        return state
+
+    def refresh(self, now=None):
+        """Değişen günlerin Parquet dosyalarını yeniden yaz; yazılan gün sayısını döndürür"""
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ColumnarUnavailable('The columnar snapshot requires the pyarrow package')
+
+        now = now or datetime.utcnow()
+        os.makedirs(self.directory, exist_ok=True)
+        state = self.state() or {'watermark': 0, 'refreshed_at': None, 'days': {}}
+        state = {**state, 'days': dict(state['days'])}
+
+        # Yeni satırların düştüğü günler
+        max_id = db.session.query(func.max(AnalyticsLog.id)).scalar() or 0
+        days = {
+            value if isinstance(value, str) else value.isoformat()
+            for (value,) in db.session.query(func.date(AnalyticsLog.access_timestamp)).filter(
+                AnalyticsLog.id > state['watermark'],
+                AnalyticsLog.id <= max_id,
+                AnalyticsLog.access_timestamp.isnot(None)
+            ).distinct()
+        }
+        db.session.commit()
+
+        # Geç commit edilen satırlar id sırasının gerisinde kalabilir
+        today = floor_day(now)
+        days |= {today.date().isoformat(), (today - timedelta(days=1)).date().isoformat()}
+
+        # Soğuk arşive son refresh'ten sonra taşınan ya da snapshot'ta olmayan günler
+        for entry in log_archiver.load_manifest(AnalyticsLog.__tablename__)['files']:
+            if entry['day'] not in state['days'] or entry['created_at'] > (state['refreshed_at'] or ''):
+                days.add(entry['day'])
+
+        for day in sorted(days):
+            rows = self._write_day(day)
+            if rows:
+                state['days'][day] = rows
+            else:
+                state['days'].pop(day, None)
+
+        state['watermark'] = max_id
+        state['refreshed_at'] = now.isoformat()
+        self._save_state(state)
+        return len(days)
+
+    def rebuild(self, now=None):
+        """Snapshot'ı sıfırdan oluştur"""
+        path = os.path.join(self.directory, STATE_FILE)
+        if os.path.exists(path):
+            os.remove(path)
+        self._state = (None, None)
+        return self.refresh(now)
+
+    def _day_path(self, day):
+        return os.path.join(self.directory, day[:7], f'{day}.parquet')
+
+    def _write_day(self, day):
+        """Günün satırlarını (arşiv + tablo) tek dosyaya yaz; satır sayısını döndürür"""
+        table = AnalyticsLog.__table__
+        start = datetime.fromisoformat(day)
+        end = start + timedelta(days=1)
+        path = self._day_path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        archived_ids = set()
+        written = [0]
+
+        def archived():
+            # iter_archived'in bitişi dahil
+            for chunk in log_archiver.iter_archived(
+                table.name, start, end - timedelta(microseconds=1), chunk_size=self.BATCH_SIZE
+            ):
+                archived_ids.update(row[0] for row in chunk)
+                yield chunk
+
+        def live():
+            # Arşivlenip henüz silinmemiş satırlar iki kez yazılmaz
+            conditions = [AnalyticsLog.access_timestamp >= start, AnalyticsLog.access_timestamp < end]
+            for chunk in iter_chunks(table, conditions, chunk_size=self.BATCH_SIZE):
+                yield [row for row in chunk if row[0] not in archived_ids]
+
+        def counted(chunks):
+            for chunk in chunks:
+                if chunk:
+                    written[0] += len(chunk)
+                    yield chunk
+
+        temporary = path + '.tmp'
+        try:
+            with open(temporary, 'wb') as day_file:
+                for part in encode_parquet(table, counted(itertools.chain(archived(), live())), compression='zstd'):
+                    day_file.write(part)
+        except BaseException:
+            db.session.rollback()
+            os.remove(temporary)
+            raise
+        db.session.commit()
+
+        if written[0]:
+            os.replace(temporary, path)
+        else:
+            os.remove(temporary)
+            if os.path.exists(path):
+                os.remove(path)
+        return written[0]
+
+    def _save_state(self, state):
+        path = os.path.join(self.directory, STATE_FILE)
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as state_file:
+            json.dump(state, state_file, indent=2)
+        os.replace(temporary, path)
+
+
+# DuckDB rapor motoru (AnalyticsService.fetch), create_app tarafından yapılandırılır
+analytics_columnar = ColumnarAnalytics()
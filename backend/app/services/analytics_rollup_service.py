@@ -0,0 +1,332 @@
+from collections import defaultdict
+from datetime import datetime, date, timedelta, timezone
+from redis.exceptions import RedisError
+from sqlalchemy import func
+from app import db
+from app.models.analytics_log import AnalyticsLog
+from app.models.analytics_rollup import (
+    AnalyticsRollupHourly, AnalyticsRollupDaily, AnalyticsRollupState,
+    ROLLUP_DIMENSIONS, ROLLUP_MEASURES
+)
+from app.services.analytics_sketches import AnalyticsSketchStore, SketchesUnavailable, SKETCH_STATE_NAME
+
+STATE_NAME = 'analytics_logs'
+ROLLUP_MODELS = {'hour': AnalyticsRollupHourly, 'day': AnalyticsRollupDaily}
+TEXT_DIMENSIONS = ('resource_name', 'department', 'account_type', 'country')
+
+
+def naive_utc(value):
+    """Saat dilimi içeren tarihleri UTC'ye çevirip naive yap (loglar naive UTC)"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value):
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def floor_day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_day(value):
+    floored = floor_day(value)
+    return floored if floored == value else floored + timedelta(days=1)
+
+
+class AnalyticsRollupService:
+    """Saatlik/günlük analitik özet tablolarının bakımı ve sorgulanması.
+
+    ``refresh`` analytics_logs tablosunu id high-water mark'ından itibaren
+    okur ve toplanabilir ölçüleri özet tablolarına upsert ile ekler.
+    ``aggregate`` bir tarih aralığını böler: saat/güne hizalı kısım özet
+    tablolarından, hizalanmamış kenarlar ve henüz özetlenmemiş son saatler
+    ham loglardan okunur.
+    """
+
+    # Bir refresh adımında okunacak ham log satırı sayısı
+    BATCH_SIZE = 50000
+
+    def __init__(self):
+        self.sketches = AnalyticsSketchStore(self)
+
+    def refresh(self, settle=True, batch_size=None):
+        """Özet tablolarını yeni ham loglarla güncelle; özetlenen satır sayısını döndürür.
+
+        ``settle`` açıkken yalnızca bir önceki çalışmada görülen en büyük id'ye
+        kadar özetlenir, böylece o sırada commit edilmemiş toplu yazımlar atlanmaz.
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        state = db.session.get(AnalyticsRollupState, STATE_NAME)
+        if state is None:
+            state = AnalyticsRollupState(name=STATE_NAME, last_id=0, seen_max_id=0)
+            db.session.add(state)
+
+        current_max = db.session.query(func.max(AnalyticsLog.id)).scalar() or 0
+        upper = state.seen_max_id if settle else current_max
+
+        processed = 0
+        while state.last_id < upper:
+            high = min(state.last_id + batch_size, upper)
+            processed += self._roll_up(state.last_id, high)
+            # Özetler ve high-water mark aynı transaction'da
+            state.last_id = high
+            db.session.commit()
+
+        state.seen_max_id = current_max
+        self._update_coverage(state)
+        db.session.commit()
+
+        self._refresh_sketches(state.last_id, batch_size)
+        return processed
+
+    def _refresh_sketches(self, upper, batch_size):
+        """HyperLogLog sketch'lerini özetlerle aynı high-water mark'a getir"""
+        state = db.session.get(AnalyticsRollupState, SKETCH_STATE_NAME)
+        if state is None:
+            state = AnalyticsRollupState(name=SKETCH_STATE_NAME, last_id=0, seen_max_id=0)
+            db.session.add(state)
+
+        try:
+            if self.sketches.needs_rebuild(state.last_id):
+                print("HyperLogLog sketches missing from Redis, rebuilding")
+                state.last_id = 0
+            while state.last_id < upper:
+                high = min(state.last_id + batch_size, upper)
+                self.sketches.add_id_range(state.last_id, high)
+                state.last_id = high
+                state.seen_max_id = high
+                db.session.commit()
+        except (SketchesUnavailable, RedisError) as e:
+            print(f"HyperLogLog sketch refresh skipped: {str(e)}")
+
+        self._update_coverage(state)
+        db.session.commit()
+
+    def _update_coverage(self, state):
+        """covered_until: henüz işlenmemiş en eski logun saatine kadar"""
+        pending_since = db.session.query(func.min(AnalyticsLog.access_timestamp))\
+            .filter(AnalyticsLog.id > state.last_id).scalar()
+        now = datetime.utcnow()
+        state.covered_until = floor_hour(min(pending_since, now) if pending_since else now)
+
+    def rebuild(self):
+        """Özet tablolarını sıfırdan oluştur"""
+        AnalyticsRollupHourly.query.delete()
+        AnalyticsRollupDaily.query.delete()
+        AnalyticsRollupState.query.filter(
+            AnalyticsRollupState.name.in_([STATE_NAME, SKETCH_STATE_NAME])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return self.refresh(settle=False)
+
+    def supports(self, filters):
+        """Filtreler özet tablolarından cevaplanabilir mi"""
+        return all(key in ROLLUP_DIMENSIONS for key, value in (filters or {}).items() if value)
+
+    def aggregate(self, start_date=None, end_date=None, group_by=(), filters=None):
+        """Toplanabilir ölçüleri grupla: {grup anahtarı: {ölçü: değer}}.
+
+        ``group_by`` özet boyutlarını ve 'hour' (günün saati) ya da 'date'
+        sözde boyutlarını içerebilir. Aralık başı dahil, sonu dahildir.
+        """
+        start_date, end_date = naive_utc(start_date), naive_utc(end_date)
+        time_key = 'hour' if 'hour' in group_by else 'date' if 'date' in group_by else None
+        dimensions = [name for name in group_by if name in ROLLUP_DIMENSIONS]
+        results = defaultdict(lambda: dict.fromkeys(ROLLUP_MEASURES, 0))
+
+        rollup_ranges, raw_ranges = self.plan_range(start_date, end_date, 'hour' if time_key == 'hour' else None)
+
+        for granularity, low, high in rollup_ranges:
+            model = ROLLUP_MODELS[granularity]
+            columns = [getattr(model, name) for name in dimensions]
+            if time_key:
+                columns.insert(0, model.bucket)
+            query = db.session.query(
+                *columns, *[func.sum(getattr(model, measure)) for measure in ROLLUP_MEASURES]
+            )
+            if low is not None:
+                query = query.filter(model.bucket >= low)
+            query = query.filter(model.bucket < high)
+            for key, value in (filters or {}).items():
+                if value:
+                    query = query.filter(getattr(model, key) == value)
+            if columns:
+                query = query.group_by(*columns)
+            self._accumulate(results, query.all(), time_key, dimensions)
+
+        for low, high, high_inclusive in raw_ranges:
+            bucket = self._hour_bucket(AnalyticsLog.access_timestamp)
+            columns = [self._raw_dimension(name) for name in dimensions]
+            if time_key:
+                columns.insert(0, bucket)
+            query = db.session.query(*columns, *self._raw_measures())
+            if low is not None:
+                query = query.filter(AnalyticsLog.access_timestamp >= low)
+            if high is not None:
+                query = query.filter(
+                    AnalyticsLog.access_timestamp <= high if high_inclusive else AnalyticsLog.access_timestamp < high
+                )
+            for key, value in (filters or {}).items():
+                if value:
+                    query = query.filter(getattr(AnalyticsLog, key) == value)
+            if columns:
+                query = query.group_by(*columns)
+            self._accumulate(results, query.all(), time_key, dimensions)
+
+        # Sayısı sıfır olan grupları (boş kenar sorguları) at
+        return {key: measures for key, measures in results.items() if measures['event_count']}
+
+    def plan_range(self, start_date, end_date, granularity=None, state_name=STATE_NAME):
+        """Aralığı özet ve ham kısımlara böl.
+
+        ``granularity`` 'hour' ise yalnızca saatlik, 'day' ise yalnızca günlük
+        kovalar kullanılır. Dönüş:
+        ([('hour' | 'day', başlangıç, bitiş), ...], [(başlangıç, bitiş, bitiş_dahil), ...])
+        """
+        start_date, end_date = naive_utc(start_date), naive_utc(end_date)
+        state = db.session.get(AnalyticsRollupState, state_name)
+        covered = state.covered_until if state else None
+
+        align_start, align_end = (ceil_day, floor_day) if granularity == 'day' else (ceil_hour, floor_hour)
+        aligned_start = align_start(start_date) if start_date else None
+        aligned_end = floor_hour(end_date) if end_date else covered
+        if covered is not None and aligned_end is not None:
+            aligned_end = align_end(min(aligned_end, covered))
+
+        if covered is None or (aligned_start is not None and aligned_end <= aligned_start):
+            return [], [(start_date, end_date, True)]
+
+        rollups = []
+        day_start = ceil_day(aligned_start) if aligned_start else None
+        day_end = floor_day(aligned_end)
+        if granularity == 'hour' or (granularity is None and day_start is not None and day_end <= day_start):
+            rollups.append(('hour', aligned_start, aligned_end))
+        else:
+            if day_start is not None and aligned_start < day_start:
+                rollups.append(('hour', aligned_start, day_start))
+            rollups.append(('day', day_start, day_end))
+            if day_end < aligned_end:
+                rollups.append(('hour', day_end, aligned_end))
+
+        raw = []
+        if start_date and start_date < aligned_start:
+            raw.append((start_date, aligned_start, False))
+        raw.append((aligned_end, end_date, True))
+        return rollups, raw
+
+    def _accumulate(self, results, rows, time_key, dimensions):
+        offset = 1 if time_key else 0
+        dimension_count = len(dimensions)
+        for row in rows:
+            key = tuple(
+                self._output_value(name, value)
+                for name, value in zip(dimensions, row[offset:offset + dimension_count])
+            )
+            if time_key:
+                bucket = self._parse_bucket(row[0])
+                key = (bucket.hour if time_key == 'hour' else bucket.date(),) + key
+            measures = results[key]
+            for measure, value in zip(ROLLUP_MEASURES, row[offset + dimension_count:]):
+                measures[measure] += int(value or 0)
+
+    def _output_value(self, name, value):
+        if name in TEXT_DIMENSIONS:
+            # '' özet tablolarında NULL'un karşılığı
+            return value or None
+        return bool(value)
+
+    def _roll_up(self, low_id, high_id):
+        """(low_id, high_id] aralığındaki ham logları özet tablolarına ekle"""
+        bucket = self._hour_bucket(AnalyticsLog.access_timestamp)
+        dimensions = [self._raw_dimension(name) for name in ROLLUP_DIMENSIONS]
+        rows = db.session.query(bucket, *dimensions, *self._raw_measures())\
+            .filter(AnalyticsLog.id > low_id, AnalyticsLog.id <= high_id)\
+            .filter(AnalyticsLog.access_timestamp.isnot(None))\
+            .group_by(bucket, *dimensions).all()
+
+        hourly = {}
+        daily = defaultdict(lambda: dict.fromkeys(ROLLUP_MEASURES, 0))
+        for row in rows:
+            hour = self._parse_bucket(row[0])
+            key = tuple(
+                bool(value) if name in ('auth_success', 'access_denied') else value
+                for name, value in zip(ROLLUP_DIMENSIONS, row[1:1 + len(ROLLUP_DIMENSIONS)])
+            )
+            measures = dict(zip(ROLLUP_MEASURES, (int(value or 0) for value in row[1 + len(ROLLUP_DIMENSIONS):])))
+            hourly[(hour,) + key] = measures
+            day_measures = daily[(floor_day(hour),) + key]
+            for measure, value in measures.items():
+                day_measures[measure] += value
+
+        self._upsert(AnalyticsRollupHourly, hourly)
+        self._upsert(AnalyticsRollupDaily, daily)
+        return sum(measures['event_count'] for measures in hourly.values())
+
+    def _upsert(self, model, groups):
+        """Ölçüleri mevcut satırlara ekle, yoksa satır oluştur"""
+        if not groups:
+            return
+        rows = [
+            dict(zip(('bucket',) + ROLLUP_DIMENSIONS, key), **measures)
+            for key, measures in groups.items()
+        ]
+        table = model.__table__
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            self._upsert_orm(model, rows)
+            return
+
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['bucket', *ROLLUP_DIMENSIONS],
+            set_={measure: table.c[measure] + statement.excluded[measure] for measure in ROLLUP_MEASURES}
+        )
+        db.session.execute(statement, rows)
+
+    def _upsert_orm(self, model, rows):
+        for row in rows:
+            existing = model.query.filter_by(**{k: row[k] for k in ('bucket',) + ROLLUP_DIMENSIONS}).first()
+            if existing:
+                for measure in ROLLUP_MEASURES:
+                    setattr(existing, measure, getattr(existing, measure) + row[measure])
+            else:
+                db.session.add(model(**row))
+
+    def _hour_bucket(self, column):
+        if db.engine.dialect.name == 'postgresql':
+            return func.date_trunc('hour', column)
+        return func.strftime('%Y-%m-%d %H:00:00', column)
+
+    def _parse_bucket(self, value):
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        return datetime.fromisoformat(value)
+
+    def _raw_dimension(self, name):
+        column = getattr(AnalyticsLog, name)
+        if name in TEXT_DIMENSIONS:
+            return func.coalesce(column, '')
+        if name == 'auth_success':
+            return func.coalesce(column, db.true())
+        return func.coalesce(column, db.false())
+
+    def _raw_measures(self):
+        return [
+            func.count(AnalyticsLog.id),
+            func.sum(func.coalesce(AnalyticsLog.page_views, 0)),
+            func.sum(func.coalesce(AnalyticsLog.downloads, 0)),
+            func.sum(func.coalesce(AnalyticsLog.searches, 0))
+        ]
@@ -1,19 +1,58 @@
-from datetime import datetime, timedelta
-from sqlalchemy import func, desc, and_, or_
+from collections import defaultdict
+from redis.exceptions import RedisError
+from datetime import datetime, date, timedelta
+from sqlalchemy import func, desc, or_, case, cast, Date
 from app import db
 from app.models.analytics_log import AnalyticsLog
-from app.models.user import User
+from app.utils.identity_cache import user_profiles
 from app.models.journal import Journal
+from app.models.analytics_rollup import ROLLUP_DIMENSIONS
+from app.services.analytics_rollup_service import AnalyticsRollupService
+from app.services.analytics_sketches import SketchesUnavailable, geo_value
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_columnar import analytics_columnar
+
+def count_where(condition):
+    """Koşullu sayım: COUNT(CASE WHEN ... THEN 1 END)"""
+    return func.count(case((condition, 1)))
+
+
+# Rapor metodlarının ortak ölçüleri. Hepsi aynı SELECT içinde hesaplanabildiği
+# için bir raporun tüm ölçüleri tek taramada gelir.
+MEASURES = {
+    'total_accesses': func.count(AnalyticsLog.id),
+    'access_count': func.count(AnalyticsLog.id),
+    'unique_users': func.count(func.distinct(AnalyticsLog.user_id)),
+    'unique_resources': func.count(func.distinct(AnalyticsLog.resource_name)),
+    'unique_ips': func.count(func.distinct(AnalyticsLog.ip_address)),
+    'successful_accesses': count_where(AnalyticsLog.auth_success == True),
+    'failed_accesses': count_where(AnalyticsLog.auth_success == False),
+    'denied_accesses': count_where(AnalyticsLog.access_denied == True),
+    'total_page_views': func.coalesce(func.sum(AnalyticsLog.page_views), 0),
+    'total_downloads': func.coalesce(func.sum(AnalyticsLog.downloads), 0),
+    'total_searches': func.coalesce(func.sum(AnalyticsLog.searches), 0),
+    'first_access': func.min(AnalyticsLog.access_timestamp),
+    'last_access': func.max(AnalyticsLog.access_timestamp)
+}
+
+# Eşitlik filtresi olarak kabul edilen alanlar
+FILTER_FIELDS = ('user_id', 'department', 'resource_type', 'account_type')
 
 class AnalyticsService:
     """OpenAthens benzeri analitik ve raporlama servisi"""
     
     def __init__(self):
         self.db = db
+        self.rollups = AnalyticsRollupService()
+        self.sketches = self.rollups.sketches
+    
+    def measures(self, *names):
+        """Adı verilen ölçülerin etiketli SELECT ifadeleri"""
+        return [MEASURES[name].label(name) for name in names]
     
-    def get_usage_statistics(self, start_date=None, end_date=None, filters=None):
-        """Genel kullanım istatistikleri"""
-        query = AnalyticsLog.query
+    def filtered_query(self, start_date=None, end_date=None, filters=None, query=None):
+        """Tarih aralığı ve eşitlik filtreleri uygulanmış log sorgusu"""
+        query = query if query is not None else AnalyticsLog.query
         
         # Tarih filtresi
         if start_date:
@@ -22,61 +61,114 @@ class AnalyticsService:
             query = query.filter(AnalyticsLog.access_timestamp <= end_date)
         
         # Diğer filtreler
-        if filters:
-            if filters.get('user_id'):
-                query = query.filter(AnalyticsLog.user_id == filters['user_id'])
-            if filters.get('department'):
-                query = query.filter(AnalyticsLog.department == filters['department'])
-            if filters.get('resource_type'):
-                query = query.filter(AnalyticsLog.resource_type == filters['resource_type'])
-            if filters.get('account_type'):
-                query = query.filter(AnalyticsLog.account_type == filters['account_type'])
-        
-        # Temel istatistikler
-        total_accesses = query.count()
-        unique_users = query.filter(AnalyticsLog.user_id.isnot(None)).distinct(AnalyticsLog.user_id).count()
-        unique_resources = query.distinct(AnalyticsLog.resource_name).count()
-        
-        # Başarılı/başarısız erişimler
-        successful_accesses = query.filter(AnalyticsLog.auth_success == True).count()
-        failed_accesses = query.filter(AnalyticsLog.auth_success == False).count()
-        
-        # Erişim reddi
-        denied_accesses = query.filter(AnalyticsLog.access_denied == True).count()
+        for field in FILTER_FIELDS:
+            if filters and filters.get(field):
+                query = query.filter(getattr(AnalyticsLog, field) == filters[field])
+        
+        return query
+    
+    def fetch(self, query, start_date=None, end_date=None):
+        """Rapor sorgusunun satırları; ANALYTICS_BACKEND ve aralığa göre DuckDB snapshot'ından ya da PostgreSQL'den"""
+        return analytics_columnar.fetch_all(query, start_date, end_date)
+    
+    def day_of(self, column):
+        """Zaman damgasının günü; DuckDB'de date() olmadığından PostgreSQL'de CAST ile"""
+        if db.engine.dialect.name == 'postgresql':
+            return cast(column, Date)
+        return func.date(column)
+    
+    @analytics_cache.cached()
+    def get_usage_statistics(self, start_date=None, end_date=None, filters=None, exact=False):
+        """Genel kullanım istatistikleri.
+        
+        Filtreler özet boyutlarıysa sayımlar özet tablolarından, tekil
+        kullanıcılar exact=False iken HLL sketch'lerinden gelir; diğer
+        durumlarda tek sorgu.
+        """
+        active_filters = {key: value for key, value in (filters or {}).items() if value}
+        if not self.rollups.supports(active_filters):
+            stats = self.fetch(self.filtered_query(start_date, end_date, filters).with_entities(
+                *self.measures(
+                    'total_accesses', 'unique_users', 'unique_resources',
+                    'successful_accesses', 'failed_accesses', 'denied_accesses'
+                )
+            ), start_date, end_date)[0]._asdict()
+        else:
+            groups = self.rollups.aggregate(
+                start_date, end_date, ('resource_name', 'auth_success', 'access_denied'), active_filters
+            )
+            total_accesses = sum(m['event_count'] for m in groups.values())
+            successful_accesses = sum(m['event_count'] for key, m in groups.items() if key[1])
+            stats = {
+                'total_accesses': total_accesses,
+                'unique_users': self._unique_users(start_date, end_date, active_filters, exact),
+                'unique_resources': len({key[0] for key in groups}),
+                'successful_accesses': successful_accesses,
+                'failed_accesses': total_accesses - successful_accesses,
+                'denied_accesses': sum(m['event_count'] for key, m in groups.items() if key[2])
+            }
+        
+        total_accesses = stats['total_accesses']
+        stats['success_rate'] = (stats['successful_accesses'] / total_accesses * 100) if total_accesses > 0 else 0
+        return stats
+    
+    def _unique_users(self, start_date, end_date, filters, exact):
+        """Aralıktaki tekil kullanıcılar; exact=False iken sketch'lerden, olmazsa COUNT(DISTINCT)"""
+        if not exact and len(filters) <= 1:
+            dimension, value = next(iter(filters.items()), (None, None))
+            unique_users = self._try_sketches(
+                self.sketches.unique_counts, 'users', start_date, end_date,
+                dimension=dimension, values=[value] if dimension else None, filters=filters
+            )
+            if unique_users is not None:
+                return sum(unique_users.values())
         
+        return self.fetch(self.filtered_query(start_date, end_date, filters).with_entities(
+            *self.measures('unique_users')
+        ), start_date, end_date)[0].unique_users
+    
+    def _unique_users_by_time(self, start_date, end_date, group_by_time, exact):
+        """{saat ya da gün: tekil kullanıcı}; exact=False iken sketch'lerden, olmazsa COUNT(DISTINCT)"""
+        if not exact:
+            unique_users = self._try_sketches(
+                self.sketches.unique_counts, 'users', start_date, end_date, group_by_time=group_by_time
+            )
+            if unique_users is not None:
+                return unique_users
+        
+        if group_by_time == 'hour':
+            bucket = func.extract('hour', AnalyticsLog.access_timestamp)
+        else:
+            bucket = self.day_of(AnalyticsLog.access_timestamp)
+        user_stats = self.fetch(self.filtered_query(start_date, end_date).with_entities(
+            bucket.label('bucket'),
+            *self.measures('unique_users')
+        ).group_by(bucket), start_date, end_date)
+        
+        if group_by_time == 'hour':
+            return {int(stat.bucket): stat.unique_users for stat in user_stats}
+        # SQLite günü metin olarak döndürür
         return {
-            'total_accesses': total_accesses,
-            'unique_users': unique_users,
-            'unique_resources': unique_resources,
-            'successful_accesses': successful_accesses,
-            'failed_accesses': failed_accesses,
-            'denied_accesses': denied_accesses,
-            'success_rate': (successful_accesses / total_accesses * 100) if total_accesses > 0 else 0
+            date.fromisoformat(stat.bucket) if isinstance(stat.bucket, str) else stat.bucket: stat.unique_users
+            for stat in user_stats
         }
     
+    @analytics_cache.cached()
     def get_resource_usage_report(self, start_date=None, end_date=None, limit=50):
         """En çok kullanılan kaynaklar raporu"""
         query = AnalyticsLog.query.filter(AnalyticsLog.resource_name.isnot(None))
+        query = self.filtered_query(start_date, end_date, query=query)
         
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
-        
-        resource_stats = query.with_entities(
+        resource_stats = self.fetch(query.with_entities(
             AnalyticsLog.resource_name,
             AnalyticsLog.resource_type,
             AnalyticsLog.resource_provider,
-            func.count(AnalyticsLog.id).label('access_count'),
-            func.count(func.distinct(AnalyticsLog.user_id)).label('unique_users'),
-            func.sum(AnalyticsLog.page_views).label('total_page_views'),
-            func.sum(AnalyticsLog.downloads).label('total_downloads'),
-            func.sum(AnalyticsLog.searches).label('total_searches')
+            *self.measures('access_count', 'unique_users', 'total_page_views', 'total_downloads', 'total_searches')
         ).group_by(
             AnalyticsLog.resource_name,
             AnalyticsLog.resource_type,
             AnalyticsLog.resource_provider
-        ).order_by(desc('access_count')).limit(limit).all()
+        ).order_by(desc('access_count')).limit(limit), start_date, end_date)
         
         return [
             {
@@ -92,44 +184,36 @@ class AnalyticsService:
             for stat in resource_stats
         ]
     
+    @analytics_cache.cached()
     def get_user_activity_report(self, start_date=None, end_date=None, limit=50):
         """En aktif kullanıcılar raporu"""
         query = AnalyticsLog.query.filter(AnalyticsLog.user_id.isnot(None))
+        query = self.filtered_query(start_date, end_date, query=query)
         
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
-        
-        user_stats = query.with_entities(
+        user_stats = self.fetch(query.with_entities(
             AnalyticsLog.user_id,
             AnalyticsLog.department,
             AnalyticsLog.academic_unit,
             AnalyticsLog.account_type,
-            func.count(AnalyticsLog.id).label('access_count'),
-            func.count(func.distinct(AnalyticsLog.resource_name)).label('unique_resources'),
-            func.sum(AnalyticsLog.page_views).label('total_page_views'),
-            func.sum(AnalyticsLog.downloads).label('total_downloads'),
-            func.min(AnalyticsLog.access_timestamp).label('first_access'),
-            func.max(AnalyticsLog.access_timestamp).label('last_access')
+            *self.measures('access_count', 'unique_resources', 'total_page_views', 'total_downloads', 'first_access', 'last_access')
         ).group_by(
             AnalyticsLog.user_id,
             AnalyticsLog.department,
             AnalyticsLog.academic_unit,
             AnalyticsLog.account_type
-        ).order_by(desc('access_count')).limit(limit).all()
+        ).order_by(desc('access_count')).limit(limit), start_date, end_date)
         
-        # Kullanıcı bilgilerini al
-        user_ids = [stat.user_id for stat in user_stats]
-        users = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()}
+        # Kullanıcı bilgileri tek IN sorgusuyla (istek boyunca önbellekte)
+        users = user_profiles({stat.user_id for stat in user_stats})
+        unknown = {'username': 'Unknown', 'email': 'Unknown', 'first_name': '', 'last_name': ''}
         
         return [
             {
                 'user_id': stat.user_id,
-                'username': users.get(stat.user_id, {}).username if users.get(stat.user_id) else 'Unknown',
-                'email': users.get(stat.user_id, {}).email if users.get(stat.user_id) else 'Unknown',
-                'first_name': users.get(stat.user_id, {}).first_name if users.get(stat.user_id) else '',
-                'last_name': users.get(stat.user_id, {}).last_name if users.get(stat.user_id) else '',
+                'username': (users.get(stat.user_id) or unknown)['username'],
+                'email': (users.get(stat.user_id) or unknown)['email'],
+                'first_name': (users.get(stat.user_id) or unknown)['first_name'],
+                'last_name': (users.get(stat.user_id) or unknown)['last_name'],
                 'department': stat.department,
                 'academic_unit': stat.academic_unit,
                 'account_type': stat.account_type,
@@ -143,27 +227,20 @@ class AnalyticsService:
             for stat in user_stats
         ]
     
+    @analytics_cache.cached()
     def get_department_usage_report(self, start_date=None, end_date=None):
         """Departman bazlı kullanım raporu"""
         query = AnalyticsLog.query.filter(AnalyticsLog.department.isnot(None))
+        query = self.filtered_query(start_date, end_date, query=query)
         
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
-        
-        dept_stats = query.with_entities(
+        dept_stats = self.fetch(query.with_entities(
             AnalyticsLog.department,
             AnalyticsLog.academic_unit,
-            func.count(AnalyticsLog.id).label('access_count'),
-            func.count(func.distinct(AnalyticsLog.user_id)).label('unique_users'),
-            func.count(func.distinct(AnalyticsLog.resource_name)).label('unique_resources'),
-            func.sum(AnalyticsLog.page_views).label('total_page_views'),
-            func.sum(AnalyticsLog.downloads).label('total_downloads')
+            *self.measures('access_count', 'unique_users', 'unique_resources', 'total_page_views', 'total_downloads')
         ).group_by(
             AnalyticsLog.department,
             AnalyticsLog.academic_unit
-        ).order_by(desc('access_count')).all()
+        ).order_by(desc('access_count')), start_date, end_date)
         
         return [
             {
@@ -178,73 +255,52 @@ class AnalyticsService:
             for stat in dept_stats
         ]
     
-    def get_hourly_usage_pattern(self, start_date=None, end_date=None):
-        """Saatlik kullanım paterni"""
-        query = AnalyticsLog.query
-        
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
-        
-        hourly_stats = query.with_entities(
-            func.extract('hour', AnalyticsLog.access_timestamp).label('hour'),
-            func.count(AnalyticsLog.id).label('access_count'),
-            func.count(func.distinct(AnalyticsLog.user_id)).label('unique_users')
-        ).group_by(
-            func.extract('hour', AnalyticsLog.access_timestamp)
-        ).order_by('hour').all()
+    @analytics_cache.cached()
+    def get_hourly_usage_pattern(self, start_date=None, end_date=None, exact=False):
+        """Saatlik kullanım paterni: erişimler saatlik özetlerden"""
+        access_counts = self.rollups.aggregate(start_date, end_date, ('hour',))
+        unique_users = self._unique_users_by_time(start_date, end_date, 'hour', exact)
         
         return [
             {
-                'hour': int(stat.hour),
-                'access_count': stat.access_count,
-                'unique_users': stat.unique_users
+                'hour': hour,
+                'access_count': access_counts[(hour,)]['event_count'],
+                'unique_users': unique_users.get(hour, 0)
             }
-            for stat in hourly_stats
+            for hour in sorted(hour for (hour,) in access_counts)
         ]
     
-    def get_daily_usage_trend(self, days=30):
-        """Günlük kullanım trendi"""
+    @analytics_cache.cached(range_of=lambda args: (datetime.utcnow() - timedelta(days=args['days']), None))
+    def get_daily_usage_trend(self, days=30, exact=False):
+        """Günlük kullanım trendi: erişim ve tekil kaynak sayıları özetlerden"""
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        query = AnalyticsLog.query.filter(
-            and_(
-                AnalyticsLog.access_timestamp >= start_date,
-                AnalyticsLog.access_timestamp <= end_date
-            )
-        )
-        
-        daily_stats = query.with_entities(
-            func.date(AnalyticsLog.access_timestamp).label('date'),
-            func.count(AnalyticsLog.id).label('access_count'),
-            func.count(func.distinct(AnalyticsLog.user_id)).label('unique_users'),
-            func.count(func.distinct(AnalyticsLog.resource_name)).label('unique_resources')
-        ).group_by(
-            func.date(AnalyticsLog.access_timestamp)
-        ).order_by('date').all()
+        daily_resources = self.rollups.aggregate(start_date, end_date, ('date', 'resource_name'))
+        access_counts = defaultdict(int)
+        unique_resources = defaultdict(int)
+        for (day, _), measures in daily_resources.items():
+            access_counts[day] += measures['event_count']
+            unique_resources[day] += 1
+        unique_users = self._unique_users_by_time(start_date, end_date, 'date', exact)
         
         return [
             {
-                'date': stat.date.isoformat(),
-                'access_count': stat.access_count,
-                'unique_users': stat.unique_users,
-                'unique_resources': stat.unique_resources
+                'date': day.isoformat(),
+                'access_count': access_counts[day],
+                'unique_users': unique_users.get(day, 0),
+                'unique_resources': unique_resources[day]
             }
-            for stat in daily_stats
+            for day in sorted(access_counts)
         ]
     
+    @analytics_cache.cached()
     def get_failed_access_analysis(self, start_date=None, end_date=None):
         """Başarısız erişim analizi"""
         query = AnalyticsLog.query.filter(AnalyticsLog.auth_success == False)
+        query = self.filtered_query(start_date, end_date, query=query)
         
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
-        
-        failure_stats = query.with_entities(
+        failure_stats = self.fetch(query.with_entities(
             AnalyticsLog.auth_failure_reason,
             AnalyticsLog.denial_reason,
             func.count(AnalyticsLog.id).label('failure_count'),
@@ -252,7 +308,7 @@ class AnalyticsService:
         ).group_by(
             AnalyticsLog.auth_failure_reason,
             AnalyticsLog.denial_reason
-        ).order_by(desc('failure_count')).all()
+        ).order_by(desc('failure_count')), start_date, end_date)
         
         return [
             {
@@ -264,27 +320,27 @@ class AnalyticsService:
             for stat in failure_stats
         ]
     
-    def get_geographic_usage_report(self, start_date=None, end_date=None):
+    @analytics_cache.cached()
+    def get_geographic_usage_report(self, start_date=None, end_date=None, exact=False):
         """Coğrafi kullanım raporu"""
         query = AnalyticsLog.query.filter(AnalyticsLog.country.isnot(None))
+        query = self.filtered_query(start_date, end_date, query=query)
         
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
+        if not exact:
+            report = self._try_sketches(self._approximate_geographic_usage_report, query, start_date, end_date)
+            if report is not None:
+                return report
         
-        geo_stats = query.with_entities(
+        geo_stats = self.fetch(query.with_entities(
             AnalyticsLog.country,
             AnalyticsLog.region,
             AnalyticsLog.city,
-            func.count(AnalyticsLog.id).label('access_count'),
-            func.count(func.distinct(AnalyticsLog.user_id)).label('unique_users'),
-            func.count(func.distinct(AnalyticsLog.ip_address)).label('unique_ips')
+            *self.measures('access_count', 'unique_users', 'unique_ips')
         ).group_by(
             AnalyticsLog.country,
             AnalyticsLog.region,
             AnalyticsLog.city
-        ).order_by(desc('access_count')).all()
+        ).order_by(desc('access_count')), start_date, end_date)
         
         return [
             {
@@ -298,16 +354,41 @@ class AnalyticsService:
             for stat in geo_stats
         ]
     
+    def _approximate_geographic_usage_report(self, query, start_date, end_date):
+        """Erişim sayıları ham loglardan (DISTINCT'siz), tekil kullanıcı/IP'ler sketch'lerden"""
+        unique_users = self.sketches.unique_counts('users', start_date, end_date, dimension='geo')
+        unique_ips = self.sketches.unique_counts('ips', start_date, end_date, dimension='geo')
+        
+        geo_stats = self.fetch(query.with_entities(
+            AnalyticsLog.country,
+            AnalyticsLog.region,
+            AnalyticsLog.city,
+            *self.measures('access_count')
+        ).group_by(
+            AnalyticsLog.country,
+            AnalyticsLog.region,
+            AnalyticsLog.city
+        ).order_by(desc('access_count')), start_date, end_date)
+        
+        return [
+            {
+                'country': stat.country,
+                'region': stat.region,
+                'city': stat.city,
+                'access_count': stat.access_count,
+                'unique_users': unique_users.get(geo_value(stat.country, stat.region, stat.city), 0),
+                'unique_ips': unique_ips.get(geo_value(stat.country, stat.region, stat.city), 0)
+            }
+            for stat in geo_stats
+        ]
+    
+    @analytics_cache.cached()
     def get_turn_away_analysis(self, start_date=None, end_date=None):
         """Erişim reddi analizi (Turn-away analysis)"""
         query = AnalyticsLog.query.filter(AnalyticsLog.access_denied == True)
+        query = self.filtered_query(start_date, end_date, query=query)
         
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
-        
-        turn_away_stats = query.with_entities(
+        turn_away_stats = self.fetch(query.with_entities(
             AnalyticsLog.resource_name,
             AnalyticsLog.denial_reason,
             func.count(AnalyticsLog.id).label('denial_count'),
@@ -315,7 +396,7 @@ class AnalyticsService:
         ).group_by(
             AnalyticsLog.resource_name,
             AnalyticsLog.denial_reason
-        ).order_by(desc('denial_count')).all()
+        ).order_by(desc('denial_count')), start_date, end_date)
         
         return [
             {
@@ -327,26 +408,23 @@ class AnalyticsService:
             for stat in turn_away_stats
         ]
     
-    def get_custom_breakdown_report(self, breakdown_field, start_date=None, end_date=None):
+    @analytics_cache.cached()
+    def get_custom_breakdown_report(self, breakdown_field, start_date=None, end_date=None, exact=False):
         """Özelleştirilebilir kırılım raporu"""
-        query = AnalyticsLog.query
-        
-        if start_date:
-            query = query.filter(AnalyticsLog.access_timestamp >= start_date)
-        if end_date:
-            query = query.filter(AnalyticsLog.access_timestamp <= end_date)
+        query = self.filtered_query(start_date, end_date)
         
         # Dinamik alan seçimi
         field = getattr(AnalyticsLog, breakdown_field, None)
         if not field:
             return []
         
-        breakdown_stats = query.with_entities(
+        if breakdown_field in ROLLUP_DIMENSIONS:
+            return self._rollup_breakdown_report(breakdown_field, field, query, start_date, end_date, exact)
+        
+        breakdown_stats = self.fetch(query.with_entities(
             field,
-            func.count(AnalyticsLog.id).label('access_count'),
-            func.count(func.distinct(AnalyticsLog.user_id)).label('unique_users'),
-            func.count(func.distinct(AnalyticsLog.resource_name)).label('unique_resources')
-        ).group_by(field).order_by(desc('access_count')).all()
+            *self.measures('access_count', 'unique_users', 'unique_resources')
+        ).group_by(field).order_by(desc('access_count')), start_date, end_date)
         
         return [
             {
@@ -357,3 +435,45 @@ class AnalyticsService:
             }
             for stat in breakdown_stats
         ]
+    
+    def _rollup_breakdown_report(self, breakdown_field, field, query, start_date, end_date, exact):
+        """Özet boyutlarından biriyle kırılım: sayımlar özetlerden, tekil kullanıcılar exact=False iken sketch'lerden"""
+        groups = self.rollups.aggregate(start_date, end_date, (breakdown_field, 'resource_name'))
+        access_counts = defaultdict(int)
+        unique_resources = defaultdict(int)
+        for (value, _), measures in groups.items():
+            access_counts[value] += measures['event_count']
+            unique_resources[value] += 1
+        
+        sketched = None
+        if not exact and self.sketches.supports('users', breakdown_field):
+            sketched = self._try_sketches(
+                self.sketches.unique_counts, 'users', start_date, end_date, dimension=breakdown_field
+            )
+        if sketched is not None:
+            # Sketch'lerde NULL değerler '' olarak tutulur
+            unique_users = {value or None: count for value, count in sketched.items()}
+        else:
+            user_stats = self.fetch(query.with_entities(
+                field,
+                *self.measures('unique_users')
+            ).group_by(field), start_date, end_date)
+            unique_users = {value: count for value, count in user_stats}
+        
+        return [
+            {
+                'breakdown_value': value,
+                'access_count': access_counts[value],
+                'unique_users': unique_users.get(value, 0),
+                'unique_resources': unique_resources[value]
+            }
+            for value in sorted(access_counts, key=access_counts.get, reverse=True)
+        ]
+    
+    def _try_sketches(self, method, *args, **kwargs):
+        """Tahmini yolu dene; sketch'ler yoksa ya da Redis hata verirse None (kesin yola dön)"""
+        try:
+            return method(*args, **kwargs)
+        except (SketchesUnavailable, RedisError) as e:
+            print(f"Using exact analytics counts: {str(e)}")
+            return None
@@ -0,0 +1,294 @@
+import calendar
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models.analytics_log import AnalyticsLog
+
+SKETCH_STATE_NAME = 'analytics_sketches'
+KEY_PREFIX = 'analytics:hll'
+# Sketch'lerin güncel olduğunu gösteren işaret. Anahtar düzeni değiştiğinde
+# adı değişir; işaret yoksa sketch'ler baştan kurulur.
+MARKER_KEY = f'{KEY_PREFIX}:v2:last_id'
+
+# (aile, boyut, tutulan kovalar). Aile, tekil sayılan kolondur; boyut verilen
+# sketch'ler boyutun her değeri için ayrı tutulur.
+SKETCHES = (
+    ('users', None, ('hour', 'day')),
+    ('users', 'department', ('day',)),
+    ('users', 'account_type', ('day',)),
+    ('users', 'country', ('day',)),
+    ('users', 'geo', ('day',)),
+    ('ips', 'geo', ('day',)),
+)
+FAMILY_COLUMNS = {'users': AnalyticsLog.user_id, 'ips': AnalyticsLog.ip_address}
+
+
+class SketchesUnavailable(Exception):
+    """Sketch'ler kapalı, Redis'te yok ya da istenen kırılım için tutulmuyor"""
+
+
+def geo_value(country, region, city):
+    """Coğrafi kırılım anahtarı (country|region|city)"""
+    return f"{country or ''}|{region or ''}|{city or ''}"
+
+
+def parse_geo_value(value):
+    country, region, city = value.split('|', 2)
+    return country or None, region or None, city or None
+
+
+class AnalyticsSketchStore:
+    """Redis HyperLogLog tabanlı tekil sayım sketch'leri.
+
+    Rollup refresh'i her saat ve gün kovası için kullanıcı ve IP sketch'lerine
+    PFADD yapar. Bir aralığın tekil sayısı, aralıktaki kovaların sketch'leri
+    üzerinde tek bir PFCOUNT ile (birleşim) hesaplanır; hizalanmamış kenarların
+    değerleri geçici bir sketch'e eklenip aynı PFCOUNT'a katılır. Tahminler
+    HLL'in ~%0.81 standart hatasına sahiptir.
+
+    Her sketch ve günlük boyut değeri kümesi, kovası
+    ``ANALYTICS_HLL_RETENTION_DAYS`` günden eskiye düşünce Redis'te
+    kendiliğinden silinir (EXPIREAT); bu sınırdan eski aralıklar kesin
+    sorgulara bırakılır. Boyutlu sorgularda yalnızca o gün görülmüş değerlerin
+    sketch'leri okunur; gereken anahtar sayısı ``ANALYTICS_HLL_MAX_KEYS``'i
+    aşarsa yine kesin sorguya dönülür.
+    """
+
+    def __init__(self, rollups):
+        self.rollups = rollups
+
+    def client(self):
+        from app import redis_client
+        if not current_app.config.get('ANALYTICS_HLL_ENABLED', True) or redis_client is None:
+            raise SketchesUnavailable('HyperLogLog sketches are disabled')
+        return redis_client
+
+    def retention(self):
+        return timedelta(days=current_app.config.get('ANALYTICS_HLL_RETENTION_DAYS', 400))
+
+    def cutoff(self):
+        """Sketch'i tutulan en eski gün"""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - self.retention()
+
+    def expires_at(self, granularity, bucket):
+        end = bucket + (timedelta(hours=1) if granularity == 'hour' else timedelta(days=1))
+        return calendar.timegm((end + self.retention()).timetuple())
+
+    def values_key(self, family, dimension, day):
+        return f"{KEY_PREFIX}:values:{family}:{dimension}:{day.strftime('%Y%m%d')}"
+
+    def key(self, family, granularity, bucket, dimension=None, value=None):
+        stamp = bucket.strftime('%Y%m%d%H' if granularity == 'hour' else '%Y%m%d')
+        if dimension is None:
+            return f"{KEY_PREFIX}:{family}:{granularity}:{stamp}"
+        return f"{KEY_PREFIX}:{family}:{dimension}:{value}:{granularity}:{stamp}"
+
+    def supports(self, family, dimension=None, granularity='day'):
+        return any(
+            f == family and d == dimension and granularity in granularities
+            for f, d, granularities in SKETCHES
+        )
+
+    # Yazma tarafı
+
+    def needs_rebuild(self, last_id):
+        """Redis boşaltıldıysa (işaret anahtarı yoksa) sketch'ler baştan kurulmalı"""
+        return last_id > 0 and self.client().get(MARKER_KEY) is None
+
+    def add_id_range(self, low_id, high_id):
+        """(low_id, high_id] aralığındaki ham logları sketch'lere ekle"""
+        bucket = self.rollups._hour_bucket(AnalyticsLog.access_timestamp)
+        rows = db.session.query(
+            bucket, AnalyticsLog.user_id, AnalyticsLog.ip_address, AnalyticsLog.department,
+            AnalyticsLog.account_type, AnalyticsLog.country, AnalyticsLog.region, AnalyticsLog.city
+        ).filter(
+            AnalyticsLog.id > low_id, AnalyticsLog.id <= high_id,
+            AnalyticsLog.access_timestamp.isnot(None)
+        ).distinct().all()
+
+        cutoff = self.cutoff()
+        members = defaultdict(set)
+        expiry = {}
+        values = defaultdict(set)
+        for hour_bucket, user_id, ip_address, department, account_type, country, region, city in rows:
+            hour = self.rollups._parse_bucket(hour_bucket)
+            day = hour.replace(hour=0)
+            if day < cutoff:
+                # Saklama süresini geçmiş kovalar (yeniden kurulumda) yazılmaz
+                continue
+            dimensions = {
+                'department': department or '',
+                'account_type': account_type or '',
+                'country': country or '',
+                # Coğrafi rapor yalnızca ülkesi bilinen kayıtları içerir
+                'geo': geo_value(country, region, city) if country else None
+            }
+            for family, dimension, granularities in SKETCHES:
+                member = user_id if family == 'users' else ip_address
+                if member is None:
+                    continue
+                value = dimensions[dimension] if dimension else None
+                if dimension and value is None:
+                    continue
+                for granularity in granularities:
+                    bucket = hour if granularity == 'hour' else day
+                    key = self.key(family, granularity, bucket, dimension, value)
+                    members[key].add(member)
+                    expiry[key] = self.expires_at(granularity, bucket)
+                if dimension:
+                    values[(family, dimension, day)].add(value)
+
+        pipe = self.client().pipeline(transaction=False)
+        for key, key_members in members.items():
+            pipe.pfadd(key, *key_members)
+            pipe.expireat(key, expiry[key])
+        for (family, dimension, day), dimension_values in values.items():
+            key = self.values_key(family, dimension, day)
+            pipe.sadd(key, *dimension_values)
+            pipe.expireat(key, self.expires_at('day', day))
+        pipe.set(MARKER_KEY, high_id)
+        pipe.execute()
+
+    # Okuma tarafı
+
+    def unique_counts(self, family, start_date, end_date, dimension=None, values=None, group_by_time=None, filters=None):
+        """Tekil sayıları {grup: tahmin} olarak döndür.
+
+        Grup, ``dimension`` verilmişse boyut değeri, ``group_by_time`` 'hour' ise
+        günün saati, 'date' ise gün, hiçbiri yoksa None'dır. ``filters`` yalnızca
+        ham kenar sorgularına uygulanır ve sketch boyutuyla aynı olmalıdır.
+        """
+        granularity = 'hour' if group_by_time == 'hour' else ('day' if dimension else None)
+        for needed in (['hour'] if granularity == 'hour' else ['day'] if dimension else ['hour', 'day']):
+            if not self.supports(family, dimension, needed):
+                raise SketchesUnavailable(f'No {needed} sketches for {family} by {dimension}')
+
+        client = self.client()
+        if client.get(MARKER_KEY) is None:
+            raise SketchesUnavailable('HyperLogLog sketches are not built')
+
+        aligned, raw = self.rollups.plan_range(start_date, end_date, granularity, state_name=SKETCH_STATE_NAME)
+        buckets = [
+            (bucket_granularity, bucket)
+            for bucket_granularity, low, high in aligned
+            for bucket in self._buckets(bucket_granularity, low, high)
+        ]
+
+        day_values = {}
+        if dimension and values is None:
+            # Her gün için yalnızca o gün görülmüş değerler
+            days = [bucket for _, bucket in buckets]
+            pipe = client.pipeline(transaction=False)
+            for day in days:
+                pipe.smembers(self.values_key(family, dimension, day))
+            for day, members in zip(days, pipe.execute()):
+                day_values[day] = [value.decode() if isinstance(value, bytes) else value for value in members]
+
+        def group_of(bucket, value):
+            if dimension:
+                return value
+            if group_by_time == 'hour':
+                return bucket.hour
+            if group_by_time == 'date':
+                return bucket.date()
+            return None
+
+        keys = defaultdict(list)
+        key_count = 0
+        max_keys = current_app.config.get('ANALYTICS_HLL_MAX_KEYS', 50000)
+        for bucket_granularity, bucket in buckets:
+            bucket_values = (day_values.get(bucket, []) if values is None else values) if dimension else [None]
+            key_count += len(bucket_values)
+            if key_count > max_keys:
+                raise SketchesUnavailable(f'Range needs more than {max_keys} sketches')
+            for value in bucket_values:
+                keys[group_of(bucket, value)].append(self.key(family, bucket_granularity, bucket, dimension, value))
+
+        edge_members = defaultdict(set)
+        for bucket, value, member in self._raw_members(family, dimension, raw, filters):
+            edge_members[group_of(bucket, value)].add(member)
+
+        groups = list(set(keys) | set(edge_members))
+        temp_prefix = f"{KEY_PREFIX}:tmp:{uuid.uuid4().hex}"
+        pipe = client.pipeline(transaction=False)
+        for index, group in enumerate(groups):
+            group_keys = list(keys.get(group, []))
+            if edge_members.get(group):
+                temp_key = f"{temp_prefix}:{index}"
+                pipe.pfadd(temp_key, *edge_members[group])
+                pipe.expire(temp_key, 60)
+                group_keys.append(temp_key)
+            pipe.pfcount(*group_keys)
+
+        results = iter(pipe.execute())
+
+        counts = {}
+        for group in groups:
+            if edge_members.get(group):
+                # pfadd ve expire cevaplarını atla
+                next(results)
+                next(results)
+            count = int(next(results))
+            if count:
+                counts[group] = count
+
+        temp_keys = [f"{temp_prefix}:{index}" for index, group in enumerate(groups) if edge_members.get(group)]
+        if temp_keys:
+            client.delete(*temp_keys)
+        return counts
+
+    def _buckets(self, granularity, low, high):
+        if low is None:
+            # Alt sınırsız aralık: sketch'lerin tutulduğu ilk günden başla
+            state_start = db.session.query(func.min(AnalyticsLog.access_timestamp)).scalar()
+            if state_start is None:
+                return
+            low = state_start.replace(minute=0, second=0, microsecond=0)
+            if granularity == 'day':
+                low = low.replace(hour=0)
+        if low < self.cutoff():
+            raise SketchesUnavailable('Range starts before the sketch retention')
+        step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+        bucket = low
+        while bucket < high:
+            yield bucket
+            bucket += step
+
+    def _raw_members(self, family, dimension, raw_ranges, filters):
+        """Kenar aralıklarındaki (kova, boyut değeri, üye) üçlüleri"""
+        member_column = FAMILY_COLUMNS[family]
+        bucket = self.rollups._hour_bucket(AnalyticsLog.access_timestamp)
+        if dimension == 'geo':
+            dimension_columns = [AnalyticsLog.country, AnalyticsLog.region, AnalyticsLog.city]
+        elif dimension:
+            dimension_columns = [getattr(AnalyticsLog, dimension)]
+        else:
+            dimension_columns = []
+
+        for low, high, high_inclusive in raw_ranges:
+            query = db.session.query(bucket, member_column, *dimension_columns)\
+                .filter(member_column.isnot(None))
+            if dimension == 'geo':
+                query = query.filter(AnalyticsLog.country.isnot(None))
+            if low is not None:
+                query = query.filter(AnalyticsLog.access_timestamp >= low)
+            if high is not None:
+                query = query.filter(
+                    AnalyticsLog.access_timestamp <= high if high_inclusive else AnalyticsLog.access_timestamp < high
+                )
+            for key, value in (filters or {}).items():
+                if value:
+                    query = query.filter(getattr(AnalyticsLog, key) == value)
+
+            for row in query.distinct().all():
+                if dimension == 'geo':
+                    value = geo_value(*row[2:5])
+                elif dimension:
+                    value = row[2] or ''
+                else:
+                    value = None
+                yield self.rollups._parse_bucket(row[0]), value, row[1]
@@ -1,5 +1,8 @@
 from app.models.user import User
 from app import db
+from app.services.user_cache import user_cache
+from app.services.token_service import token_versions
+from app.services.password_hasher import password_hasher
 
 class AuthService:
     """Authentication service for user management"""
@@ -12,6 +15,11 @@ class AuthService:
         ).first()
         
         if user and user.check_password(password):
+            # Upgrade hashes made with an outdated cost factor while we
+            # still have the plain password
+            if password_hasher.needs_rehash(user.password_hash):
+                user.set_password(password)
+                db.session.commit()
             return user
         
         return None
@@ -53,11 +61,16 @@ class AuthService:
         
         # Update allowed fields
         allowed_fields = ['first_name', 'last_name', 'email', 'is_active', 'is_admin']
+        claims_before = (user.is_active, user.is_admin)
         for field, value in kwargs.items():
             if field in allowed_fields and hasattr(user, field):
                 setattr(user, field, value)
         
         db.session.commit()
+        user_cache.invalidate(user.id)
+        # Tokens carry is_active/is_admin claims: revoke them when those change
+        if (user.is_active, user.is_admin) != claims_before:
+            token_versions.revoke(user.id)
         return user
     
     def deactivate_user(self, user_id):
@@ -69,6 +82,8 @@ class AuthService:
         
         user.is_active = False
         db.session.commit()
+        user_cache.invalidate(user.id)
+        token_versions.revoke(user.id)
         
         return user
     
@@ -81,5 +96,7 @@ class AuthService:
         
         user.is_active = True
         db.session.commit()
+        user_cache.invalidate(user.id)
+        token_versions.revoke(user.id)
         
         return user
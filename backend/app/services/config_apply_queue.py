@@ -0,0 +1,237 @@
+import atexit
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from types import SimpleNamespace
+from flask import current_app
+from redis.exceptions import RedisError
+
+# A journal change waiting to be applied to HAProxy. `journal` is a detached
+# snapshot, so it can be applied from the queue thread after the request ended.
+JournalChange = namedtuple('JournalChange', ['journal', 'previous_proxy_path'])
+
+# Generation counters shared by every worker process
+PENDING_KEY = 'haproxy:generation:pending'
+UNAPPLIED_KEY = 'haproxy:generation:unapplied'
+STATUS_KEY = 'haproxy:generation:status'
+
+
+def snapshot_journal(journal, **overrides):
+    """Copy the fields HAProxy needs from a Journal into a detached object"""
+    fields = {
+        'id': journal.id,
+        'slug': journal.slug,
+        'proxy_path': journal.proxy_path,
+        'base_url': journal.base_url,
+        'custom_headers': journal.custom_headers,
+        'timeout': journal.timeout,
+        'is_active': journal.is_active
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+class ConfigApplyQueue:
+    """Debounced, coalescing queue in front of HAProxy config applies.
+
+    Every submitted change takes the next ``pending_generation``. Changes are
+    coalesced per journal and applied together once no new change arrived for
+    ``debounce`` seconds, or at the latest ``max_delay`` seconds after the first
+    pending change. A flush is one regeneration plus at most one reload. With
+    ``debounce == 0`` changes are applied inline.
+
+    Each gunicorn worker runs its own queue, so the generations live in Redis:
+    ``pending_generation`` is an INCR counter and every generation stays in an
+    "unapplied" sorted set until the worker that queued it has applied it.
+    ``applied_generation`` is the generation just below the oldest unapplied
+    one, so a client knows its change is live on every worker's HAProxy view
+    once ``applied_generation`` reaches the generation it was given.
+    Generations of a worker that died before flushing are dropped from the set
+    after ``stale_after`` seconds. Without Redis the counters fall back to
+    per-process values.
+    """
+
+    def __init__(self, apply_func, debounce=0.5, max_delay=5.0, stale_after=300):
+        self.apply_func = apply_func
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.stale_after = stale_after
+        self._cond = threading.Condition()
+        self._apply_lock = threading.Lock()
+        self._pending = {}  # journal_id -> JournalChange
+        self._generations = []  # generations coalesced into _pending
+        self._failed = []  # generations of failed flushes, settled by the next success
+        self._first_at = None
+        self._last_at = None
+        self._app = None
+        self._thread = None
+        # Per-process fallback when Redis is unavailable
+        self._local_pending = 0
+        self._local_unapplied = set()
+        self._local_status = {'last_applied_at': None, 'last_error': None}
+
+    def client(self):
+        from app import redis_client
+        return redis_client
+
+    # Shared generation counters
+
+    def _next_generation(self):
+        try:
+            client = self.client()
+            generation = client.incr(PENDING_KEY)
+            client.zadd(UNAPPLIED_KEY, {str(generation): time.time()})
+            return generation
+        except (RedisError, AttributeError) as e:
+            print(f"Using per-process HAProxy generations: {str(e)}")
+            self._local_pending += 1
+            self._local_unapplied.add(self._local_pending)
+            return self._local_pending
+
+    def _settle(self, generations, error=None):
+        """Record the outcome of a flush covering ``generations``"""
+        status = {'last_error': error}
+        if error is None:
+            status['last_applied_at'] = datetime.utcnow().isoformat()
+        try:
+            pipe = self.client().pipeline(transaction=False)
+            if error is None and generations:
+                pipe.zrem(UNAPPLIED_KEY, *[str(generation) for generation in generations])
+            pipe.hset(STATUS_KEY, mapping={key: value or '' for key, value in status.items()})
+            pipe.execute()
+        except (RedisError, AttributeError) as e:
+            print(f"Failed to record HAProxy generations in Redis: {str(e)}")
+        if error is None:
+            self._local_unapplied.difference_update(generations)
+        self._local_status.update(status)
+
+    def _shared_status(self):
+        """(pending, oldest unapplied or None, status hash); local values without Redis"""
+        try:
+            client = self.client()
+            client.zremrangebyscore(UNAPPLIED_KEY, '-inf', time.time() - self.stale_after)
+            pipe = client.pipeline(transaction=False)
+            pipe.get(PENDING_KEY)
+            pipe.zrange(UNAPPLIED_KEY, 0, -1)
+            pipe.hgetall(STATUS_KEY)
+            pending, unapplied, status = pipe.execute()
+            return (
+                int(pending or 0),
+                min((int(generation) for generation in unapplied), default=None),
+                {key.decode(): value.decode() or None for key, value in status.items()}
+            )
+        except (RedisError, AttributeError) as e:
+            print(f"Using per-process HAProxy generations: {str(e)}")
+            return self._local_pending, min(self._local_unapplied, default=None), dict(self._local_status)
+
+    @property
+    def pending_generation(self):
+        return self._shared_status()[0]
+
+    @property
+    def applied_generation(self):
+        pending, oldest_unapplied, _ = self._shared_status()
+        return pending if oldest_unapplied is None else oldest_unapplied - 1
+
+    def submit(self, change):
+        """Queue a journal change and return the generation that will include it"""
+        generation = self._next_generation()
+        with self._cond:
+            previous = self._pending.get(change.journal.id)
+            if previous:
+                # Keep the oldest path so the runtime driver can drop its map entry
+                change = change._replace(previous_proxy_path=previous.previous_proxy_path)
+            self._pending[change.journal.id] = change
+            self._generations.append(generation)
+
+            now = time.monotonic()
+            self._first_at = self._first_at or now
+            self._last_at = now
+            self._app = current_app._get_current_object()
+
+            if self.debounce > 0:
+                self._ensure_worker()
+                self._cond.notify()
+                return generation
+
+        self.flush()
+        return generation
+
+    def flush(self):
+        """Apply everything pending right now; returns False if the apply failed"""
+        with self._apply_lock:
+            with self._cond:
+                if not self._pending:
+                    return True
+                changes = list(self._pending.values())
+                generations = self._generations
+                app = self._app
+                self._pending = {}
+                self._generations = []
+                self._first_at = self._last_at = None
+
+            try:
+                with app.app_context():
+                    success = self.apply_func(changes)
+            except Exception as e:
+                success = False
+                print(f"Failed to apply {len(changes)} queued HAProxy changes: {str(e)}")
+
+            if success:
+                # A successful apply regenerates the whole config, which also
+                # covers the changes of earlier failed flushes
+                self._settle(generations + self._failed)
+                self._failed = []
+            else:
+                self._failed.extend(generations)
+                self._settle(generations, error=f"Generation {max(generations)} failed to apply")
+            return success
+
+    def status(self):
+        """Generation counters for API responses"""
+        pending, oldest_unapplied, status = self._shared_status()
+        with self._cond:
+            pending_changes = len(self._pending)
+        return {
+            'pending_generation': pending,
+            'applied_generation': pending if oldest_unapplied is None else oldest_unapplied - 1,
+            'pending_changes': pending_changes,
+            'last_applied_at': status.get('last_applied_at'),
+            'last_error': status.get('last_error')
+        }
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='haproxy-apply-queue', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Wait out the debounce window, capped by the maximum delay
+                while self._pending:
+                    deadline = min(self._last_at + self.debounce, self._first_at + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+
+
+def _apply_with_proxy_service(changes):
+    from app.services.proxy_service import ProxyService
+    return ProxyService().apply_journal_changes(changes)
+
+
+config_apply_queue = ConfigApplyQueue(
+    _apply_with_proxy_service,
+    debounce=int(os.environ.get('HAPROXY_APPLY_DEBOUNCE_MS', 500)) / 1000,
+    max_delay=int(os.environ.get('HAPROXY_APPLY_MAX_DELAY_MS', 5000)) / 1000
+)
+
+# Do not lose queued changes when the worker exits
+atexit.register(config_apply_queue.flush)
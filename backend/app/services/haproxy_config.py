@@ -0,0 +1,230 @@
+import os
+import threading
+from urllib.parse import urlparse
+from app import db
+from app.models.journal import Journal
+
+HAPROXY_CONFIG_HEADER = """global
+    daemon
+    log stdout local0
+    stats socket {stats_socket} mode 660 level admin
+    stats timeout 30s
+
+defaults
+    mode http
+    log global
+    option httplog
+    option dontlognull
+    option forwardfor
+    timeout connect 5000
+    timeout client 50000
+    timeout server 50000
+
+# Stats page
+listen stats
+    bind *:8404
+    stats enable
+    stats uri /stats
+    stats refresh 30s
+    stats admin if TRUE
+
+# Frontend for LibProxy
+frontend libproxy_frontend
+    bind *:80
+
+    # CORS headers for all responses
+    http-after-response set-header Access-Control-Allow-Origin "http://localhost:3000"
+    http-after-response set-header Access-Control-Allow-Methods "GET, POST, PUT, DELETE, OPTIONS"
+    http-after-response set-header Access-Control-Allow-Headers "Content-Type, Authorization"
+    http-after-response set-header Access-Control-Allow-Credentials "true"
+
+    # Handle preflight OPTIONS requests
+    acl is_options method OPTIONS
+    http-request return status 200 if is_options
+
+    # Handle favicon.ico requests
+    acl is_favicon path /favicon.ico
+    http-request return status 204 if is_favicon
+
+    # Dynamic journal proxy rules: one lookup in the path -> backend map
+    use_backend %[path,map_beg({map_path})] if {{ path,map_beg({map_path}) -m found }}
+
+    default_backend libproxy_backend
+
+# Backend for LibProxy API
+backend libproxy_backend
+    balance roundrobin
+    option httpchk GET /api/health
+    http-check expect status 200
+
+    # Backend servers
+    server libproxy_api backend:5000 check
+
+# Dynamic backend configurations for journals
+"""
+
+HAPROXY_SLOT_BACKEND = """
+backend {name}
+    mode http
+    balance roundrobin
+    # /proxy_path -> /, /proxy_path/xyz -> /xyz
+    http-request replace-path ^/[^/]+/?(.*)$ /\\1
+    # CORS headers for journal responses
+    http-after-response set-header Access-Control-Allow-Origin "http://localhost:3000"
+    http-after-response set-header Access-Control-Allow-Methods "GET, POST, PUT, DELETE, OPTIONS"
+    http-after-response set-header Access-Control-Allow-Headers "Content-Type, Authorization"
+    http-after-response set-header Access-Control-Allow-Credentials "true"
+    server-template srv 1 0.0.0.0:80 disabled
+    timeout server {timeout}s"""
+
+
+class HAProxyConfigGenerator:
+    """Incremental HAProxy configuration generator.
+
+    Rendered map entries and backend blocks are cached per journal and keyed
+    by (id, updated_at). Each refresh only reads the narrow (id, updated_at)
+    column pair, re-renders journals whose key changed and splices the cached
+    fragments back into the configuration and the map document.
+
+    Routing is a single ``map_beg`` rule over a ``proxy_path -> backend`` map
+    file, so the frontend does not grow with the catalog. The document also
+    pre-provisions ``slot_count`` empty slot backends that
+    HAProxyRuntimeDriver points map entries at to apply journal changes
+    without a reload.
+    """
+
+    # Number of journals loaded per query when re-rendering changed rows
+    LOAD_CHUNK_SIZE = 500
+
+    def __init__(self, stats_socket, map_path, slot_count, slot_timeout=30):
+        self.stats_socket = stats_socket
+        self.map_path = map_path
+        self.slot_count = slot_count
+        self.slot_timeout = slot_timeout
+        self._lock = threading.Lock()
+        self._fragments = {}  # journal_id -> (updated_at, map_entry, backend_config)
+        self._document = None
+        self._map_document = None
+        # Last document written to disk, so unchanged documents are not rewritten
+        self.last_written = None
+
+    def render_map_entry(self, journal):
+        """Render the path -> backend map line for a journal"""
+        return f"/{journal.proxy_path} {journal.slug}_backend"
+
+    def render_backend_config(self, journal):
+        """Render HAProxy backend configuration for a journal with CORS and path rewriting"""
+        # Extract host and port from URL
+        parsed = urlparse(journal.base_url)
+        host = parsed.hostname
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        ssl_config = "ssl verify none" if parsed.scheme == 'https' else ""
+
+        # Path rewriting logic
+        path_rewrite_rules = []
+        if journal.proxy_path:
+            # Handle root path: /proxy_path -> /
+            path_rewrite_rules.append(f'    http-request set-path "/" if {{ path -m str "/{journal.proxy_path}" }}')
+            # Handle sub paths: /proxy_path/xyz -> /xyz
+            path_rewrite_rules.append(f'    http-request set-path %[path,regsub(^/{journal.proxy_path}/,/)] if {{ path -m beg "/{journal.proxy_path}/" }}')
+
+        backend_config = f"""
+backend {journal.slug}_backend
+    mode http
+    balance roundrobin
+{chr(10).join(path_rewrite_rules)}
+    # CORS headers for journal responses
+    http-after-response set-header Access-Control-Allow-Origin "http://localhost:3000"
+    http-after-response set-header Access-Control-Allow-Methods "GET, POST, PUT, DELETE, OPTIONS"
+    http-after-response set-header Access-Control-Allow-Headers "Content-Type, Authorization"
+    http-after-response set-header Access-Control-Allow-Credentials "true"
+    server {journal.slug}_server {host}:{port} {ssl_config}
+    timeout server {journal.timeout}s"""
+
+        # Add custom headers if configured
+        if journal.custom_headers:
+            for header, value in journal.custom_headers.items():
+                backend_config += f"\n    http-request set-header {header} {value}"
+
+        return backend_config
+
+    def refresh(self):
+        """Bring the cached document in line with the active journals and return it"""
+        with self._lock:
+            current = dict(
+                db.session.query(Journal.id, Journal.updated_at)
+                .filter(Journal.is_active == True)
+                .all()
+            )
+
+            removed = [journal_id for journal_id in self._fragments if journal_id not in current]
+            for journal_id in removed:
+                del self._fragments[journal_id]
+
+            stale = [
+                journal_id for journal_id, updated_at in current.items()
+                if journal_id not in self._fragments or self._fragments[journal_id][0] != updated_at
+            ]
+            for start in range(0, len(stale), self.LOAD_CHUNK_SIZE):
+                chunk = stale[start:start + self.LOAD_CHUNK_SIZE]
+                for journal in Journal.query.filter(Journal.id.in_(chunk)).all():
+                    self._fragments[journal.id] = (
+                        journal.updated_at,
+                        self.render_map_entry(journal),
+                        self.render_backend_config(journal)
+                    )
+
+            if removed or stale or self._document is None:
+                self._document, self._map_document = self._splice()
+
+            return self._document
+
+    @property
+    def map_document(self):
+        """Map file content matching the last refreshed configuration"""
+        return self._map_document
+
+    def invalidate(self, journal_id=None):
+        """Drop cached fragments for one journal, or all of them"""
+        with self._lock:
+            if journal_id is None:
+                self._fragments.clear()
+            else:
+                self._fragments.pop(journal_id, None)
+            self._document = None
+            self._map_document = None
+
+    @property
+    def journal_count(self):
+        """Number of journals in the cached document"""
+        return len(self._fragments)
+
+    def _splice(self):
+        """Join the cached fragments into the configuration and map documents"""
+        fragments = [self._fragments[journal_id] for journal_id in sorted(self._fragments)]
+        header = HAPROXY_CONFIG_HEADER.format(
+            stats_socket=self.stats_socket,
+            map_path=self.map_path
+        )
+        config = (
+            header
+            + "\n".join(fragment[2] for fragment in fragments) + "\n"
+            + "\n# Runtime slots for journals changed since the last reload"
+            + self._render_slot_backends() + "\n"
+        )
+        map_document = "".join(f"{fragment[1]}\n" for fragment in fragments)
+        return config, map_document
+
+    def _render_slot_backends(self):
+        return "\n".join(
+            HAPROXY_SLOT_BACKEND.format(name=f"journal_slot_{n}", timeout=self.slot_timeout)
+            for n in range(1, self.slot_count + 1)
+        )
+
+
+# Shared by every ProxyService instance in this worker process
+config_generator = HAProxyConfigGenerator(
+    stats_socket=os.environ.get('HAPROXY_SOCKET', '/run/haproxy/admin.sock'),
+    map_path=os.environ.get('HAPROXY_JOURNAL_MAP', '/usr/local/etc/haproxy/maps/journals.map'),
+    slot_count=int(os.environ.get('HAPROXY_RUNTIME_SLOTS', 32))
+)
@@ -0,0 +1,274 @@
+import os
+import re
+import socket
+import sys
+import time
+from datetime import datetime
+from app import db
+from app.models.journal import Journal
+from app.models.access_log import access_log_writer
+
+# HAProxy "option httplog" line. A syslog header ("<134>Oct 10 ... haproxy[7]:")
+# may precede it, so the pattern is searched rather than matched.
+HTTPLOG_PATTERN = re.compile(
+    r'(?P<client_ip>[0-9a-fA-F.:]+):\d+ '
+    r'\[(?P<accept_date>[^\]]+)\] '
+    r'\S+ '  # frontend
+    r'(?P<backend>[^/\s]+)/(?P<server>\S+) '  # backend/server
+    r'-?\d+/-?\d+/-?\d+/-?\d+/\+?(?P<ta>-?\d+) '  # TR/Tw/Tc/Tr/Ta
+    r'(?P<status>-?\d+) '
+    r'\+?(?P<bytes>\d+) '
+    r'\S+ \S+ \S+ \S+ \S+ '  # cookies, termination state, connection and queue counters
+    r'(?:\{[^}]*\} )*'  # captured headers
+    r'"(?P<method>[A-Z]+) (?P<uri>\S+)'
+)
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+}
+
+# Backends that are not journals (API traffic, the React app, stats). Requests
+# that matched no backend are logged under the frontend's name.
+IGNORED_BACKENDS = frozenset(('libproxy_backend', 'frontend_backend', 'libproxy_frontend', 'stats'))
+
+# Server name of requests that never reached a server (denied, redirected, 503)
+NO_SERVER = '<NOSRV>'
+
+
+def parse_accept_date(value):
+    """Parse "10/Oct/2026:13:55:36.123" by slicing instead of strptime"""
+    return datetime(
+        int(value[7:11]), MONTHS[value[3:6]], int(value[0:2]),
+        int(value[12:14]), int(value[15:17]), int(value[18:20]),
+        int(value[21:24]) * 1000 if len(value) > 20 else 0
+    )
+
+
+class JournalLookup:
+    """Cached backend name / proxy path -> journal id resolution.
+
+    Backends generated for a journal are named ``<slug>_backend``. Requests
+    served from a runtime slot (``journal_slot_<n>``) are resolved through the
+    first path segment instead. The first miss for a backend/path pair reloads
+    the cache right away, so a journal added after the last reload is found;
+    further misses for the same pair reload at most once every
+    ``reload_interval`` seconds.
+    """
+
+    # Bound on remembered misses; unknown names are often junk traffic
+    MAX_MISSES = 10000
+
+    def __init__(self, reload_interval=30):
+        self.reload_interval = reload_interval
+        self._by_slug = {}
+        self._by_path = {}
+        self._misses = {}  # (backend, first path segment) -> last reload for it
+
+    def reload(self):
+        rows = db.session.query(Journal.id, Journal.slug, Journal.proxy_path).all()
+        self._by_slug = {slug: journal_id for journal_id, slug, _ in rows}
+        self._by_path = {proxy_path.strip('/'): journal_id for journal_id, _, proxy_path in rows}
+
+    def resolve(self, backend, path):
+        """Return the journal id for a log line, or None"""
+        journal_id = self._lookup(backend, path)
+        if journal_id is not None:
+            return journal_id
+
+        key = (backend, self._segment(path))
+        now = time.monotonic()
+        last_reload = self._misses.get(key)
+        if last_reload is not None and now - last_reload < self.reload_interval:
+            return None
+
+        self.reload()
+        journal_id = self._lookup(backend, path)
+        if journal_id is None:
+            if len(self._misses) >= self.MAX_MISSES:
+                self._misses.clear()
+            self._misses[key] = now
+        else:
+            self._misses.pop(key, None)
+        return journal_id
+
+    @staticmethod
+    def _segment(path):
+        return path[1:].split('/', 1)[0]
+
+    def _lookup(self, backend, path):
+        if backend.endswith('_backend'):
+            journal_id = self._by_slug.get(backend[:-8])
+            if journal_id is not None:
+                return journal_id
+        # Slot backends (and anything else) are routed by the path prefix
+        return self._by_path.get(self._segment(path))
+
+
+class HAProxyLogIngester:
+    """Parses HAProxy httplog lines and bulk loads them into access_logs.
+
+    Rows are collected into batches of ``batch_size`` and written with the
+    access log writer at least every ``flush_interval`` seconds. Lines that do
+    not parse, or that belong to a journal backend that cannot be resolved,
+    are appended to ``dead_letter_path`` with the reason.
+    """
+
+    def __init__(self, dead_letter_path, batch_size=1000, flush_interval=1.0, lookup=None):
+        self.dead_letter_path = dead_letter_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lookup = lookup or JournalLookup()
+        self._batch = []
+        self._last_flush = time.monotonic()
+        self._dead_letter = None
+        self.stats = {'lines': 0, 'ingested': 0, 'skipped': 0, 'dead_lettered': 0, 'failed': 0}
+
+    def parse_line(self, line):
+        """Turn one log line into an access log row; returns (row, error)"""
+        match = HTTPLOG_PATTERN.search(line)
+        if match is None:
+            return None, 'unparsable'
+
+        backend = match.group('backend')
+        if backend in IGNORED_BACKENDS or match.group('server') == NO_SERVER:
+            return None, None
+
+        uri = match.group('uri')
+        path, _, query = uri.partition('?')
+        journal_id = self.lookup.resolve(backend, path)
+        if journal_id is None:
+            return None, f'unknown journal backend {backend}'
+
+        try:
+            timestamp = parse_accept_date(match.group('accept_date'))
+        except (KeyError, ValueError):
+            return None, 'bad accept date'
+
+        ta = int(match.group('ta'))
+        return {
+            'user_id': None,
+            'journal_id': journal_id,
+            'proxy_config_id': None,
+            'ip_address': match.group('client_ip'),
+            'user_agent': None,
+            'referer': None,
+            'request_method': match.group('method'),
+            'request_path': path[:500],
+            'request_query': query[:1000] or None,
+            'session_id': None,
+            'request_id': None,
+            'response_status': int(match.group('status')),
+            'response_size': int(match.group('bytes')),
+            'response_time': float(ta) if ta >= 0 else None,
+            'timestamp': timestamp
+        }, None
+
+    def feed(self, line):
+        """Process one raw line"""
+        line = line.rstrip('\r\n')
+        if not line:
+            return
+        self.stats['lines'] += 1
+
+        row, error = self.parse_line(line)
+        if row is not None:
+            self._batch.append(row)
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+        elif error is not None:
+            self._dead_letter_line(line, error)
+        else:
+            self.stats['skipped'] += 1
+
+    def tick(self):
+        """Flush if the batch has been waiting longer than flush_interval"""
+        if self._batch and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the current batch"""
+        batch, self._batch = self._batch, []
+        self._last_flush = time.monotonic()
+        if not batch:
+            return
+        if access_log_writer.write_batch(batch):
+            self.stats['ingested'] += len(batch)
+        else:
+            self.stats['failed'] += len(batch)
+
+    def close(self):
+        self.flush()
+        if self._dead_letter is not None:
+            self._dead_letter.close()
+            self._dead_letter = None
+
+    def consume(self, lines):
+        """Ingest from an iterator of lines; None items mean "idle", used to flush"""
+        try:
+            for line in lines:
+                if line is not None:
+                    self.feed(line)
+                self.tick()
+        finally:
+            self.close()
+
+    def _dead_letter_line(self, line, reason):
+        if self._dead_letter is None:
+            directory = os.path.dirname(self.dead_letter_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._dead_letter = open(self.dead_letter_path, 'a', encoding='utf-8')
+        self._dead_letter.write(f"{reason}\t{line}\n")
+        self._dead_letter.flush()
+        self.stats['dead_lettered'] += 1
+
+
+def read_file(path, follow=False, poll_interval=0.5):
+    """Yield lines from a file; with follow, keep tailing it across rotations"""
+    handle = open(path, 'r', encoding='utf-8', errors='replace')
+    inode = os.fstat(handle.fileno()).st_ino
+    try:
+        while True:
+            line = handle.readline()
+            if line:
+                yield line
+                continue
+            if not follow:
+                return
+            yield None
+            time.sleep(poll_interval)
+            try:
+                if os.stat(path).st_ino != inode:
+                    # Rotated: drain nothing more from the old file, reopen the new one
+                    handle.close()
+                    handle = open(path, 'r', encoding='utf-8', errors='replace')
+                    inode = os.fstat(handle.fileno()).st_ino
+            except FileNotFoundError:
+                pass
+    finally:
+        handle.close()
+
+
+def read_stdin():
+    """Yield lines from standard input (e.g. "docker logs -f haproxy")"""
+    for line in sys.stdin:
+        yield line
+
+
+def read_udp(address, idle_timeout=0.5):
+    """Yield syslog datagrams received on a UDP "host:port" address"""
+    host, port = address.rsplit(':', 1)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, int(port)))
+    sock.settimeout(idle_timeout)
+    try:
+        while True:
+            try:
+                data, _ = sock.recvfrom(65535)
+            except socket.timeout:
+                yield None
+                continue
+            yield data.decode('utf-8', errors='replace')
+    finally:
+        sock.close()
@@ -0,0 +1,218 @@
+import socket
+from urllib.parse import urlparse
+
+# How HAProxy's CLI error replies begin. Successful commands answer with an
+# empty line or a status line ("New server registered.", "IP changed from
+# ..."), so only the start of the reply is checked: backend, server and map
+# key names elsewhere in a reply must not read as errors.
+RUNTIME_ERROR_PREFIXES = (
+    'no such', 'unknown', 'require', 'permission denied', 'invalid', "can't",
+    'cannot', 'unable', 'missing', 'not found', 'key not found', 'entry not found',
+    'out of memory', 'backend must', "'", '[alert]'
+)
+
+
+def is_error_response(response):
+    """Check whether a runtime API reply reports a failure"""
+    return response.lstrip().lower().startswith(RUNTIME_ERROR_PREFIXES)
+
+
+class HAProxyRuntimeError(Exception):
+    """Raised when HAProxy rejects a runtime API command"""
+
+
+class HAProxyRuntimeClient:
+    """Minimal client for the HAProxy Runtime API (stats socket).
+
+    The address is either a UNIX socket path or a ``host:port`` pair, so the
+    client can be pointed at a local fake server.
+    """
+
+    def __init__(self, address, timeout=2.0):
+        self.address = address
+        self.timeout = timeout
+
+    def _connect(self):
+        if self.address.startswith('/') or ':' not in self.address:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            target = self.address
+        else:
+            host, port = self.address.rsplit(':', 1)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            target = (host, int(port))
+        sock.settimeout(self.timeout)
+        sock.connect(target)
+        return sock
+
+    def execute(self, command):
+        """Send a single command and return the raw response text"""
+        with self._connect() as s:
+            s.sendall(command.encode('utf-8') + b"\n")
+            chunks = []
+            while True:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        return b"".join(chunks).decode('utf-8', errors='replace')
+
+    def command(self, command):
+        """Send a command and raise HAProxyRuntimeError if HAProxy rejects it"""
+        response = self.execute(command)
+        if is_error_response(response):
+            raise HAProxyRuntimeError(f"{command!r}: {response.strip()}")
+        return response
+
+    def is_available(self):
+        """Check whether the runtime socket accepts connections"""
+        try:
+            with self._connect():
+                return True
+        except OSError:
+            return False
+
+
+class HAProxyRuntimeDriver:
+    """Applies journal changes to a running HAProxy without a reload.
+
+    The generated configuration routes every request through a path -> backend
+    map and pre-provisions ``slot_count`` slot backends (``journal_slot_<n>``),
+    each holding a disabled ``server-template`` server. A changed journal is
+    moved into a free slot: the slot server gets the journal's address and is
+    enabled, and the journal's map entry is pointed at the slot. Slots in use
+    are read back from ``show map``, so every worker sees the same state. Whenever a change
+    cannot be expressed this way (no free slot, or the journal needs rules
+    that slot backends do not have) ``apply`` returns False and the caller
+    falls back to a full reload, which resets the map.
+    """
+
+    SLOT_PREFIX = 'journal_slot_'
+    PLAIN_SERVER = 'srv1'  # from "server-template srv 1 ..."
+    TLS_SERVER = 'srv_tls'  # added on demand with "add server ... ssl"
+
+    def __init__(self, client, map_path, slot_count, slot_timeout=30):
+        self.client = client
+        self.map_path = map_path
+        self.slot_count = slot_count
+        self.slot_timeout = slot_timeout
+
+    def slot_names(self):
+        """Names of all pre-provisioned slot backends"""
+        return [f"{self.SLOT_PREFIX}{n}" for n in range(1, self.slot_count + 1)]
+
+    def is_eligible(self, journal):
+        """Check whether a journal can be served from a generic slot backend"""
+        return (
+            bool(journal.proxy_path)
+            and '/' not in journal.proxy_path
+            and not journal.custom_headers
+            and (journal.timeout or self.slot_timeout) == self.slot_timeout
+        )
+
+    def show_map(self):
+        """Return the routing map as a {path: backend} dict"""
+        response = self.client.execute(f"show map {self.map_path}")
+        if is_error_response(response):
+            raise HAProxyRuntimeError(f"show map {self.map_path}: {response.strip()}")
+
+        entries = {}
+        for line in response.splitlines():
+            # Format: "<entry id> <key> <value>"
+            parts = line.split()
+            if len(parts) == 3:
+                entries[parts[1]] = parts[2]
+        return entries
+
+    def apply(self, journal, previous_proxy_path=None):
+        """Apply an added, updated or disabled journal; False means a reload is needed"""
+        try:
+            if not journal.is_active:
+                return self.remove(journal)
+
+            if not self.is_eligible(journal):
+                return False
+
+            entries = self.show_map()
+            path = f"/{journal.proxy_path}"
+            old_path = f"/{previous_proxy_path.lstrip('/')}" if previous_proxy_path else None
+
+            slot = self._slot_of(entries.get(path)) or self._slot_of(entries.get(old_path))
+            if slot is None:
+                used = {backend for backend in entries.values() if self._slot_of(backend)}
+                slot = next((name for name in self.slot_names() if name not in used), None)
+                if slot is None:
+                    # Slot pool exhausted
+                    return False
+
+            self._point_slot(slot, journal.base_url)
+
+            if path in entries:
+                self.client.command(f"set map {self.map_path} {path} {slot}")
+            else:
+                self.client.command(f"add map {self.map_path} {path} {slot}")
+
+            if old_path and old_path != path and old_path in entries:
+                self.client.command(f"del map {self.map_path} {old_path}")
+
+            return True
+
+        except (OSError, HAProxyRuntimeError) as e:
+            print(f"HAProxy runtime apply failed for journal {journal.slug}: {str(e)}")
+            return False
+
+    def remove(self, journal, proxy_path=None):
+        """Stop routing a disabled or deleted journal"""
+        try:
+            path = f"/{(proxy_path or journal.proxy_path).lstrip('/')}"
+            entries = self.show_map()
+            if path in entries:
+                slot = self._slot_of(entries[path])
+                if slot:
+                    self._disable_slot(slot)
+                self.client.command(f"del map {self.map_path} {path}")
+            return True
+
+        except (OSError, HAProxyRuntimeError) as e:
+            print(f"HAProxy runtime removal failed for journal {journal.slug}: {str(e)}")
+            return False
+
+    def _slot_of(self, backend):
+        """Return the backend name if it is a runtime slot"""
+        if backend and backend.startswith(self.SLOT_PREFIX):
+            return backend
+        return None
+
+    def _point_slot(self, slot, base_url):
+        """Point a slot's server at the journal upstream and enable it"""
+        parsed = urlparse(base_url)
+        use_ssl = parsed.scheme == 'https'
+        port = parsed.port or (443 if use_ssl else 80)
+        address = self._resolve(parsed.hostname, port)
+
+        active, inactive = (self.TLS_SERVER, self.PLAIN_SERVER) if use_ssl else (self.PLAIN_SERVER, self.TLS_SERVER)
+        try:
+            self.client.command(f"set server {slot}/{active} addr {address} port {port}")
+        except HAProxyRuntimeError:
+            if not use_ssl:
+                raise
+            # First TLS journal in this slot: register the TLS server
+            self.client.command(f"add server {slot}/{active} {address}:{port} ssl verify none")
+
+        self.client.command(f"enable server {slot}/{active}")
+        self._quiet(f"disable server {slot}/{inactive}")
+
+    def _disable_slot(self, slot):
+        self._quiet(f"disable server {slot}/{self.PLAIN_SERVER}")
+        self._quiet(f"disable server {slot}/{self.TLS_SERVER}")
+
+    def _quiet(self, command):
+        """Run a command whose failure is expected in some states (e.g. unknown server)"""
+        try:
+            self.client.command(command)
+        except HAProxyRuntimeError:
+            pass
+
+    def _resolve(self, host, port):
+        """Resolve a hostname, since "set server addr" only accepts IP addresses"""
+        infos = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM)
+        return infos[0][4][0]
@@ -0,0 +1,272 @@
+import bisect
+import functools
+import operator
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from redis.exceptions import RedisError
+from app.services.journal_search import search_tokens
+
+VERSION_KEY = 'journals:catalog:version'
+CHANGES_KEY = 'journals:catalog:changes'
+
+# Relevance of a query word found in each field
+FIELD_WEIGHTS = {'name': 3, 'publisher': 2, 'description': 1}
+
+# Bumps the version and stamps the changed journal ids with it atomically,
+# so a reader that sees a version also sees every id changed up to it
+_BUMP_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+for _, journal_id in ipairs(ARGV) do
+    redis.call('ZADD', KEYS[2], version, journal_id)
+end
+return version
+"""
+
+
+def normalize_token(token):
+    """Case- and accent-insensitive form of a word ('Öğrenme' -> 'ogrenme')"""
+    decomposed = unicodedata.normalize('NFKD', token.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_issn(value):
+    return (value or '').replace('-', '').strip().upper()
+
+
+def popcount(bitmap):
+    return bin(bitmap).count('1')
+
+
+class CatalogIndex:
+    """Immutable search index over a snapshot of journal dicts.
+
+    Every journal gets a bit position; sets of journals are Python int
+    bitmaps, so filters are intersections with ``&`` and facet counts are
+    popcounts. Words are kept in a sorted list per field, so each query word
+    matches as a prefix with a bisect.
+    """
+
+    def __init__(self, journals):
+        self.journals = sorted(journals, key=lambda j: (j['name'] or '').casefold())
+        self.all = (1 << len(self.journals)) - 1
+        self.active = 0
+        self.access_levels = defaultdict(int)
+        self.subjects = defaultdict(int)
+        self.issns = defaultdict(int)
+        self.words = {field: defaultdict(int) for field in FIELD_WEIGHTS}
+
+        for position, journal in enumerate(self.journals):
+            bit = 1 << position
+            if journal['is_active']:
+                self.active |= bit
+            self.access_levels[journal['access_level']] |= bit
+            for subject in journal['subject_areas'] or ():
+                self.subjects[subject] |= bit
+            for issn in (journal['issn'], journal['e_issn']):
+                if issn:
+                    self.issns[normalize_issn(issn)] |= bit
+            for field, words in self.words.items():
+                for token in search_tokens(journal[field]):
+                    words[normalize_token(token)] |= bit
+
+        self.sorted_words = {field: sorted(words) for field, words in self.words.items()}
+
+    def _prefix_bitmap(self, field, prefix):
+        words = self.sorted_words[field]
+        bitmap = 0
+        index = bisect.bisect_left(words, prefix)
+        while index < len(words) and words[index].startswith(prefix):
+            bitmap |= self.words[field][words[index]]
+            index += 1
+        return bitmap
+
+    def match(self, query_text=None, publisher=None, issn=None, subject_areas=(),
+              subject_match='all', access_level=None, active_only=True):
+        """Bitmap of journals matching every given filter, plus per-word field hits"""
+        bitmap = self.active if active_only else self.all
+        word_hits = []
+        for token in search_tokens(query_text):
+            prefix = normalize_token(token)
+            hits = {field: self._prefix_bitmap(field, prefix) for field in FIELD_WEIGHTS}
+            bitmap &= hits['name'] | hits['publisher'] | hits['description']
+            word_hits.append(hits)
+
+        if issn:
+            bitmap &= self.issns.get(normalize_issn(issn), 0)
+        if subject_areas and subject_match == 'any':
+            bitmap &= functools.reduce(
+                operator.or_, (self.subjects.get(subject, 0) for subject in subject_areas)
+            )
+        else:
+            for subject in subject_areas:
+                bitmap &= self.subjects.get(subject, 0)
+        if access_level:
+            bitmap &= self.access_levels.get(access_level, 0)
+        if publisher:
+            needle = publisher.casefold()
+            bitmap &= sum(
+                1 << position for position in self.positions(bitmap)
+                if needle in (self.journals[position]['publisher'] or '').casefold()
+            )
+        return bitmap, word_hits
+
+    def positions(self, bitmap):
+        position = 0
+        while bitmap:
+            if bitmap & 1:
+                yield position
+            bitmap >>= 1
+            position += 1
+
+    def ranked(self, bitmap, word_hits, limit=None):
+        """Journals in ``bitmap``, best match first (by name without a query)"""
+        def score(position):
+            bit = 1 << position
+            return sum(
+                max((FIELD_WEIGHTS[field] for field, hits in word.items() if hits & bit), default=0)
+                for word in word_hits
+            )
+
+        positions = list(self.positions(bitmap))
+        if word_hits:
+            # sorted() is stable, so equal scores stay in name order
+            positions.sort(key=score, reverse=True)
+        return [self.journals[position] for position in positions[:limit]]
+
+    def facets(self, bitmap):
+        """Subject area and access level counts within ``bitmap``"""
+        return {
+            'subject_areas': {
+                subject: count for subject, count in sorted(
+                    (subject, popcount(bits & bitmap)) for subject, bits in self.subjects.items()
+                ) if count
+            },
+            'access_level': {
+                level: count for level, count in sorted(
+                    (level, popcount(bits & bitmap)) for level, bits in self.access_levels.items()
+                ) if count
+            }
+        }
+
+
+class JournalCatalog:
+    """Per-process, in-memory journal catalog for search and facet counts.
+
+    The catalog is small and read-mostly, so each worker keeps every journal
+    (as ``Journal.to_dict``) in a CatalogIndex instead of querying the
+    database per search. JournalService writes call ``bump`` with the changed
+    ids; that increments a version counter in Redis and stamps the ids with
+    the new version. Before answering, a worker compares its version with
+    Redis and reloads only the journals changed since then, rebuilding the
+    index in memory and swapping it in, so readers never see a half-updated
+    index. If the Redis version went backwards, or Redis is unreachable and
+    the catalog is older than ``max_age`` seconds, everything is reloaded.
+    """
+
+    def __init__(self, max_age=300):
+        self.enabled = False
+        self.max_age = max_age
+        self._index = None
+        self._rows = {}
+        self._version = None
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    def init_app(self, app):
+        """Read settings from the app config"""
+        self.enabled = app.config.get('JOURNAL_CATALOG_ENABLED', self.enabled)
+        self.max_age = app.config.get('JOURNAL_CATALOG_MAX_AGE', self.max_age)
+
+    def client(self):
+        from app import redis_client
+        return redis_client
+
+    # Write side
+
+    def bump(self, *journal_ids):
+        """Record that ``journal_ids`` changed; call after the commit"""
+        client = self.client()
+        if client is None:
+            return None
+        try:
+            return client.eval(_BUMP_SCRIPT, 2, VERSION_KEY, CHANGES_KEY, *journal_ids)
+        except RedisError as e:
+            print(f"Journal catalog version was not bumped: {str(e)}")
+            return None
+
+    # Read side
+
+    def index(self):
+        """Current CatalogIndex, refreshed if journals changed; None when disabled"""
+        if not self.enabled:
+            return None
+        if self._refresh_lock.acquire(blocking=self._index is None):
+            try:
+                self._refresh()
+            finally:
+                self._refresh_lock.release()
+        return self._index
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'journals': len(self._rows),
+            'version': self._version,
+            'full_loads': self.full_loads,
+            'incremental_loads': self.incremental_loads
+        }
+
+    def _refresh(self):
+        try:
+            version, changes = self._remote_changes()
+        except RedisError as e:
+            if self._index is None or time.monotonic() - self._loaded_at > self.max_age:
+                print(f"Journal catalog version unavailable, reloading: {str(e)}")
+                self._load_all(None)
+            return
+
+        if self._index is None or self._version is None or version < self._version:
+            self._load_all(version)
+        elif version > self._version:
+            self._load_changed([int(journal_id) for journal_id in changes], version)
+
+    def _remote_changes(self):
+        client = self.client()
+        if client is None:
+            raise RedisError('Redis is not configured')
+        pipe = client.pipeline(transaction=True)
+        pipe.get(VERSION_KEY)
+        pipe.zrangebyscore(CHANGES_KEY, f'({self._version or 0}', '+inf')
+        version, changes = pipe.execute()
+        return int(version or 0), changes
+
+    def _load_all(self, version):
+        from app.models.journal import Journal
+        self._rows = {journal.id: journal.to_dict() for journal in Journal.query.all()}
+        self._swap(version)
+        self.full_loads += 1
+
+    def _load_changed(self, journal_ids, version):
+        from app.models.journal import Journal
+        rows = dict(self._rows)
+        for journal_id in journal_ids:
+            rows.pop(journal_id, None)
+        if journal_ids:
+            for journal in Journal.query.filter(Journal.id.in_(journal_ids)).all():
+                rows[journal.id] = journal.to_dict()
+        self._rows = rows
+        self._swap(version)
+        self.incremental_loads += 1
+
+    def _swap(self, version):
+        self._index = CatalogIndex(self._rows.values())
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+
+# Per-process journal catalog behind /api/journals/search, configured by create_app
+journal_catalog = JournalCatalog()
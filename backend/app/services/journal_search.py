@@ -0,0 +1,135 @@
+import re
+from sqlalchemy import and_, func, literal_column, or_, select, text, true, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB, array
+from app import db
+from app.models.journal import Journal
+
+# Text search configuration of journals.search_vector. 'simple' does no
+# stemming or stop-word removal, which suits mixed Turkish/English titles.
+TS_CONFIG = 'simple'
+
+# bm25() weights for the FTS5 columns (name, description, publisher)
+FTS5_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+SUBJECT_MATCH_MODES = ('all', 'any')
+
+
+def search_tokens(query_text):
+    """Words of a search box entry; punctuation and operators are dropped"""
+    return _TOKEN.findall(query_text or '')
+
+
+def apply_text_search(query, query_text):
+    """Filter a Journal query by ``query_text`` and order it by relevance.
+
+    PostgreSQL matches the GIN-indexed ``search_vector`` (name, publisher and
+    description, every word as a prefix) and, through pg_trgm, names similar
+    to the text or names/publishers containing it, so typos and partial words
+    still hit an index. Results are ranked by ts_rank plus name similarity.
+    SQLite uses the journals_fts FTS5 table ranked by bm25; other databases
+    fall back to ILIKE.
+    """
+    tokens = search_tokens(query_text)
+    if not tokens:
+        return query
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return _postgres_search(query, query_text, tokens)
+    if dialect == 'sqlite':
+        return _sqlite_search(query, tokens)
+
+    pattern = f'%{query_text}%'
+    return query.filter(
+        Journal.name.ilike(pattern) |
+        Journal.description.ilike(pattern) |
+        Journal.publisher.ilike(pattern)
+    ).order_by(Journal.name)
+
+
+def _postgres_search(query, query_text, tokens):
+    search_vector = literal_column('journals.search_vector')
+    tsquery = func.to_tsquery(TS_CONFIG, ' & '.join(f'{token}:*' for token in tokens))
+    pattern = f'%{query_text}%'
+
+    rank = func.ts_rank(search_vector, tsquery) + func.similarity(Journal.name, query_text)
+    return query.filter(or_(
+        search_vector.op('@@')(tsquery),
+        Journal.name.op('%')(query_text),
+        Journal.name.ilike(pattern),
+        Journal.publisher.ilike(pattern)
+    )).order_by(rank.desc(), Journal.name)
+
+
+def _sqlite_search(query, tokens):
+    match = ' '.join('"{}"*'.format(token) for token in tokens)
+    weights = ', '.join(str(w) for w in FTS5_WEIGHTS)
+    matches = select(
+        literal_column('rowid').label('journal_id'),
+        literal_column(f'bm25(journals_fts, {weights})').label('rank')
+    ).select_from(text('journals_fts'))\
+        .where(text('journals_fts MATCH :journal_search').bindparams(journal_search=match))\
+        .subquery()
+
+    # bm25 scores are negative; the best match has the lowest score
+    return query.join(matches, matches.c.journal_id == Journal.id)\
+        .order_by(matches.c.rank, Journal.name)
+
+
+def subject_filter(subjects, match='all'):
+    """Condition for journals tagged with all (or any) of ``subjects``.
+
+    On PostgreSQL this is JSONB containment (@>) or key-exists-any (?|),
+    both served by the GIN index on subject_areas. SQLite looks the
+    subjects up with json_each.
+    """
+    subjects = list(dict.fromkeys(subject for subject in subjects if subject))
+    if match not in SUBJECT_MATCH_MODES:
+        raise ValueError(f"Subject match must be one of {', '.join(SUBJECT_MATCH_MODES)}")
+    if not subjects:
+        return true()
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        column = type_coerce(Journal.subject_areas, JSONB)
+        if match == 'any':
+            return column.has_any(array(subjects))
+        return column.contains(subjects)
+
+    if dialect == 'sqlite':
+        elements = func.json_each(Journal.subject_areas).table_valued('value')
+        found = select(func.count(func.distinct(elements.c.value)))\
+            .where(elements.c.value.in_(subjects))\
+            .scalar_subquery()
+        return found > 0 if match == 'any' else found == len(subjects)
+
+    conditions = [Journal.subject_areas.contains([subject]) for subject in subjects]
+    return or_(*conditions) if match == 'any' else and_(*conditions)
+
+
+def subject_counts(query):
+    """{subject area: journal count} over a Journal query, in one grouped query"""
+    dialect = db.engine.dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        counts = {}
+        for (subjects,) in query.order_by(None).with_entities(Journal.subject_areas):
+            for subject in set(subjects or ()):
+                counts[subject] = counts.get(subject, 0) + 1
+        return dict(sorted(counts.items()))
+
+    if dialect == 'postgresql':
+        # A JSON null or scalar would make jsonb_array_elements_text fail
+        query = query.filter(func.jsonb_typeof(type_coerce(Journal.subject_areas, JSONB)) == 'array')
+        elements = func.jsonb_array_elements_text(Journal.subject_areas).table_valued('value')
+    else:
+        elements = func.json_each(Journal.subject_areas).table_valued('value')
+
+    rows = query.order_by(None)\
+        .join(elements, true())\
+        .with_entities(elements.c.value, func.count(func.distinct(Journal.id)))\
+        .group_by(elements.c.value)\
+        .order_by(elements.c.value)\
+        .all()
+    return {subject: count for subject, count in rows if subject is not None}
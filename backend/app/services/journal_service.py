@@ -4,6 +4,9 @@ from app.models.journal import Journal
 from app.models.proxy_config import ProxyConfig
 from app.models.access_log import AccessLog
 from app.services.proxy_service import ProxyService
+from app.services.journal_search import apply_text_search, subject_filter
+from app.services.journal_catalog import journal_catalog
+from app.services.config_apply_queue import config_apply_queue, JournalChange, snapshot_journal
 
 class JournalService:
     """Service for journal management and access control"""
@@ -31,18 +34,13 @@ class JournalService:
         
         db.session.add(journal)
         db.session.commit()
+        journal_catalog.bump(journal.id)
         
         # Automatically update HAProxy configuration with all active journals
         try:
-            success = self.proxy_service.update_main_haproxy_config()
-            if success:
-                # Reload HAProxy to apply changes
-                self.proxy_service.reload_haproxy()
-                print(f"HAProxy configuration automatically updated for new journal: {journal.slug}")
-            else:
-                print(f"Warning: Failed to update HAProxy config for journal {journal.slug}")
+            self.queue_proxy_update(journal)
         except Exception as e:
-            print(f"Warning: Failed to update HAProxy config for journal {journal.slug}: {str(e)}")
+            print(f"Warning: Failed to queue HAProxy config update for journal {journal.slug}: {str(e)}")
         
         return journal
     
@@ -61,22 +59,21 @@ class JournalService:
             'subject_areas'
         ]
         
+        previous_proxy_path = journal.proxy_path
+        
         for field, value in kwargs.items():
             if field in allowed_fields and hasattr(journal, field):
                 setattr(journal, field, value)
         
         journal.updated_at = datetime.utcnow()
         db.session.commit()
+        journal_catalog.bump(journal.id)
         
         # Automatically update HAProxy configuration when journal is updated
         try:
-            success = self.proxy_service.update_main_haproxy_config()
-            if success:
-                # Reload HAProxy to apply changes
-                self.proxy_service.reload_haproxy()
-                print(f"HAProxy configuration automatically updated for journal update: {journal.slug}")
+            self.queue_proxy_update(journal, previous_proxy_path=previous_proxy_path)
         except Exception as e:
-            print(f"Warning: Failed to update HAProxy config for journal update {journal.slug}: {str(e)}")
+            print(f"Warning: Failed to queue HAProxy config update for journal update {journal.slug}: {str(e)}")
         
         return journal
     
@@ -90,6 +87,8 @@ class JournalService:
         if permanent:
             # Permanent delete - remove from database completely
             journal_slug = journal.slug  # Store for logging
+            # Detached snapshot for the HAProxy runtime removal
+            removed_journal = snapshot_journal(journal, is_active=False)
             
             # First remove any related proxy configs
             from app.models.proxy_config import ProxyConfig
@@ -102,15 +101,13 @@ class JournalService:
             # Remove the journal itself
             db.session.delete(journal)
             db.session.commit()
+            journal_catalog.bump(journal_id)
             
             # Update HAProxy configuration after permanent deletion
             try:
-                success = self.proxy_service.update_main_haproxy_config()
-                if success:
-                    self.proxy_service.reload_haproxy()
-                    print(f"HAProxy configuration automatically updated for permanent journal deletion: {journal_slug}")
+                config_apply_queue.submit(JournalChange(removed_journal, None))
             except Exception as e:
-                print(f"Warning: Failed to update HAProxy config for permanent journal deletion {journal_slug}: {str(e)}")
+                print(f"Warning: Failed to queue HAProxy config update for permanent journal deletion {journal_slug}: {str(e)}")
             
             return True
         else:
@@ -118,24 +115,29 @@ class JournalService:
             journal.is_active = False
             journal.updated_at = datetime.utcnow()
             db.session.commit()
+            journal_catalog.bump(journal.id)
             
             # Automatically update HAProxy configuration when journal is soft deleted
             try:
-                success = self.proxy_service.update_main_haproxy_config()
-                if success:
-                    # Reload HAProxy to apply changes
-                    self.proxy_service.reload_haproxy()
-                    print(f"HAProxy configuration automatically updated for journal soft deletion: {journal.slug}")
+                self.queue_proxy_update(journal)
             except Exception as e:
-                print(f"Warning: Failed to update HAProxy config for journal soft deletion {journal.slug}: {str(e)}")
+                print(f"Warning: Failed to queue HAProxy config update for journal soft deletion {journal.slug}: {str(e)}")
             
             return journal
     
+    def queue_proxy_update(self, journal, previous_proxy_path=None):
+        """Queue a journal change for HAProxy; returns the generation that will include it"""
+        change = JournalChange(snapshot_journal(journal), previous_proxy_path)
+        return config_apply_queue.submit(change)
+    
     def delete_multiple_journals(self, journal_ids, permanent=False):
         """Delete multiple journals by their IDs"""
         deleted_count = 0
         errors = []
         
+        # Every deletion lands in the same apply-queue window, so the batch
+        # costs one HAProxy regeneration and at most one reload
+        
         for journal_id in journal_ids:
             try:
                 result = self.delete_journal(journal_id, permanent=permanent)
@@ -149,7 +151,8 @@ class JournalService:
         return {
             'deleted_count': deleted_count,
             'total_requested': len(journal_ids),
-            'errors': errors
+            'errors': errors,
+            'proxy_generation': config_apply_queue.pending_generation
         }
     
     def get_latest_journals(self, limit=5):
@@ -217,7 +220,7 @@ class JournalService:
             raise e
     
     def log_access(self, journal_id, user_id, ip_address, request_data=None, response_data=None):
-        """Log journal access"""
+        """Queue a journal access log row; None if it was dropped under load"""
         try:
             access_log = AccessLog.log_access(
                 user_id=user_id,
@@ -266,16 +269,14 @@ class JournalService:
         query = Journal.query.filter_by(is_active=True)
         
         if query_text:
-            query = query.filter(
-                Journal.name.ilike(f'%{query_text}%') |
-                Journal.description.ilike(f'%{query_text}%') |
-                Journal.publisher.ilike(f'%{query_text}%')
-            )
+            query = apply_text_search(query, query_text)
         
         if filters:
             if 'subject_areas' in filters:
-                for subject in filters['subject_areas']:
-                    query = query.filter(Journal.subject_areas.contains([subject]))
+                query = query.filter(subject_filter(
+                    filters['subject_areas'],
+                    match=filters.get('subject_match', 'all')
+                ))
             
             if 'access_level' in filters:
                 query = query.filter(Journal.access_level == filters['access_level'])
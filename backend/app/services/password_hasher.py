@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import bcrypt
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing pool is saturated; the request should be retried later (503)"""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds, prefix=b'2b')).decode('utf-8')
+
+
+def _check(password, password_hash):
+    try:
+        return bcrypt.checkpw(password, password_hash)
+    except ValueError:
+        # Malformed or empty stored hash
+        return False
+
+
+def hash_cost(password_hash):
+    """Cost factor of a stored bcrypt hash ($2b$<cost>$...), or None"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def calibrate(target_ms, samples=3):
+    """Highest cost whose hash takes at most ``target_ms`` on this machine.
+
+    Returns (rounds, {rounds: median ms}). Each step doubles the work, so
+    timing stops at the first cost over the target.
+    """
+    timings = {}
+    chosen = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        durations = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            _hash(b'calibration-password', rounds)
+            durations.append((time.perf_counter() - started) * 1000)
+        timings[rounds] = sorted(durations)[len(durations) // 2]
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+class PasswordHasher:
+    """bcrypt hashing in a bounded process pool.
+
+    Hashing is CPU-bound, so running it in the gunicorn worker lets a login
+    storm starve every other endpoint. Here hashes and checks run in
+    ``max_workers`` separate processes (outside the GIL) while the request
+    thread waits. At most ``max_pending`` operations may be queued or running
+    per worker process; beyond that, and when an operation takes longer than
+    ``timeout`` seconds, PasswordHashingBusy is raised so the route can
+    answer 503 at once. With ``max_workers == 0`` hashing runs inline.
+    """
+
+    def __init__(self, rounds=12, max_workers=0, max_pending=32, timeout=5.0):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rejected = 0
+        self._reset()
+
+    def _reset(self):
+        # Called again after fork: the pool's processes belong to the parent
+        self._pid = os.getpid()
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def init_app(self, app):
+        """Read the cost factor and pool settings from the app config"""
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.max_workers = app.config.get('PASSWORD_HASH_WORKERS', self.max_workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT_MS', self.timeout * 1000) / 1000
+
+    def hash(self, password):
+        """bcrypt hash of ``password`` at the configured cost"""
+        return self._run(_hash, password.encode('utf-8'), self.rounds)
+
+    def check(self, password, password_hash):
+        """True if ``password`` matches ``password_hash``"""
+        if not password_hash:
+            return False
+        return self._run(_check, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """True if the stored hash was made with a different cost factor"""
+        return hash_cost(password_hash) != self.rounds
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.max_workers,
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'rejected': self.rejected
+            }
+
+    def _run(self, func, *args):
+        if self.max_workers <= 0:
+            return func(*args)
+
+        if os.getpid() != self._pid:
+            self._reset()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHashingBusy('Password hashing queue is full')
+            self._pending += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            pool = self._pool
+
+        try:
+            future = pool.submit(func, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                with self._lock:
+                    self.rejected += 1
+                raise PasswordHashingBusy('Password hashing timed out')
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+# Shared hashing pool behind User.set_password/check_password, configured by create_app
+password_hasher = PasswordHasher()
@@ -1,11 +1,15 @@
 import os
 import socket
 import subprocess
+import tempfile
 import json
 from datetime import datetime
 from app import db
 from app.models.proxy_config import ProxyConfig
 from app.models.journal import Journal
+from app.services.haproxy_config import config_generator
+from app.services.haproxy_runtime import HAProxyRuntimeClient, HAProxyRuntimeDriver
+from app.services.config_apply_queue import JournalChange
 
 class ProxyService:
     """Service for managing HAProxy configurations dynamically"""
@@ -14,6 +18,13 @@ class ProxyService:
         self.haproxy_socket = os.environ.get('HAPROXY_SOCKET', '/run/haproxy/admin.sock')
         self.config_dir = os.environ.get('PROXY_CONFIG_DIR', '/app/proxy_configs')
         self.haproxy_config_path = '/app/haproxy_config/haproxy-simple.cfg'
+        self.map_dir = os.environ.get('HAPROXY_MAP_DIR', '/app/haproxy_config/maps')
+        self.runtime_driver = HAProxyRuntimeDriver(
+            HAProxyRuntimeClient(self.haproxy_socket),
+            map_path=config_generator.map_path,
+            slot_count=config_generator.slot_count,
+            slot_timeout=config_generator.slot_timeout
+        )
         self.ensure_config_dir()
     
     def ensure_config_dir(self):
@@ -21,6 +32,23 @@ class ProxyService:
         if not os.path.exists(self.config_dir):
             os.makedirs(self.config_dir, exist_ok=True)
     
+    def _write_atomic(self, path, content):
+        """Write a file through a temporary file and rename, so HAProxy never reads a partial file"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
     def generate_haproxy_rule(self, journal, user):
         """Generate HAProxy configuration rule for journal access"""
         rule_parts = []
@@ -144,85 +172,8 @@ backend {journal.slug}_backend
     def generate_dynamic_haproxy_config(self):
         """Generate complete HAProxy configuration with all active journals"""
         try:
-            # Get all active journals directly from database
-            active_journals = Journal.query.filter_by(is_active=True).all()
-            
-            # Generate frontend ACL rules and use_backend rules
-            frontend_acls = []
-            frontend_backends = []
-            backend_configs = []
-            
-            for journal in active_journals:
-                # Add frontend ACL
-                frontend_acls.append(f"    acl is_{journal.slug} path_beg /{journal.proxy_path}")
-                frontend_backends.append(f"    use_backend {journal.slug}_backend if is_{journal.slug}")
-                
-                # Generate backend configuration
-                backend_config = self.generate_dynamic_backend_config(journal)
-                backend_configs.append(backend_config)
-            
-            # Generate complete HAProxy configuration
-            haproxy_config = f"""global
-    daemon
-    log stdout local0
-    stats timeout 30s
-
-defaults
-    mode http
-    log global
-    option httplog
-    option dontlognull
-    option forwardfor
-    timeout connect 5000
-    timeout client 50000
-    timeout server 50000
-
-# Stats page
-listen stats
-    bind *:8404
-    stats enable
-    stats uri /stats
-    stats refresh 30s
-    stats admin if TRUE
-
-# Frontend for LibProxy
-frontend libproxy_frontend
-    bind *:80
-    
-    # CORS headers for all responses
-    http-after-response set-header Access-Control-Allow-Origin "http://localhost:3000"
-    http-after-response set-header Access-Control-Allow-Methods "GET, POST, PUT, DELETE, OPTIONS"
-    http-after-response set-header Access-Control-Allow-Headers "Content-Type, Authorization"
-    http-after-response set-header Access-Control-Allow-Credentials "true"
-    
-    # Handle preflight OPTIONS requests
-    acl is_options method OPTIONS
-    http-request return status 200 if is_options
-    
-    # Handle favicon.ico requests
-    acl is_favicon path /favicon.ico
-    http-request return status 204 if is_favicon
-    
-    # Dynamic journal proxy rules
-{chr(10).join(frontend_acls)}
-{chr(10).join(frontend_backends)}
-    
-    default_backend libproxy_backend
-
-# Backend for LibProxy API
-backend libproxy_backend
-    balance roundrobin
-    option httpchk GET /api/health
-    http-check expect status 200
-    
-    # Backend servers
-    server libproxy_api backend:5000 check
-
-# Dynamic backend configurations for journals
-{chr(10).join(backend_configs)}
-"""
-            
-            return haproxy_config
+            # Only journals changed since the last call are re-rendered
+            return config_generator.refresh()
             
         except Exception as e:
             print(f"Failed to generate dynamic HAProxy config: {str(e)}")
@@ -230,40 +181,7 @@ backend libproxy_backend
     
     def generate_dynamic_backend_config(self, journal):
         """Generate HAProxy backend configuration for a journal with CORS and path rewriting"""
-        # Extract host and port from URL
-        from urllib.parse import urlparse
-        parsed = urlparse(journal.base_url)
-        host = parsed.hostname
-        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
-        ssl_config = "ssl verify none" if parsed.scheme == 'https' else ""
-        
-        # Path rewriting logic
-        path_rewrite_rules = []
-        if journal.proxy_path:
-            # Handle root path: /proxy_path -> /
-            path_rewrite_rules.append(f'    http-request set-path "/" if {{ path -m str "/{journal.proxy_path}" }}')
-            # Handle sub paths: /proxy_path/xyz -> /xyz
-            path_rewrite_rules.append(f'    http-request set-path %[path,regsub(^/{journal.proxy_path}/,/)] if {{ path -m beg "/{journal.proxy_path}/" }}')
-        
-        backend_config = f"""
-backend {journal.slug}_backend
-    mode http
-    balance roundrobin
-{chr(10).join(path_rewrite_rules)}
-    # CORS headers for journal responses
-    http-after-response set-header Access-Control-Allow-Origin "http://localhost:3000"
-    http-after-response set-header Access-Control-Allow-Methods "GET, POST, PUT, DELETE, OPTIONS"
-    http-after-response set-header Access-Control-Allow-Headers "Content-Type, Authorization"
-    http-after-response set-header Access-Control-Allow-Credentials "true"
-    server {journal.slug}_server {host}:{port} {ssl_config}
-    timeout server {journal.timeout}s"""
-        
-        # Add custom headers if configured
-        if journal.custom_headers:
-            for header, value in journal.custom_headers.items():
-                backend_config += f"\n    http-request set-header {header} {value}"
-        
-        return backend_config
+        return config_generator.render_backend_config(journal)
     
     def update_main_haproxy_config(self):
         """Update main HAProxy configuration with all active journals"""
@@ -274,17 +192,44 @@ backend {journal.slug}_backend
             if not haproxy_config:
                 return False
             
+            # Skip the rewrite when nothing changed since the last write
+            if haproxy_config is config_generator.last_written:
+                return True
+            
+            # Write the routing map first, since the configuration references it
+            map_file = os.path.join(self.map_dir, os.path.basename(config_generator.map_path))
+            self._write_atomic(map_file, config_generator.map_document)
+            
             # Write the updated configuration
-            with open(self.haproxy_config_path, 'w') as f:
-                f.write(haproxy_config)
+            self._write_atomic(self.haproxy_config_path, haproxy_config)
+            config_generator.last_written = haproxy_config
             
-            print(f"HAProxy configuration updated with {Journal.query.filter_by(is_active=True).count()} active journals")
+            print(f"HAProxy configuration updated with {config_generator.journal_count} active journals")
             return True
             
         except Exception as e:
             print(f"Failed to update main HAProxy config: {str(e)}")
             return False
     
+    def apply_journal_change(self, journal, previous_proxy_path=None):
+        """Write the configuration and apply a journal change, reloading HAProxy only if needed"""
+        return self.apply_journal_changes([JournalChange(journal, previous_proxy_path)])
+    
+    def apply_journal_changes(self, changes):
+        """Apply a batch of journal changes with one regeneration and at most one reload"""
+        if not self.update_main_haproxy_config():
+            return False
+        
+        # Zero-reload path through the Runtime API
+        for change in changes:
+            if not self.runtime_driver.apply(change.journal, previous_proxy_path=change.previous_proxy_path):
+                # Slot pool exhausted or change not expressible at runtime;
+                # one reload picks up every change in the batch
+                return self.reload_haproxy()
+        
+        print(f"HAProxy runtime updated for {len(changes)} journal change(s)")
+        return True
+    
     def reload_haproxy(self):
         """Reload HAProxy configuration"""
         try:
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import text
+from app import db
+
+
+class ReportExecutor:
+    """Runs independent report queries concurrently on a bounded thread pool.
+
+    Every task runs inside its own app context, so Flask-SQLAlchemy gives it
+    its own session and pooled connection, released when the context ends.
+    On PostgreSQL each task's transaction gets ``statement_timeout`` set to
+    ``query_timeout``. ``run`` waits at most ``deadline`` seconds overall;
+    tasks that failed or did not finish in time are reported as degraded and
+    their result is None. With ``max_workers == 0`` tasks run inline, one
+    after another, on the caller's session.
+    """
+
+    def __init__(self, max_workers=4, query_timeout=10.0, deadline=15.0):
+        self.max_workers = max_workers
+        self.query_timeout = query_timeout
+        self.deadline = deadline
+        self._app = None
+        self._reset()
+
+    def _reset(self):
+        # Called again after fork: the pool's threads do not survive it
+        self._pid = os.getpid()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read pool settings from the app config"""
+        self._app = app
+        self.max_workers = app.config.get('ANALYTICS_FANOUT_WORKERS', self.max_workers)
+        self.query_timeout = app.config.get('ANALYTICS_QUERY_TIMEOUT_MS', self.query_timeout * 1000) / 1000
+        self.deadline = app.config.get('ANALYTICS_FANOUT_DEADLINE_MS', self.deadline * 1000) / 1000
+
+    def run(self, tasks):
+        """Run ``{name: (func, args, kwargs)}``; returns (results, degraded names)"""
+        if self.max_workers <= 0:
+            return self._run_inline(tasks)
+
+        pool = self._get_pool()
+        futures = {
+            name: pool.submit(self._call, func, args, kwargs)
+            for name, (func, args, kwargs) in tasks.items()
+        }
+        wait(futures.values(), timeout=self.deadline)
+
+        results = {}
+        degraded = []
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                print(f"Report {name} missed the {self.deadline}s deadline")
+            elif future.exception() is None:
+                results[name] = future.result()
+                continue
+            else:
+                print(f"Report {name} failed: {str(future.exception())}")
+            results[name] = None
+            degraded.append(name)
+        return results, degraded
+
+    def _run_inline(self, tasks):
+        results = {}
+        degraded = []
+        started = time.monotonic()
+        for name, (func, args, kwargs) in tasks.items():
+            if time.monotonic() - started > self.deadline:
+                results[name] = None
+                degraded.append(name)
+                continue
+            try:
+                results[name] = func(*args, **kwargs)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Report {name} failed: {str(e)}")
+                results[name] = None
+                degraded.append(name)
+        return results, degraded
+
+    def _get_pool(self):
+        if os.getpid() != self._pid:
+            self._reset()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='report')
+            return self._pool
+
+    def _call(self, func, args, kwargs):
+        with self._app.app_context():
+            try:
+                if db.engine.dialect.name == 'postgresql':
+                    db.session.execute(text(f"SET LOCAL statement_timeout = {int(self.query_timeout * 1000)}"))
+                return func(*args, **kwargs)
+            finally:
+                db.session.rollback()
+
+
+# Shared pool for dashboard report queries, configured by create_app
+report_executor = ReportExecutor()
@@ -0,0 +1,85 @@
+from redis.exceptions import RedisError
+from app import db
+
+VERSION_KEY_PREFIX = 'auth:user_token_version'
+
+
+class TokenVersionStore:
+    """Per-user token versions, used to revoke issued JWTs.
+
+    The version lives in ``users.token_version`` and every token carries the
+    version it was issued with in its ``tv`` claim. ``revoke`` bumps the
+    version, so every token issued before fails the blocklist check. The
+    check reads the version from Redis, where it is cached for ``cache_ttl``
+    seconds and refreshed from the database on a miss, so most requests do
+    not touch the database. If Redis cannot answer, the version is read from
+    the database instead; login, refresh and revocation never need Redis.
+    Tokens without a ``tv`` claim count as version 0.
+    """
+
+    def __init__(self, cache_ttl=300):
+        self.cache_ttl = cache_ttl
+
+    def init_app(self, app, jwt):
+        """Read the settings from the app config and register the blocklist check"""
+        self.cache_ttl = app.config.get('TOKEN_VERSION_CACHE_TTL', self.cache_ttl)
+
+        @jwt.token_in_blocklist_loader
+        def token_revoked(jwt_header, jwt_payload):
+            return self.is_revoked(jwt_payload)
+
+    def client(self):
+        from app import redis_client
+        return redis_client
+
+    def stored(self, user_id):
+        """Current version of ``user_id`` from the database, None if the user is gone"""
+        from app.models.user import User
+        return db.session.query(User.token_version).filter(User.id == user_id).scalar()
+
+    def claims(self, user):
+        """Additional JWT claims for a User loaded from the database"""
+        return {
+            'is_admin': bool(user.is_admin),
+            'is_active': bool(user.is_active),
+            'tv': user.token_version or 0
+        }
+
+    def revoke(self, user_id):
+        """Invalidate every token issued to ``user_id`` so far"""
+        from app.models.user import User
+        User.query.filter(User.id == user_id).update(
+            {User.token_version: User.token_version + 1}, synchronize_session='fetch'
+        )
+        db.session.commit()
+        new_version = self.stored(user_id)
+
+        try:
+            self.client().set(f"{VERSION_KEY_PREFIX}:{user_id}", new_version, ex=self.cache_ttl)
+        except RedisError as e:
+            # The cached version expires within cache_ttl
+            print(f"Failed to update the cached token version of user {user_id}: {str(e)}")
+        return new_version
+
+    def is_revoked(self, jwt_payload):
+        user_id = jwt_payload['sub']
+        issued = jwt_payload.get('tv', 0)
+
+        try:
+            client = self.client()
+            version = client.get(f"{VERSION_KEY_PREFIX}:{user_id}")
+            if version is None:
+                version = self.stored(user_id)
+                if version is None:
+                    return True
+                # nx: never overwrite the version a concurrent revoke just stored
+                client.set(f"{VERSION_KEY_PREFIX}:{user_id}", version, ex=self.cache_ttl, nx=True)
+            return issued < int(version)
+        except RedisError as e:
+            print(f"Token revocation check using the database: {str(e)}")
+            version = self.stored(user_id)
+            return version is None or issued < version
+
+
+# Token versions behind login, logout and the JWT blocklist, configured by create_app
+token_versions = TokenVersionStore()
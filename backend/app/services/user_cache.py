@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from redis.exceptions import RedisError
+
+INVALIDATION_CHANNEL = 'user_cache:invalidate'
+
+
+class CachedUser:
+    """Detached, read-only copy of a User for authorization checks.
+
+    It carries the fields of ``User.to_dict``; routes that modify the user
+    load the ORM object themselves.
+    """
+
+    def __init__(self, fields):
+        self._fields = fields
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        return dict(self._fields)
+
+
+class TokenUser:
+    """current_user for tokens that carry role claims.
+
+    ``id``, ``is_admin`` and ``is_active`` come from the token, so
+    authorization checks need neither the cache nor the database. Any other
+    field is loaded through the user cache on first use.
+    """
+
+    def __init__(self, cache, jwt_data):
+        self.id = int(jwt_data['sub'])
+        self.is_admin = jwt_data['is_admin']
+        self.is_active = jwt_data['is_active']
+        self._cache = cache
+        self._user = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._user is None:
+            self._user = self._cache.get(self.id)
+            if self._user is None:
+                raise LookupError(f'User {self.id} no longer exists')
+        return getattr(self._user, name)
+
+
+class UserCache:
+    """Short-TTL, process-local LRU cache of authenticated users.
+
+    It backs flask_jwt_extended's ``current_user``, so a JWT-protected
+    request loads its user at most once, usually from memory; for tokens with
+    role claims only when a route needs more than the claims. Entries live
+    for ``ttl`` seconds. When a user changes, ``invalidate`` evicts the local
+    entry and publishes the id on a Redis channel; a subscriber thread in
+    every process evicts it there too.
+    """
+
+    def __init__(self, ttl=30.0, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.enabled = True
+        self._reset()
+
+    def _reset(self):
+        # Called again after fork: the subscriber thread does not survive it
+        self._pid = os.getpid()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._subscriber = None
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app, jwt):
+        """Read settings and register the JWT user loader"""
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.enabled = self.ttl > 0
+
+        @jwt.user_lookup_loader
+        def load_user(jwt_header, jwt_data):
+            if 'is_admin' in jwt_data:
+                return TokenUser(self, jwt_data)
+            return self.get(jwt_data['sub'])
+
+    def get(self, user_id):
+        """CachedUser for ``user_id``, or None if there is no such user"""
+        from app.models.user import User
+
+        if os.getpid() != self._pid:
+            self._reset()
+        user_id = int(user_id)
+
+        if self.enabled:
+            self._ensure_subscriber()
+            with self._lock:
+                entry = self._entries.get(user_id)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        cached = CachedUser(user.to_dict())
+
+        if self.enabled:
+            with self._lock:
+                self._entries[user_id] = (time.monotonic() + self.ttl, cached)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id):
+        """Drop a changed user here and, through Redis, in every other process"""
+        self._evict(user_id)
+        from app import redis_client
+        if redis_client is None:
+            return
+        try:
+            redis_client.publish(INVALIDATION_CHANNEL, str(user_id))
+        except RedisError as e:
+            print(f"User cache invalidation was not published: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _evict(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+    def _ensure_subscriber(self):
+        if self._subscriber is None or not self._subscriber.is_alive():
+            with self._lock:
+                if self._subscriber is None or not self._subscriber.is_alive():
+                    self._subscriber = threading.Thread(
+                        target=self._listen, name='user-cache-invalidation', daemon=True
+                    )
+                    self._subscriber.start()
+
+    def _listen(self):
+        from app import redis_client
+        while redis_client is not None:
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Entries cached while we were disconnected may have missed
+                # invalidations
+                with self._lock:
+                    self._entries.clear()
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._evict(message['data'])
+            except (RedisError, ValueError) as e:
+                print(f"User cache subscriber reconnecting: {str(e)}")
+                time.sleep(1)
+
+
+# Process-wide cache behind current_user, configured by create_app
+user_cache = UserCache()
@@ -0,0 +1,51 @@
+from flask import g
+from app.models.user import User
+from app.models.journal import Journal
+
+
+def _summaries(kind, model, columns, ids):
+    """Load ``columns`` for ``ids`` with one IN query, cached for the request"""
+    cache = g.setdefault('identity_cache', {}).setdefault(kind, {})
+    missing = {i for i in ids if i is not None and i not in cache}
+    if missing:
+        rows = model.query.with_entities(*[getattr(model, c) for c in columns])\
+            .filter(model.id.in_(missing)).all()
+        for row in rows:
+            cache[row.id] = dict(zip(columns, row))
+        # Remember misses too, so a deleted user is not looked up again
+        for i in missing:
+            cache.setdefault(i, None)
+    return {i: cache[i] for i in ids if i is not None}
+
+
+def user_summaries(ids):
+    """{user id: {'id', 'username', 'email'} or None} for the current request"""
+    return _summaries('users', User, ('id', 'username', 'email'), ids)
+
+
+def user_profiles(ids):
+    """user_summaries plus 'first_name' and 'last_name'"""
+    return _summaries('user_profiles', User, ('id', 'username', 'email', 'first_name', 'last_name'), ids)
+
+
+def journal_summaries(ids):
+    """{journal id: {'id', 'name', 'slug'} or None} for the current request"""
+    return _summaries('journals', Journal, ('id', 'name', 'slug'), ids)
+
+
+def with_identities(logs):
+    """``to_dict()`` of each log with 'user' and, for access logs, 'journal' added.
+
+    The summaries for the whole page come from one IN query per kind.
+    """
+    users = user_summaries({log.user_id for log in logs})
+    journals = journal_summaries({getattr(log, 'journal_id', None) for log in logs})
+    details = []
+    for log in logs:
+        log_dict = log.to_dict()
+        if users.get(log.user_id):
+            log_dict['user'] = users[log.user_id]
+        if journals.get(getattr(log, 'journal_id', None)):
+            log_dict['journal'] = journals[log.journal_id]
+        details.append(log_dict)
+    return details
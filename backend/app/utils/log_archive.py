@@ -0,0 +1,459 @@
+import fcntl
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, func, text, Column, DateTime, MetaData, Table
+from app import db
+from app.utils.log_export import DEFAULT_CHUNK_SIZE, iter_chunks, encode_ndjson, encode_parquet, gzip_stream
+from app.utils.log_partitions import PARTITIONED_TABLES, log_partitions
+
+ARCHIVE_FORMATS = ('auto', 'parquet', 'ndjson')
+ZSTD_LEVEL = 10
+
+
+class ArchiveError(RuntimeError):
+    """Archive format unavailable, another archiver holds the table's lock, or a filter does not fit its column"""
+
+
+def _naive_utc(value):
+    """Timestamps are stored as naive UTC; drop the offset of aware bounds"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _day(value):
+    return datetime(value.year, value.month, value.day)
+
+
+def _coerce(column, value):
+    """``value`` as the Python type of ``column`` (rows read back from archives have it)"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(value, python_type):
+        return value
+    try:
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise ArchiveError(f'Invalid {column.name} filter: {value!r}')
+
+
+def _has_module(name):
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def _zstd_stream(parts):
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _tracked(chunks, summary, timestamp_index):
+    """Pass chunks through, recording row count and id/timestamp ranges"""
+    for chunk in chunks:
+        if chunk:
+            stamps = [row[timestamp_index] for row in chunk]
+            if not summary['rows']:
+                summary['min_id'] = chunk[0][0]
+                summary['min_timestamp'] = summary['max_timestamp'] = stamps[0]
+            summary['rows'] += len(chunk)
+            summary['max_id'] = chunk[-1][0]
+            summary['min_timestamp'] = min(summary['min_timestamp'], *stamps)
+            summary['max_timestamp'] = max(summary['max_timestamp'], *stamps)
+        yield chunk
+
+
+class LogArchiver:
+    """Cold archive for the log tables.
+
+    ``archive`` moves rows older than ``hot_days`` days out of the database,
+    one UTC day at a time: the day's rows are streamed into a compressed
+    file under ``directory/<table>/`` (Parquet with zstd when pyarrow is
+    installed, otherwise NDJSON compressed with zstd or, without the
+    zstandard package, gzip), the file is fsynced and recorded in the
+    table's ``manifest.json``, and only then are the rows deleted in batches
+    of ``batch_size``. A day that gains late rows gets another file; rows
+    already in the manifest are never written twice, so a run interrupted
+    between writing and deleting is finished by the next one.
+
+    On partitioned PostgreSQL tables, month partitions left empty behind
+    the horizon are dropped, and partitions detached by the partition
+    retention (log_partitions) are archived whole and then dropped.
+
+    Exact analytics reports only see archived analytics_logs rows through
+    the columnar snapshot (analytics_columnar), so that table is archived
+    only with ANALYTICS_BACKEND set to 'auto' or 'columnar', and never past
+    the day of the snapshot's last refresh.
+
+    ``iter_archived`` reads archived rows back, so exports cover the whole
+    history whether a range is still in the database or not.
+    """
+
+    def __init__(self, directory='log_archive', archive_format='auto', batch_size=10000, hot_days=None):
+        self.directory = directory
+        self.archive_format = archive_format
+        self.batch_size = batch_size
+        # {table: days kept in the database}; 0 or missing never archives
+        self.hot_days = hot_days or {}
+        self.analytics_backend = 'postgres'
+
+    def init_app(self, app):
+        """Read the archive settings from the app config"""
+        self.directory = app.config.get('LOG_ARCHIVE_DIR', self.directory)
+        self.archive_format = app.config.get('LOG_ARCHIVE_FORMAT', self.archive_format)
+        self.batch_size = app.config.get('LOG_ARCHIVE_BATCH_SIZE', self.batch_size)
+        self.hot_days = {
+            'analytics_logs': app.config.get('ANALYTICS_LOG_ARCHIVE_DAYS', 0),
+            'access_logs': app.config.get('ACCESS_LOG_ARCHIVE_DAYS', 0),
+        }
+        self.analytics_backend = app.config.get('ANALYTICS_BACKEND', self.analytics_backend)
+        if self.archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"LOG_ARCHIVE_FORMAT must be one of {', '.join(ARCHIVE_FORMATS)}")
+
+    def file_format(self):
+        """(format, compression) new archive files are written in"""
+        parquet = _has_module('pyarrow.parquet')
+        if self.archive_format == 'parquet' and not parquet:
+            raise ArchiveError('Parquet archives require the pyarrow package')
+        if self.archive_format == 'parquet' or (self.archive_format == 'auto' and parquet):
+            return 'parquet', 'zstd'
+        return 'ndjson', 'zstd' if _has_module('zstandard') else 'gzip'
+
+    # Manifest
+
+    def table_directory(self, table_name):
+        return os.path.join(self.directory, table_name)
+
+    def load_manifest(self, table_name):
+        path = os.path.join(self.table_directory(table_name), 'manifest.json')
+        try:
+            with open(path) as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {'table': table_name, 'files': []}
+
+    def save_manifest(self, table_name, manifest):
+        path = os.path.join(self.table_directory(table_name), 'manifest.json')
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(temporary, path)
+
+    def stats(self):
+        """Archived files, rows and bytes per table, from the manifests"""
+        result = {}
+        for table_name in PARTITIONED_TABLES:
+            files = self.load_manifest(table_name)['files']
+            result[table_name] = {
+                'hot_days': self.hot_days.get(table_name) or 0,
+                'files': len(files),
+                'rows': sum(entry['rows'] for entry in files),
+                'bytes': sum(entry['bytes'] for entry in files),
+                'oldest': min((entry['min_timestamp'] for entry in files), default=None),
+                'newest': max((entry['max_timestamp'] for entry in files), default=None),
+            }
+        return result
+
+    # Archiving
+
+    def horizon(self, table_name, now=None):
+        """Start of the oldest day kept in the database; None if the table is not archived"""
+        days = self.hot_days.get(table_name) or 0
+        if days <= 0:
+            return None
+        return _day(now or datetime.utcnow()) - timedelta(days=days)
+
+    def _snapshot_cutoff(self):
+        """Start of the last day the columnar snapshot fully covers.
+
+        Reports read archived analytics_logs rows from the snapshot only;
+        archiving past it would make exact reports return nothing for the
+        archived days.
+        """
+        from app.services.analytics_columnar import analytics_columnar
+
+        if self.analytics_backend == 'postgres':
+            raise ArchiveError(
+                "Archiving analytics_logs requires ANALYTICS_BACKEND 'auto' or 'columnar'; "
+                "exact reports would lose the archived days"
+            )
+        state = analytics_columnar.state()
+        if state is None or not state['refreshed_at']:
+            raise ArchiveError('Archiving analytics_logs requires a columnar snapshot; run refresh_columnar_snapshot.py first')
+        return _day(datetime.fromisoformat(state['refreshed_at']))
+
+    def archive(self, table_name, now=None):
+        """Archive and delete rows past the table's horizon.
+
+        Returns {'files': [...], 'rows': archived, 'deleted': deleted,
+        'dropped': [partition names]}.
+        """
+        result = {'files': [], 'rows': 0, 'deleted': 0, 'dropped': []}
+        cutoff = self.horizon(table_name, now)
+        if cutoff is None:
+            return result
+        if table_name == 'analytics_logs':
+            cutoff = min(cutoff, self._snapshot_cutoff())
+
+        table = db.metadata.tables[table_name]
+        os.makedirs(self.table_directory(table_name), exist_ok=True)
+
+        with open(os.path.join(self.table_directory(table_name), '.lock'), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ArchiveError(f'Another archiver is running for {table_name}')
+
+            manifest = self.load_manifest(table_name)
+            # Detached partitions take no new rows: archive them whole, then drop
+            for name in self._detached_partitions(table_name):
+                self._archive_rows(self._table_copy(table, name), table_name, manifest, None, result, delete=False)
+                db.session.execute(text(f'DROP TABLE {name}'))
+                db.session.commit()
+                result['dropped'].append(name)
+
+            self._archive_rows(table, table_name, manifest, cutoff, result, delete=True)
+            result['dropped'] += self._drop_empty_partitions(table_name, cutoff)
+        return result
+
+    def run(self, now=None):
+        """archive every log table: {table: result of archive}"""
+        return {table_name: self.archive(table_name, now) for table_name in PARTITIONED_TABLES}
+
+    def _archive_rows(self, table, table_name, manifest, cutoff, result, delete):
+        column = table.c[PARTITIONED_TABLES[table_name]]
+        day = self._next_day(column, None, cutoff)
+        while day is not None:
+            end = day + timedelta(days=1)
+            in_day = [column >= day, column < end]
+            key = day.date().isoformat()
+            archived_max = max((entry['max_id'] for entry in manifest['files'] if entry['day'] == key), default=None)
+
+            conditions = list(in_day)
+            if archived_max is not None:
+                conditions.append(table.c.id > archived_max)
+            entry = self._write_file(table, table_name, manifest, day, conditions)
+            if entry is not None:
+                manifest['files'].append(entry)
+                self.save_manifest(table_name, manifest)
+                result['files'].append(entry['file'])
+                result['rows'] += entry['rows']
+                archived_max = entry['max_id']
+
+            if delete and archived_max is not None:
+                result['deleted'] += self._delete(table, in_day + [table.c.id <= archived_max])
+            day = self._next_day(column, end, cutoff)
+
+    def _next_day(self, column, after, cutoff):
+        """Start of the first day at or after ``after`` that has rows before ``cutoff``"""
+        statement = select(func.min(column))
+        if after is not None:
+            statement = statement.where(column >= after)
+        if cutoff is not None:
+            statement = statement.where(column < cutoff)
+        value = db.session.execute(statement).scalar()
+        db.session.commit()
+        return _day(value) if value is not None else None
+
+    def _write_file(self, table, table_name, manifest, day, conditions):
+        """Stream matching rows into a new archive file; None if there were none"""
+        file_format, compression = self.file_format()
+        columns = [column.name for column in table.columns]
+        sequence = sum(1 for entry in manifest['files'] if entry['day'] == day.date().isoformat()) + 1
+        extension = 'parquet' if file_format == 'parquet' else f"ndjson.{'zst' if compression == 'zstd' else 'gz'}"
+        relative = os.path.join(f'{day:%Y}', f'{day:%m}', f'{table_name}-{day:%Y%m%d}-{sequence}.{extension}')
+        path = os.path.join(self.table_directory(table_name), relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        summary = {'rows': 0}
+        chunks = _tracked(
+            iter_chunks(table, conditions, chunk_size=self.batch_size),
+            summary, columns.index(PARTITIONED_TABLES[table_name])
+        )
+        if file_format == 'parquet':
+            parts = encode_parquet(table, chunks, compression='zstd')
+        elif compression == 'zstd':
+            parts = _zstd_stream(encode_ndjson(columns, chunks))
+        else:
+            parts = gzip_stream(encode_ndjson(columns, chunks))
+
+        digest = hashlib.sha256()
+        size = 0
+        temporary = path + '.tmp'
+        try:
+            with open(temporary, 'wb') as archive_file:
+                for part in parts:
+                    archive_file.write(part)
+                    digest.update(part)
+                    size += len(part)
+                archive_file.flush()
+                os.fsync(archive_file.fileno())
+        except BaseException:
+            db.session.rollback()
+            os.remove(temporary)
+            raise
+        db.session.commit()
+
+        if not summary['rows']:
+            os.remove(temporary)
+            return None
+        os.replace(temporary, path)
+
+        return {
+            'file': relative,
+            'format': file_format,
+            'compression': compression,
+            'day': day.date().isoformat(),
+            'rows': summary['rows'],
+            'min_id': summary['min_id'],
+            'max_id': summary['max_id'],
+            'min_timestamp': summary['min_timestamp'].isoformat(),
+            'max_timestamp': summary['max_timestamp'].isoformat(),
+            'bytes': size,
+            'sha256': digest.hexdigest(),
+            'created_at': datetime.utcnow().isoformat(),
+        }
+
+    def _delete(self, table, conditions):
+        """Delete in batches, one transaction each, so locks and WAL stay small"""
+        deleted = 0
+        while True:
+            batch = select(table.c.id).where(*conditions).limit(self.batch_size)
+            count = db.session.execute(table.delete().where(table.c.id.in_(batch), *conditions)).rowcount
+            db.session.commit()
+            deleted += count
+            if count < self.batch_size:
+                return deleted
+
+    def _detached_partitions(self, table_name):
+        connection = db.session.connection()
+        if connection.dialect.name != 'postgresql':
+            return []
+        names = connection.execute(text(
+            "SELECT relname FROM pg_class "
+            "WHERE relkind = 'r' AND NOT relispartition AND pg_table_is_visible(oid) "
+            "AND relname ~ :pattern ORDER BY relname"
+        ), {'pattern': f'^{table_name}_p[0-9]{{6}}$'}).scalars().all()
+        db.session.commit()
+        return names
+
+    def _drop_empty_partitions(self, table_name, cutoff):
+        """Drop month partitions that ended before ``cutoff`` and hold no rows"""
+        dropped = []
+        with db.engine.begin() as connection:
+            if not log_partitions.is_partitioned(connection, table_name):
+                return dropped
+            for name, _, end in log_partitions.partitions(connection, table_name):
+                if end > cutoff:
+                    break
+                # Detach first (locking parent, then partition, like inserts
+                # do) and check for rows that arrived meanwhile afterwards
+                savepoint = connection.begin_nested()
+                connection.execute(text(f'ALTER TABLE {table_name} DETACH PARTITION {name}'))
+                if connection.execute(text(f'SELECT EXISTS (SELECT 1 FROM {name})')).scalar():
+                    savepoint.rollback()
+                    continue
+                connection.execute(text(f'DROP TABLE {name}'))
+                savepoint.commit()
+                dropped.append(name)
+        return dropped
+
+    @staticmethod
+    def _table_copy(table, name):
+        """``table``'s columns under another name (a detached partition)"""
+        return Table(name, MetaData(), *(
+            Column(column.name, column.type, primary_key=column.primary_key) for column in table.columns
+        ))
+
+    # Reading back
+
+    def iter_archived(self, table_name, start=None, end=None, equals=None, contains=None,
+                      after_id=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield chunks of archived row tuples (in table column order).
+
+        Only files whose timestamp range overlaps [start, end] are opened.
+        ``equals`` ({column: value}) and ``contains`` ({column: text}, case
+        insensitive like ILIKE '%text%') filter the rows; ``after_id``
+        skips rows up to a resume cursor. Files are read in id order.
+        """
+        table = db.metadata.tables[table_name]
+        columns = [column.name for column in table.columns]
+        timestamp = PARTITIONED_TABLES[table_name]
+        start, end = _naive_utc(start), _naive_utc(end)
+        # Archived values have the column's Python type; '1' would never match 1
+        equals = {
+            column: _coerce(table.c[column], value)
+            for column, value in (equals or {}).items() if value is not None
+        }
+        contains = {column: value.lower() for column, value in (contains or {}).items() if value}
+
+        entries = sorted(self.load_manifest(table_name)['files'], key=lambda entry: entry['min_id'])
+        for entry in entries:
+            if start is not None and datetime.fromisoformat(entry['max_timestamp']) < start:
+                continue
+            if end is not None and datetime.fromisoformat(entry['min_timestamp']) > end:
+                continue
+            if after_id is not None and entry['max_id'] <= after_id:
+                continue
+
+            chunk = []
+            for row in self._read_rows(table, entry, chunk_size):
+                stamp = row.get(timestamp)
+                if (start is not None and stamp < start) or (end is not None and stamp > end):
+                    continue
+                if after_id is not None and row['id'] <= after_id:
+                    continue
+                if any(row.get(column) != value for column, value in equals.items()):
+                    continue
+                if any(value not in (row.get(column) or '').lower() for column, value in contains.items()):
+                    continue
+                chunk.append(tuple(row.get(column) for column in columns))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def _read_rows(self, table, entry, chunk_size):
+        """Rows of one archive file as dicts"""
+        path = os.path.join(self.table_directory(table.name), entry['file'])
+        if entry['format'] == 'parquet':
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+                yield from batch.to_pylist()
+            return
+
+        datetimes = [column.name for column in table.columns if isinstance(column.type, DateTime)]
+        with open(path, 'rb') as raw:
+            if entry['compression'] == 'zstd':
+                import zstandard
+                stream = zstandard.ZstdDecompressor().stream_reader(raw)
+            else:
+                stream = gzip.GzipFile(fileobj=raw)
+            for line in io.TextIOWrapper(stream, encoding='utf-8'):
+                row = json.loads(line)
+                for name in datetimes:
+                    if row.get(name) is not None:
+                        row[name] = datetime.fromisoformat(row[name])
+                yield row
+
+
+# Cold log archive (scripts/archive_logs.py, analytics exports), configured by create_app
+log_archiver = LogArchiver()
@@ -0,0 +1,204 @@
+import csv
+import io
+import itertools
+import json
+import zlib
+from datetime import datetime, date
+from flask import Response, stream_with_context
+from sqlalchemy import select, Boolean, DateTime, Float, Integer
+from app import db
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class ExportError(ValueError):
+    """Unknown format or a format whose optional dependency is missing"""
+
+
+def iter_chunks(table, conditions=(), after_id=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of row tuples in id order through a server-side cursor.
+
+    Rows are fetched ``chunk_size`` at a time (a named cursor on PostgreSQL),
+    so memory stays flat however many rows match. Because rows come in id
+    order, an interrupted export is resumed by passing the last id received
+    as ``after_id``.
+    """
+    statement = select(*table.columns).where(*conditions).order_by(table.c.id)
+    if after_id is not None:
+        statement = statement.where(table.c.id > after_id)
+
+    result = db.session.execute(statement.execution_options(stream_results=True))
+    try:
+        for chunk in result.partitions(chunk_size):
+            yield chunk
+    finally:
+        result.close()
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows(
+            ['' if value is None else _json_value(value) for value in row]
+            for row in chunk
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(columns, chunks):
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps({column: _json_value(value) for column, value in zip(columns, row)}) + '\n'
+            for row in chunk
+        ).encode()
+
+
+class _StreamSink:
+    """Write-only file object that hands written bytes back to a generator.
+
+    ``tell`` keeps counting across drains, so the offsets ParquetWriter
+    records for row groups and the footer stay correct.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_schema(pa, table):
+    types = []
+    for column in table.columns:
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = pa.string()
+        types.append(pa.field(column.name, arrow_type))
+    return pa.schema(types)
+
+
+def encode_parquet(table, chunks, compression='snappy'):
+    """One Parquet row group per chunk; requires the optional pyarrow package"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa, table)
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        for chunk in chunks:
+            arrays = [
+                pa.array([row[index] for row in chunk], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(parts):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(table, export_format, conditions=(), after_id=None, gzip=False,
+                  chunk_size=DEFAULT_CHUNK_SIZE, filename=None, archived_chunks=None):
+    """Chunked HTTP response streaming ``table`` rows as CSV, NDJSON or Parquet.
+
+    ``archived_chunks`` (row tuple chunks read back from the cold log
+    archive) are streamed ahead of the table's own rows; archived rows are
+    older, so the output stays in id order for resuming.
+
+    Raises ExportError for an unknown format, or for Parquet without pyarrow.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported export format '{export_format}'")
+    if export_format == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ExportError('Parquet export requires the pyarrow package')
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    columns = [column.name for column in table.columns]
+    chunks = iter_chunks(table, conditions, after_id, chunk_size)
+    if archived_chunks is not None:
+        chunks = itertools.chain(archived_chunks, chunks)
+
+    if export_format == 'csv':
+        body = encode_csv(columns, chunks)
+    elif export_format == 'ndjson':
+        body = encode_ndjson(columns, chunks)
+    else:
+        body = encode_parquet(table, chunks)
+
+    filename = f"{filename or table.name}.{extension}"
+    if gzip:
+        body = gzip_stream(body)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Rows are in id order; resume with cursor=<last id received>
+            'X-Export-Resume-Param': 'cursor',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -0,0 +1,156 @@
+import re
+from datetime import datetime
+from sqlalchemy import text
+from app import db
+
+# Partitioned log tables and their partition key
+PARTITIONED_TABLES = {
+    'analytics_logs': 'access_timestamp',
+    'access_logs': 'timestamp',
+}
+
+_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, start):
+    return f"{table}_p{start:%Y%m}"
+
+
+class LogPartitionManager:
+    """Monthly range partitions of the log tables on PostgreSQL.
+
+    ``ensure`` creates the partitions for the current month and the next
+    ``months_ahead`` months before rows arrive for them. ``expire`` detaches
+    every partition that ended more than ``retention_months`` months ago:
+    a metadata change that takes the same time however many rows the month
+    holds, where a DELETE would rewrite the table. Detached partitions stay
+    as plain tables (for archiving) unless ``drop`` is set. Rows that find
+    no partition land in the table's ``_default`` partition; ``ensure``
+    moves them into the month partition it creates.
+
+    On other databases, or while a table is not partitioned yet, every
+    method does nothing.
+    """
+
+    def __init__(self, months_ahead=3, retention_months=None, drop=False):
+        self.months_ahead = months_ahead
+        # {table: months to keep}; 0 or missing keeps everything
+        self.retention_months = retention_months or {}
+        self.drop = drop
+
+    def init_app(self, app):
+        """Read the partition settings from the app config"""
+        self.months_ahead = app.config.get('LOG_PARTITION_MONTHS_AHEAD', self.months_ahead)
+        self.drop = app.config.get('LOG_PARTITION_DROP_EXPIRED', self.drop)
+        self.retention_months = {
+            'analytics_logs': app.config.get('ANALYTICS_LOG_RETENTION_MONTHS', 0),
+            'access_logs': app.config.get('ACCESS_LOG_RETENTION_MONTHS', 0),
+        }
+
+    def is_partitioned(self, connection, table):
+        if connection.dialect.name != 'postgresql':
+            return False
+        return connection.execute(text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+        ), {'table': table}).scalar() is not None
+
+    def partitions(self, connection, table):
+        """[(name, start, end)] of the table's month partitions, oldest first"""
+        rows = connection.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table AND pg_table_is_visible(p.oid)"
+        ), {'table': table}).all()
+
+        result = []
+        for name, bound in rows:
+            match = _BOUND.search(bound or '')
+            if match:
+                start, end = (datetime.fromisoformat(value) for value in match.groups())
+                result.append((name, start, end))
+        return sorted(result, key=lambda partition: partition[1])
+
+    def ensure(self, table, now=None):
+        """Create missing month partitions up to ``months_ahead``; returns their names"""
+        column = PARTITIONED_TABLES[table]
+        first = month_start(now or datetime.utcnow())
+        created = []
+
+        with db.engine.begin() as connection:
+            if not self.is_partitioned(connection, table):
+                return created
+            existing = {start for _, start, _ in self.partitions(connection, table)}
+
+            for offset in range(self.months_ahead + 1):
+                start = add_months(first, offset)
+                if start in existing:
+                    continue
+                self._create_partition(connection, table, column, start, add_months(start, 1))
+                created.append(partition_name(table, start))
+        return created
+
+    def expire(self, table, now=None):
+        """Detach (or drop) partitions past the retention; returns their names"""
+        months = self.retention_months.get(table) or 0
+        if months <= 0:
+            return []
+        cutoff = add_months(month_start(now or datetime.utcnow()), -months)
+        expired = []
+
+        with db.engine.begin() as connection:
+            if not self.is_partitioned(connection, table):
+                return expired
+            for name, _, end in self.partitions(connection, table):
+                if end > cutoff:
+                    break
+                connection.execute(text(f'ALTER TABLE {table} DETACH PARTITION {name}'))
+                if self.drop:
+                    connection.execute(text(f'DROP TABLE {name}'))
+                expired.append(name)
+        return expired
+
+    def run(self, now=None):
+        """ensure and expire every log table: {table: {'created': [...], 'expired': [...]}}"""
+        return {
+            table: {'created': self.ensure(table, now), 'expired': self.expire(table, now)}
+            for table in PARTITIONED_TABLES
+        }
+
+    def _create_partition(self, connection, table, column, start, end):
+        name = partition_name(table, start)
+        bounds = f"FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        default = f'{table}_default'
+        in_range = f"\"{column}\" >= '{start:%Y-%m-%d}' AND \"{column}\" < '{end:%Y-%m-%d}'"
+
+        has_default = connection.execute(
+            text('SELECT to_regclass(:name)'), {'name': default}
+        ).scalar() is not None
+        stray = has_default and connection.execute(text(
+            f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})'
+        )).scalar()
+        if not stray:
+            connection.execute(text(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}'))
+            return
+
+        # Rows for this month went to the default partition; attaching the
+        # new partition would fail until they are moved into it
+        connection.execute(text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+        connection.execute(text(f'INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}'))
+        connection.execute(text(f'DELETE FROM {default} WHERE {in_range}'))
+        connection.execute(text(f'ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bounds}'))
+
+
+# Log table partition maintenance (scripts/manage_log_partitions.py), configured by create_app
+log_partitions = LogPartitionManager()
@@ -0,0 +1,309 @@
+import atexit
+import csv
+import io
+import os
+import threading
+import time
+from collections import deque
+from app import db
+
+OVERFLOW_DROP = 'drop'
+OVERFLOW_BLOCK = 'block'
+
+
+class BufferedLogWriter:
+    """Bounded in-process log buffer drained by a background writer thread.
+
+    Request handlers only append a row to the buffer. The writer thread
+    flushes batches with a single multi-row INSERT (executemany) every
+    ``batch_size`` rows or ``flush_interval`` seconds, whichever comes first.
+    When the buffer is full the ``drop`` policy discards the new row and the
+    ``block`` policy waits up to ``block_timeout`` seconds for room before
+    dropping it. A failed batch is retried up to ``flush_retries`` times,
+    waiting ``retry_backoff`` seconds (doubled after each attempt), before it
+    is counted as failed; new rows keep buffering meanwhile. Pending rows are
+    flushed on interpreter exit and from the gunicorn ``worker_exit`` hook
+    (see gunicorn.conf.py).
+    """
+
+    instances = []
+
+    def __init__(self, name, table, capacity=10000, batch_size=500, flush_interval=0.2,
+                 overflow_policy=OVERFLOW_DROP, block_timeout=0.1, async_mode=True,
+                 flush_retries=3, retry_backoff=0.5):
+        self.name = name
+        self.table = table
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.async_mode = async_mode
+        self.flush_retries = flush_retries
+        self.retry_backoff = retry_backoff
+        self.listeners = []
+        self._app = None
+        self._reset()
+        BufferedLogWriter.instances.append(self)
+
+    def _reset(self):
+        # Called again after fork: locks and threads do not survive it
+        self._pid = os.getpid()
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Zero the metrics counters"""
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+        self.flushes = 0
+        self.total_flush_ms = 0.0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def init_app(self, app, prefix):
+        """Read buffer settings from the app config, e.g. ACCESS_LOG_BUFFER_SIZE"""
+        self._app = app
+        self.async_mode = app.config.get(f'{prefix}_ASYNC', self.async_mode)
+        self.capacity = app.config.get(f'{prefix}_BUFFER_SIZE', self.capacity)
+        self.batch_size = app.config.get(f'{prefix}_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get(f'{prefix}_FLUSH_INTERVAL_MS', self.flush_interval * 1000) / 1000
+        self.overflow_policy = app.config.get(f'{prefix}_OVERFLOW_POLICY', self.overflow_policy)
+        self.block_timeout = app.config.get(f'{prefix}_BLOCK_TIMEOUT_MS', self.block_timeout * 1000) / 1000
+        self.flush_retries = app.config.get(f'{prefix}_FLUSH_RETRIES', self.flush_retries)
+        self.retry_backoff = app.config.get(f'{prefix}_RETRY_BACKOFF_MS', self.retry_backoff * 1000) / 1000
+        atexit.register(self.shutdown)
+
+    def add_listener(self, callback):
+        """Call ``callback(rows)`` after each batch is committed"""
+        self.listeners.append(callback)
+
+    def prepare(self, row):
+        """Validate or convert a row before it is buffered"""
+        return row
+
+    def enqueue(self, row):
+        """Buffer a row for insertion; returns False if it was dropped"""
+        row = self.prepare(row)
+        if not self.async_mode:
+            self._write([row])
+            return True
+
+        if os.getpid() != self._pid:
+            self._reset()
+
+        with self._cond:
+            if len(self._buffer) >= self.capacity:
+                if self.overflow_policy == OVERFLOW_BLOCK:
+                    self._cond.wait_for(lambda: len(self._buffer) < self.capacity, self.block_timeout)
+                if len(self._buffer) >= self.capacity:
+                    self.dropped += 1
+                    return False
+
+            self._buffer.append(row)
+            self.enqueued += 1
+            self._ensure_thread()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def write_batch(self, rows):
+        """Write rows synchronously, bypassing the buffer; returns False on failure"""
+        return self._write([self.prepare(row) for row in rows])
+
+    def flush(self):
+        """Synchronously write everything currently buffered"""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._write(batch)
+
+    def shutdown(self):
+        """Stop the writer thread and flush what is left"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        with self._cond:
+            return {
+                'queue_depth': len(self._buffer),
+                'capacity': self.capacity,
+                'overflow_policy': self.overflow_policy,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'retries': self.retries,
+                'flushes': self.flushes,
+                'last_flush_ms': round(self.last_flush_ms, 3),
+                'avg_flush_ms': round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+                'max_flush_ms': round(self.max_flush_ms, 3)
+            }
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-writer', daemon=True)
+            self._thread.start()
+
+    def _take_batch(self):
+        count = min(len(self._buffer), self.batch_size)
+        batch = [self._buffer.popleft() for _ in range(count)]
+        if batch:
+            # Wake up producers blocked on a full buffer
+            self._cond.notify_all()
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: len(self._buffer) >= self.batch_size or self._stopping,
+                    self.flush_interval
+                )
+                if self._stopping and not self._buffer:
+                    return
+                batch = self._take_batch()
+            if batch:
+                self._write(batch)
+
+    def write_rows(self, connection, rows):
+        """Insert a batch of rows; subclasses may use a faster bulk path"""
+        connection.execute(self.table.insert(), rows)
+
+    def _write(self, rows):
+        with self._flush_lock:
+            started = time.perf_counter()
+            backoff = self.retry_backoff
+            for attempt in range(self.flush_retries + 1):
+                try:
+                    with self._app.app_context():
+                        with db.engine.begin() as connection:
+                            self.write_rows(connection, rows)
+                    break
+                except Exception as e:
+                    if attempt == self.flush_retries:
+                        with self._cond:
+                            self.failed += len(rows)
+                        print(f"Failed to write {len(rows)} rows to {self.name} "
+                              f"after {attempt + 1} attempts: {str(e)}")
+                        return False
+                    with self._cond:
+                        self.retries += 1
+                    print(f"Retrying write of {len(rows)} rows to {self.name} in {backoff:.2f}s: {str(e)}")
+                    time.sleep(backoff)
+                    backoff *= 2
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._cond:
+                self.written += len(rows)
+                self.flushes += 1
+                self.total_flush_ms += elapsed_ms
+                self.last_flush_ms = elapsed_ms
+                self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+            for callback in self.listeners:
+                try:
+                    callback(rows)
+                except Exception as e:
+                    print(f"{self.name} write listener failed: {str(e)}")
+            return True
+
+
+class BulkLogWriter(BufferedLogWriter):
+    """Buffered writer that stores rows as tuples in table column order.
+
+    The column list, defaults and required columns are computed once from the
+    table, so a row (a dict, or a tuple in ``columns`` order) is validated with
+    a few set operations. Batches are written with COPY on PostgreSQL and with
+    a plain executemany on other databases.
+    """
+
+    def __init__(self, name, table, **kwargs):
+        super().__init__(name, table, **kwargs)
+        self.columns = tuple(c.name for c in table.columns if not c.primary_key)
+        self._column_set = frozenset(self.columns)
+        self._required = frozenset(
+            c.name for c in table.columns
+            if not c.primary_key and not c.nullable and c.default is None
+        )
+        # Scalar defaults are shared, callable ones (e.g. datetime.utcnow) run per row
+        self._defaults = {}
+        self._callable_defaults = {}
+        for c in table.columns:
+            if c.primary_key or c.default is None:
+                continue
+            if c.default.is_callable:
+                self._callable_defaults[c.name] = c.default.arg
+            elif c.default.is_scalar:
+                self._defaults[c.name] = c.default.arg
+
+        column_list = ', '.join(self.columns)
+        self._copy_sql = f"COPY {table.name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        self._insert_sql = {
+            'qmark': f"INSERT INTO {table.name} ({column_list}) VALUES ({', '.join('?' for _ in self.columns)})",
+            'format': f"INSERT INTO {table.name} ({column_list}) VALUES ({', '.join('%s' for _ in self.columns)})",
+        }
+        self._insert_sql['pyformat'] = self._insert_sql['format']
+
+    def prepare(self, row):
+        """Turn a dict or tuple into a tuple in column order; raises ValueError"""
+        if isinstance(row, tuple):
+            if len(row) != len(self.columns):
+                raise ValueError(f"{self.name}: expected {len(self.columns)} values, got {len(row)}")
+            return row
+
+        unknown = row.keys() - self._column_set
+        if unknown:
+            raise ValueError(f"{self.name}: unknown columns {sorted(unknown)}")
+        missing = self._required - row.keys()
+        if missing:
+            raise ValueError(f"{self.name}: missing required columns {sorted(missing)}")
+
+        values = dict(self._defaults)
+        for column, default in self._callable_defaults.items():
+            if column not in row:
+                values[column] = default(None)
+        values.update(row)
+        return tuple(values.get(column) for column in self.columns)
+
+    def write_rows(self, connection, rows):
+        dialect = connection.dialect
+        if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+            self._copy_rows(connection, rows)
+        elif dialect.paramstyle in self._insert_sql:
+            connection.exec_driver_sql(self._insert_sql[dialect.paramstyle], rows)
+        else:
+            connection.execute(self.table.insert(), [dict(zip(self.columns, row)) for row in rows])
+
+    def _copy_rows(self, connection, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(self._copy_sql, buffer)
+        finally:
+            cursor.close()
+
+
+def flush_all():
+    """Flush every buffered log writer (used on worker shutdown)"""
+    for writer in BufferedLogWriter.instances:
+        writer.shutdown()
@@ -0,0 +1,60 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from app import db
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor for the row a page ended on"""
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {str(e)}')
+
+
+def keyset_page(query, timestamp_column, id_column, cursor=None, per_page=50):
+    """Newest-first page of ``query`` after ``cursor``, keyed on (timestamp, id).
+
+    Unlike OFFSET pagination the database seeks straight to the cursor
+    position through the (timestamp, id) order, so deep pages cost the same
+    as the first one and no COUNT(*) is needed. Returns (items, next_cursor);
+    next_cursor is None on the last page.
+    """
+    if cursor:
+        cursor_timestamp, cursor_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(timestamp_column, id_column) < tuple_(cursor_timestamp, cursor_id)
+        )
+
+    items = query.order_by(timestamp_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    if len(items) <= per_page:
+        return items, None
+
+    items = items[:per_page]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+
+
+def estimated_count(query):
+    """Planner row estimate for ``query`` on PostgreSQL (None elsewhere).
+
+    The estimate comes from table statistics (pg_class / pg_statistic), so
+    it costs a planning pass rather than a scan of the filtered rows.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        return None
+
+    compiled = query.statement.compile(dialect=connection.dialect)
+    row = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).first()
+    plan = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+    return int(plan[0]['Plan']['Plan Rows'])
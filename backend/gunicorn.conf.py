@@ -0,0 +1,7 @@
+# Gunicorn settings, loaded automatically from the working directory (/app)
+
+
+def worker_exit(server, worker):
+    """Write buffered access logs before the worker process goes away"""
+    from app.utils.log_pipeline import flush_all
+    flush_all()
@@ -0,0 +1,63 @@
+"""Add analytics rollup tables
+
+Revision ID: 3f8a2c61d7e4
+Revises: ebcc8bedd4f9
+Create Date: 2026-10-17 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a2c61d7e4'
+down_revision = 'ebcc8bedd4f9'
+branch_labels = None
+depends_on = None
+
+ROLLUP_KEY = ['bucket', 'resource_name', 'department', 'account_type', 'country', 'auth_success', 'access_denied']
+
+
+def rollup_columns():
+    return [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('resource_name', sa.String(length=500), nullable=False),
+        sa.Column('department', sa.String(length=255), nullable=False),
+        sa.Column('account_type', sa.String(length=50), nullable=False),
+        sa.Column('country', sa.String(length=100), nullable=False),
+        sa.Column('auth_success', sa.Boolean(), nullable=False),
+        sa.Column('access_denied', sa.Boolean(), nullable=False),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.Column('page_views', sa.Integer(), nullable=False),
+        sa.Column('downloads', sa.Integer(), nullable=False),
+        sa.Column('searches', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    ]
+
+
+def upgrade():
+    for table in ('analytics_rollup_hourly', 'analytics_rollup_daily'):
+        op.create_table(table,
+            *rollup_columns(),
+            sa.UniqueConstraint(*ROLLUP_KEY, name=f'uq_{table}_key')
+        )
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table}_bucket'), ['bucket'], unique=False)
+
+    op.create_table('analytics_rollup_state',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('seen_max_id', sa.Integer(), nullable=False),
+        sa.Column('covered_until', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('analytics_rollup_state')
+    for table in ('analytics_rollup_daily', 'analytics_rollup_hourly'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_bucket'))
+        op.drop_table(table)
@@ -0,0 +1,72 @@
+"""Add journal full-text and trigram search indexes
+
+Revision ID: 8c1d4e7b2a90
+Revises: 3f8a2c61d7e4
+Create Date: 2026-10-17 15:41:08.226914
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d4e7b2a90'
+down_revision = '3f8a2c61d7e4'
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(publisher, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # A stored generated column is computed for every existing row when
+        # it is added, which backfills the search vectors
+        op.execute(
+            "ALTER TABLE journals ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_journals_search_vector ON journals USING gin (search_vector)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_journals_name_trgm ON journals USING gin (name gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_journals_publisher_trgm ON journals USING gin (publisher gin_trgm_ops)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS journals_fts USING fts5("
+            "name, description, publisher, content='journals', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS journals_fts_ai AFTER INSERT ON journals BEGIN "
+            "INSERT INTO journals_fts(rowid, name, description, publisher) "
+            "VALUES (new.id, new.name, new.description, new.publisher); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS journals_fts_ad AFTER DELETE ON journals BEGIN "
+            "INSERT INTO journals_fts(journals_fts, rowid, name, description, publisher) "
+            "VALUES ('delete', old.id, old.name, old.description, old.publisher); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS journals_fts_au AFTER UPDATE ON journals BEGIN "
+            "INSERT INTO journals_fts(journals_fts, rowid, name, description, publisher) "
+            "VALUES ('delete', old.id, old.name, old.description, old.publisher); "
+            "INSERT INTO journals_fts(rowid, name, description, publisher) "
+            "VALUES (new.id, new.name, new.description, new.publisher); END"
+        )
+        # Index the rows that already exist
+        op.execute("INSERT INTO journals_fts(journals_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_journals_publisher_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_journals_name_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_journals_search_vector")
+        op.execute("ALTER TABLE journals DROP COLUMN IF EXISTS search_vector")
+    else:
+        for trigger in ('journals_fts_au', 'journals_fts_ad', 'journals_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS journals_fts")
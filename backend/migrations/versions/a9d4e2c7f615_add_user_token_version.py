@@ -0,0 +1,26 @@
+"""Add users.token_version for JWT revocation
+
+Revision ID: a9d4e2c7f615
+Revises: f7c3b9d1e8a4
+Create Date: 2026-10-17 22:03:51.226840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4e2c7f615'
+down_revision = 'f7c3b9d1e8a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,30 @@
+"""Store journal subject_areas as JSONB with a GIN index
+
+Revision ID: b47e93c0d5f1
+Revises: 8c1d4e7b2a90
+Create Date: 2026-10-17 16:27:53.904418
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b47e93c0d5f1'
+down_revision = '8c1d4e7b2a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("ALTER TABLE journals ALTER COLUMN subject_areas TYPE jsonb USING subject_areas::jsonb")
+    # Default jsonb_ops: serves @> (all subjects) as well as ?| (any subject)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_journals_subject_areas ON journals USING gin (subject_areas)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_journals_subject_areas")
+    op.execute("ALTER TABLE journals ALTER COLUMN subject_areas TYPE json USING subject_areas::json")
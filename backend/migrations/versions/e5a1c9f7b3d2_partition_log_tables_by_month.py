@@ -0,0 +1,147 @@
+"""Partition log tables by month
+
+Revision ID: e5a1c9f7b3d2
+Revises: d2f6a8b13c47
+Create Date: 2026-10-17 18:12:09.551872
+
+On PostgreSQL analytics_logs and access_logs are rebuilt as tables range
+partitioned by month on their timestamp. The existing rows are copied into
+the new partitions inside the migration, so schedule it for a maintenance
+window on large installations. Later partitions are created by
+scripts/manage_log_partitions.py.
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1c9f7b3d2'
+down_revision = 'd2f6a8b13c47'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+TABLES = {
+    'analytics_logs': {
+        'column': 'access_timestamp',
+        'foreign_keys': [('user_id', 'users')],
+        'indexes': [
+            'CREATE INDEX ix_analytics_logs_timestamp_resource ON analytics_logs (access_timestamp, resource_name)',
+            'CREATE INDEX ix_analytics_logs_user_timestamp ON analytics_logs (user_id, access_timestamp) '
+            'WHERE user_id IS NOT NULL',
+            'CREATE INDEX ix_analytics_logs_department_timestamp ON analytics_logs (department, access_timestamp)',
+            'CREATE INDEX ix_analytics_logs_account_type_timestamp ON analytics_logs (account_type, access_timestamp)',
+            'CREATE INDEX ix_analytics_logs_failed_timestamp ON analytics_logs (access_timestamp) '
+            'WHERE NOT auth_success',
+            'CREATE INDEX ix_analytics_logs_denied_timestamp ON analytics_logs (access_timestamp) '
+            'WHERE access_denied',
+            'CREATE INDEX ix_analytics_logs_access_timestamp_brin ON analytics_logs USING brin (access_timestamp)',
+        ],
+        'new_indexes': [],
+    },
+    'access_logs': {
+        'column': 'timestamp',
+        'foreign_keys': [('user_id', 'users'), ('journal_id', 'journals'), ('proxy_config_id', 'proxy_configs')],
+        'indexes': [
+            'CREATE INDEX ix_access_logs_timestamp ON access_logs ("timestamp")',
+        ],
+        # Added by this migration
+        'new_indexes': [
+            'CREATE INDEX ix_access_logs_journal_timestamp ON access_logs (journal_id, "timestamp")',
+            'CREATE INDEX ix_access_logs_user_timestamp ON access_logs (user_id, "timestamp")',
+        ],
+    },
+}
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def rebuild(table, spec, partitioned):
+    """Copy ``table`` into a new (partitioned or plain) table of the same name"""
+    old = f'{table}_old'
+    column = spec['column']
+    bind = op.get_bind()
+
+    # Views (e.g. journal_access_stats) follow the renamed table; recreate
+    # them on the new one afterwards
+    views = bind.execute(sa.text(
+        "SELECT DISTINCT v.relname, pg_get_viewdef(v.oid) FROM pg_depend d "
+        "JOIN pg_rewrite r ON r.oid = d.objid "
+        "JOIN pg_class v ON v.oid = r.ev_class "
+        "WHERE d.refobjid = CAST(:table AS regclass) AND v.relkind = 'v'"
+    ), {'table': table}).all()
+    for name, _ in views:
+        op.execute(f'DROP VIEW {name}')
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+
+    if partitioned:
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ("{column}")')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" SET NOT NULL')
+        # A partitioned table's primary key must contain the partition key
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, "{column}")')
+
+        now = datetime.utcnow()
+        oldest = bind.execute(sa.text(f'SELECT min("{column}") FROM {old}')).scalar() or now
+        # Rows without a timestamp go to the oldest month
+        bind.execute(sa.text(f'UPDATE {old} SET "{column}" = :oldest WHERE "{column}" IS NULL'), {'oldest': oldest})
+
+        start = datetime(oldest.year, oldest.month, 1)
+        last = add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+        while start <= last:
+            end = add_months(start, 1)
+            op.execute(
+                f"CREATE TABLE {table}_p{start:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            )
+            start = end
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    else:
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" DROP NOT NULL')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+
+    for local, remote in spec['foreign_keys']:
+        op.execute(f'ALTER TABLE {table} ADD FOREIGN KEY ({local}) REFERENCES {remote} (id)')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    # Drops the old table's partitions and indexes with it
+    op.execute(f'DROP TABLE {old}')
+
+    for name, definition in views:
+        op.execute(f'CREATE VIEW {name} AS {definition}')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.create_index('ix_access_logs_journal_timestamp', ['journal_id', 'timestamp'], unique=False)
+            batch_op.create_index('ix_access_logs_user_timestamp', ['user_id', 'timestamp'], unique=False)
+        return
+
+    for table, spec in TABLES.items():
+        rebuild(table, spec, partitioned=True)
+        for statement in spec['indexes'] + spec['new_indexes']:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.drop_index('ix_access_logs_user_timestamp')
+            batch_op.drop_index('ix_access_logs_journal_timestamp')
+        return
+
+    # Partitions detached by the retention job are left as they are
+    for table, spec in TABLES.items():
+        rebuild(table, spec, partitioned=False)
+        for statement in spec['indexes']:
+            op.execute(statement)
@@ -0,0 +1,81 @@
+"""Add (timestamp, id) indexes for keyset pagination of the log tables
+
+Revision ID: f7c3b9d1e8a4
+Revises: e5a1c9f7b3d2
+Create Date: 2026-10-17 21:12:09.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c3b9d1e8a4'
+down_revision = 'e5a1c9f7b3d2'
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns); keyset_page orders and seeks on these
+INDEXES = [
+    ('access_logs', 'ix_access_logs_timestamp_id', ['timestamp', 'id']),
+    ('analytics_logs', 'ix_analytics_logs_timestamp_id', ['access_timestamp', 'id']),
+]
+
+
+def create_index_online(bind, table, name, columns):
+    """CREATE INDEX without blocking inserts, also on a partitioned table.
+
+    CONCURRENTLY is not supported on a partitioned parent, so the parent
+    index is created ON ONLY the parent (invalid, no data), each partition
+    gets its own index built concurrently, and attaching the last one makes
+    the parent index valid. Partitions created later inherit it.
+    """
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    relkind = bind.execute(sa.text(
+        "SELECT relkind FROM pg_class WHERE oid = CAST(:table AS regclass)"
+    ), {'table': table}).scalar()
+    if relkind != 'p':
+        op.execute(f'CREATE INDEX CONCURRENTLY {name} ON {table} ({column_list})')
+        return
+
+    op.execute(f'CREATE INDEX {name} ON ONLY {table} ({column_list})')
+    partitions = bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+    ), {'table': table}).scalars().all()
+    suffix = name[len(f'ix_{table}'):]
+    for partition in partitions:
+        partition_index = f'ix_{partition}{suffix}'
+        op.execute(f'CREATE INDEX CONCURRENTLY {partition_index} ON {partition} ({column_list})')
+        op.execute(f'ALTER INDEX {name} ATTACH PARTITION {partition_index}')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table, name, columns in INDEXES:
+                create_index_online(bind, table, name, columns)
+        # (timestamp, id) serves every query the single-column index did
+        op.execute('DROP INDEX ix_access_logs_timestamp')
+    else:
+        for table, name, columns in INDEXES:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.create_index(name, columns, unique=False)
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.drop_index('ix_access_logs_timestamp')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE INDEX ix_access_logs_timestamp ON access_logs ("timestamp")')
+        for table, name, _ in reversed(INDEXES):
+            # Drops the partitions' indexes with it
+            op.execute(f'DROP INDEX {name}')
+    else:
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.create_index('ix_access_logs_timestamp', ['timestamp'], unique=False)
+        for table, name, _ in reversed(INDEXES):
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.drop_index(name)
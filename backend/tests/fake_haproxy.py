@@ -0,0 +1,116 @@
+import os
+import socket
+import threading
+
+
+class FakeHAProxy:
+    """Speaks the subset of the HAProxy Runtime API the runtime driver uses.
+
+    Listens on a UNIX socket and answers one command per connection, like
+    HAProxy's stats socket in non-interactive mode. ``backends`` maps a
+    backend name to its servers ({name: {'addr', 'port', 'enabled'}});
+    ``maps`` maps a map file path to its ordered entries. Every command
+    received is kept in ``commands``.
+    """
+
+    def __init__(self, path, backends, map_path):
+        self.path = path
+        self.backends = backends
+        self.maps = {map_path: {}}
+        self.commands = []
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(8)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # shutdown wakes the accept() in the serving thread; close alone does not
+        self._server.shutdown(socket.SHUT_RDWR)
+        self._server.close()
+        self._thread.join(timeout=2)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            with connection:
+                data = b''
+                while not data.endswith(b'\n'):
+                    chunk = connection.recv(4096)
+                    if not chunk:
+                        break
+                    data += chunk
+                command = data.decode().strip()
+                self.commands.append(command)
+                connection.sendall(self.handle(command).encode())
+
+    def handle(self, command):
+        words = command.split()
+        if words[:2] == ['show', 'map'] and len(words) == 3:
+            entries = self.maps.get(words[2])
+            if entries is None:
+                return 'Unknown map identifier. Please use #<id> or <file>.\n'
+            return ''.join(f'0x{index + 1:x} {key} {value}\n' for index, (key, value) in enumerate(entries.items()))
+
+        if len(words) >= 4 and words[1] == 'map' and words[0] in ('add', 'set', 'del'):
+            entries = self.maps.get(words[2])
+            if entries is None:
+                return 'Unknown map identifier. Please use #<id> or <file>.\n'
+            key = words[3]
+            if words[0] == 'add' and len(words) == 5:
+                entries[key] = words[4]
+            elif words[0] == 'set' and len(words) == 5:
+                if key not in entries:
+                    return 'Entry not found.\n'
+                entries[key] = words[4]
+            elif words[0] == 'del' and len(words) == 4:
+                if key not in entries:
+                    return 'Key not found.\n'
+                del entries[key]
+            else:
+                return f"'{words[0]} map' expects three parameters: map identifier, key and value.\n"
+            return '\n'
+
+        if words[:2] == ['add', 'server'] and len(words) >= 4:
+            backend, _, name = words[2].partition('/')
+            if backend not in self.backends:
+                return 'No such backend.\n'
+            if name in self.backends[backend]:
+                return 'Already exists a server with the same name in backend.\n'
+            addr, _, port = words[3].rpartition(':')
+            # Dynamic servers start in maintenance
+            self.backends[backend][name] = {'addr': addr, 'port': int(port), 'enabled': False}
+            return 'New server registered.\n'
+
+        if len(words) == 3 and words[0] in ('enable', 'disable') and words[1] == 'server':
+            server = self._server_of(words[2])
+            if server is None:
+                return 'No such server.\n'
+            server['enabled'] = words[0] == 'enable'
+            return '\n'
+
+        if words[:2] == ['set', 'server'] and len(words) == 7 and words[3] == 'addr' and words[5] == 'port':
+            server = self._server_of(words[2])
+            if server is None:
+                return 'No such server.\n'
+            old = (server['addr'], server['port'])
+            server['addr'], server['port'] = words[4], int(words[6])
+            return f"IP changed from '{old[0]}' to '{words[4]}', port changed from '{old[1]}' to '{words[6]}' by 'stats socket command'\n"
+
+        return 'Unknown command. Please enter one of the following commands only :\n'
+
+    def _server_of(self, name):
+        backend, _, server = name.partition('/')
+        return self.backends.get(backend, {}).get(server)
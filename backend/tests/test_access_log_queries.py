@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import db
+from app.models.access_log import AccessLog
+from app.models.journal import Journal
+from app.models.user import User
+from app.services.token_service import token_versions
+
+
+@contextmanager
+def counted_statements():
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+
+def seed(rows=60):
+    admin = User(username='admin', email='admin@example.org', password='Admin-pass-1', is_admin=True)
+    users = [User(username=f'user{i}', email=f'user{i}@example.org', password='User-pass-1') for i in range(20)]
+    journals = [
+        Journal(name=f'Journal {i}', slug=f'journal-{i}', base_url=f'https://j{i}.example.org', proxy_path=f'j{i}')
+        for i in range(20)
+    ]
+    db.session.add_all([admin, *users, *journals])
+    db.session.flush()
+    now = datetime.utcnow()
+    db.session.add_all(
+        AccessLog(user_id=users[i % 20].id, journal_id=journals[i % 20].id, ip_address='10.0.0.1',
+                  request_method='GET', request_path=f'/j{i % 20}/', timestamp=now - timedelta(minutes=i))
+        for i in range(rows)
+    )
+    db.session.commit()
+    return create_access_token(identity=str(admin.id), additional_claims=token_versions.claims(admin))
+
+
+def test_access_log_page_size_does_not_change_the_query_count(app, client):
+    headers = {'Authorization': f'Bearer {seed()}'}
+
+    counts = {}
+    for per_page in (10, 50):
+        for mode in ({}, {'pagination': 'keyset'}):
+            with counted_statements() as statements:
+                response = client.get('/api/admin/access-logs', query_string={'per_page': per_page, **mode},
+                                      headers=headers)
+            assert response.status_code == 200
+            logs = response.get_json()['logs']
+            assert len(logs) == per_page
+            assert all(log['user'] and log['journal'] for log in logs)
+            counts[(per_page, bool(mode))] = len(statements)
+
+    assert counts[(10, False)] == counts[(50, False)]
+    assert counts[(10, True)] == counts[(50, True)]
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from app.services.analytics_cache import AnalyticsCache
+
+
+class DictClient:
+    """The strings and sorted set commands the cache uses, over dicts"""
+
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def expire(self, key, ttl):
+        pass
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update({member: float(score) for member, score in mapping.items()})
+
+    def zrangebyscore(self, key, low, high):
+        members = self.sorted_sets.get(key, {})
+        return [member for member, score in members.items() if float(low) <= score <= float(high)]
+
+    def zremrangebyscore(self, key, low, high):
+        for member in self.zrangebyscore(key, low, high):
+            del self.sorted_sets[key][member]
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.sorted_sets.get(key, {}).pop(member, None)
+
+
+class Pipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((getattr(self.client, name), args, kwargs))
+
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+def test_live_ranges_are_computed_for_the_rounded_end(monkeypatch):
+    cache = AnalyticsCache()
+    client = DictClient()
+    monkeypatch.setattr(cache, 'client', lambda: client)
+    calls = []
+
+    @cache.cached()
+    def report(start_date, end_date):
+        calls.append((start_date, end_date))
+        return {'end': end_date.isoformat()}
+
+    minute = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=2)
+    start = minute - timedelta(days=30)
+
+    first = report(start, minute + timedelta(seconds=10))
+    second = report(start, minute + timedelta(seconds=50))
+    assert first == second == {'end': minute.isoformat()}
+    assert calls == [(start, minute)]
+
+    # A later end is a different key, not the earlier result
+    report(start, minute + timedelta(minutes=1))
+    assert len(calls) == 2
+
+
+def test_written_rows_invalidate_only_the_live_ranges_they_fall_in(monkeypatch):
+    cache = AnalyticsCache()
+    client = DictClient()
+    monkeypatch.setattr(cache, 'client', lambda: client)
+    calls = []
+
+    @cache.cached()
+    def report(start_date, end_date):
+        calls.append(start_date)
+        return {'rows': len(calls)}
+
+    now = datetime.utcnow()
+    month = (now - timedelta(days=30), now)
+    last_minutes = (now - timedelta(minutes=3), now)
+    closed = (now - timedelta(days=60), now - timedelta(days=31))
+    for start, end in (month, last_minutes, closed):
+        report(start, end)
+    assert len(calls) == 3
+
+    # A late flush of rows from ten minutes ago only touches the month
+    cache.rows_written([now - timedelta(minutes=12), now - timedelta(minutes=10)])
+    assert cache.invalidations == 1
+    for start, end in (month, last_minutes, closed):
+        report(start, end)
+    assert len(calls) == 4
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.analytics_log import AnalyticsLog
+from app.services.analytics_service import AnalyticsService
+
+
+@pytest.fixture
+def service(app, monkeypatch):
+    service = AnalyticsService()
+    aggregated = []
+    aggregate = service.rollups.aggregate
+
+    def counted(*args, **kwargs):
+        aggregated.append(args)
+        return aggregate(*args, **kwargs)
+
+    monkeypatch.setattr(service.rollups, 'aggregate', counted)
+    service.aggregated = aggregated
+    return service
+
+
+def seed(now):
+    db.session.add_all(
+        AnalyticsLog(
+            ip_address='10.0.0.1', resource_name=f'Journal {i % 3}', user_id=i % 4 + 1,
+            department='Physics' if i % 2 else 'History', auth_success=i % 5 != 0,
+            access_timestamp=now - timedelta(hours=i * 5)
+        )
+        for i in range(20)
+    )
+    db.session.commit()
+
+
+def test_exact_reports_still_take_sums_from_rollups(service):
+    now = datetime.utcnow()
+    seed(now)
+    start = now - timedelta(days=10)
+
+    stats = service.get_usage_statistics(start, now, filters={'department': 'Physics'}, exact=True)
+    assert stats['total_accesses'] == 10
+    assert stats['unique_users'] == 2
+    assert stats['unique_resources'] == 3
+    assert stats['failed_accesses'] == 2
+
+    hourly = service.get_hourly_usage_pattern(start, now, exact=True)
+    assert sum(hour['access_count'] for hour in hourly) == 20
+
+    trend = service.get_daily_usage_trend(days=10, exact=True)
+    assert sum(day['access_count'] for day in trend) == 20
+    assert all(0 < day['unique_users'] <= 4 for day in trend)
+
+    breakdown = service.get_custom_breakdown_report('department', start, now, exact=True)
+    assert {row['breakdown_value']: row['unique_users'] for row in breakdown} == {'Physics': 2, 'History': 2}
+    assert len(service.aggregated) == 4
@@ -0,0 +1,49 @@
+from app import db
+from app.models.user import User
+from app.services.token_service import token_versions
+
+
+def login(client, username='reader', password='Reader-pass-1'):
+    return client.post('/api/auth/login', json={'username': username, 'password': password})
+
+
+def add_user(username='reader', password='Reader-pass-1', **kwargs):
+    user = User(username=username, email=f'{username}@example.org', password=password,
+                first_name='Test', last_name='User', **kwargs)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_tokens_work_and_revoke_without_redis(app, client):
+    # No Redis in the test environment: revocation falls back to users.token_version
+    add_user()
+    response = login(client)
+    assert response.status_code == 200
+    tokens = response.get_json()
+
+    assert client.get('/api/auth/profile', headers=auth(tokens['access_token'])).status_code == 200
+    assert client.post('/api/auth/logout', headers=auth(tokens['access_token'])).status_code == 200
+    assert client.get('/api/auth/profile', headers=auth(tokens['access_token'])).status_code == 401
+    assert client.post('/api/auth/refresh', headers=auth(tokens['refresh_token'])).status_code == 401
+
+
+def test_refresh_reloads_the_user(app, client):
+    user = add_user()
+    refresh_token = login(client).get_json()['refresh_token']
+
+    # Deactivated behind the token service's back: the version is unchanged
+    user.is_active = False
+    db.session.commit()
+    assert client.post('/api/auth/refresh', headers=auth(refresh_token)).status_code == 401
+
+
+def test_tokens_without_a_version_claim_count_as_version_0(app):
+    user = add_user()
+    assert not token_versions.is_revoked({'sub': str(user.id)})
+    token_versions.revoke(user.id)
+    assert token_versions.is_revoked({'sub': str(user.id)})
@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+from app.services.config_apply_queue import ConfigApplyQueue, JournalChange
+
+
+def change(journal_id):
+    return JournalChange(SimpleNamespace(id=journal_id), None)
+
+
+def test_applied_generation_waits_for_failed_changes(app):
+    # No Redis in the test environment: the per-process counters are used
+    results = [False, True]
+    queue = ConfigApplyQueue(lambda changes: results.pop(0), debounce=0)
+
+    assert queue.submit(change(1)) == 1
+    assert queue.status()['applied_generation'] == 0
+    assert queue.status()['last_error'] == 'Generation 1 failed to apply'
+
+    assert queue.submit(change(2)) == 2
+    status = queue.status()
+    assert status['pending_generation'] == 2
+    assert status['applied_generation'] == 2
+    assert status['last_error'] is None
@@ -0,0 +1,46 @@
+from app import db
+from app.models.journal import Journal
+from app.services.haproxy_log_ingester import HAProxyLogIngester, JournalLookup
+
+
+def log_line(backend, server, path):
+    return (
+        '<134>Oct 10 13:55:36 haproxy[7]: 10.1.2.3:51234 [10/Oct/2026:13:55:36.123] '
+        f'libproxy_frontend {backend}/{server} 0/0/1/20/21 200 512 - - ---- 1/1/0/0/0 0/0 '
+        f'"GET {path} HTTP/1.1"'
+    )
+
+
+def add_journal(slug):
+    journal = Journal(name=slug.title(), slug=slug, base_url=f'https://{slug}.example.org', proxy_path=slug)
+    db.session.add(journal)
+    db.session.commit()
+    return journal.id
+
+
+def test_non_journal_lines_are_skipped(app, tmp_path):
+    ingester = HAProxyLogIngester(str(tmp_path / 'dead.log'), lookup=JournalLookup())
+    for backend, server in [('libproxy_frontend', '<NOSRV>'), ('libproxy_backend', 'api1'),
+                            ('frontend_backend', 'web1'), ('nature_backend', '<NOSRV>')]:
+        assert ingester.parse_line(log_line(backend, server, '/nature/article')) == (None, None)
+
+
+def test_new_journal_is_found_without_waiting_for_the_reload_interval(app, tmp_path):
+    lookup = JournalLookup(reload_interval=3600)
+    nature_id = add_journal('nature')
+    assert lookup.resolve('nature_backend', '/nature/') == nature_id
+
+    # Added after the cache was loaded
+    science_id = add_journal('science')
+    ingester = HAProxyLogIngester(str(tmp_path / 'dead.log'), lookup=lookup)
+    row, error = ingester.parse_line(log_line('journal_slot_3', 'srv1', '/science/article?id=1'))
+    assert error is None
+    assert row['journal_id'] == science_id
+
+    # Repeated misses for the same name are throttled
+    reloads = []
+    original = lookup.reload
+    lookup.reload = lambda: reloads.append(1) or original()
+    assert lookup.resolve('ghost_backend', '/ghost/') is None
+    assert lookup.resolve('ghost_backend', '/ghost/') is None
+    assert len(reloads) == 1
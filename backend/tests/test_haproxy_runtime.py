@@ -0,0 +1,130 @@
+import tempfile
+from types import SimpleNamespace
+import pytest
+from app.services.haproxy_runtime import HAProxyRuntimeClient, HAProxyRuntimeDriver, is_error_response
+from tests.fake_haproxy import FakeHAProxy
+
+MAP_PATH = '/usr/local/etc/haproxy/maps/journal_slots.map'
+
+
+def make_journal(proxy_path='nature', base_url='http://127.0.0.1:8080', is_active=True):
+    return SimpleNamespace(
+        slug=proxy_path, proxy_path=proxy_path, base_url=base_url, is_active=is_active,
+        custom_headers=None, timeout=None
+    )
+
+
+@pytest.fixture
+def haproxy():
+    directory = tempfile.mkdtemp()
+    backends = {
+        f'journal_slot_{n}': {'srv1': {'addr': '0.0.0.0', 'port': 0, 'enabled': False}}
+        for n in (1, 2)
+    }
+    fake = FakeHAProxy(f'{directory}/admin.sock', backends, MAP_PATH).start()
+    yield fake
+    fake.stop()
+
+
+def make_driver(fake, slot_count=2):
+    return HAProxyRuntimeDriver(HAProxyRuntimeClient(fake.path), MAP_PATH, slot_count)
+
+
+def test_add_journal_uses_a_free_slot(haproxy):
+    assert make_driver(haproxy).apply(make_journal())
+
+    assert haproxy.maps[MAP_PATH] == {'/nature': 'journal_slot_1'}
+    assert haproxy.backends['journal_slot_1']['srv1'] == {'addr': '127.0.0.1', 'port': 8080, 'enabled': True}
+    assert f'add map {MAP_PATH} /nature journal_slot_1' in haproxy.commands
+
+
+def test_update_repoints_the_same_slot(haproxy):
+    driver = make_driver(haproxy)
+    driver.apply(make_journal())
+
+    assert driver.apply(make_journal(base_url='http://127.0.0.2:9090'))
+
+    assert haproxy.maps[MAP_PATH] == {'/nature': 'journal_slot_1'}
+    assert haproxy.backends['journal_slot_1']['srv1'] == {'addr': '127.0.0.2', 'port': 9090, 'enabled': True}
+    assert f'set map {MAP_PATH} /nature journal_slot_1' in haproxy.commands
+    assert not haproxy.backends['journal_slot_2']['srv1']['enabled']
+
+
+def test_renamed_path_replaces_the_map_entry(haproxy):
+    driver = make_driver(haproxy)
+    driver.apply(make_journal())
+
+    assert driver.apply(make_journal(proxy_path='nature-new'), previous_proxy_path='nature')
+
+    assert haproxy.maps[MAP_PATH] == {'/nature-new': 'journal_slot_1'}
+    assert f'del map {MAP_PATH} /nature' in haproxy.commands
+
+
+def test_tls_journal_registers_a_tls_server(haproxy):
+    assert make_driver(haproxy).apply(make_journal(base_url='https://127.0.0.1'))
+
+    slot = haproxy.backends['journal_slot_1']
+    assert slot['srv_tls'] == {'addr': '127.0.0.1', 'port': 443, 'enabled': True}
+    assert not slot['srv1']['enabled']
+
+
+def test_disable_removes_the_route_and_frees_the_slot(haproxy):
+    driver = make_driver(haproxy)
+    driver.apply(make_journal())
+
+    assert driver.apply(make_journal(is_active=False))
+
+    assert haproxy.maps[MAP_PATH] == {}
+    assert not haproxy.backends['journal_slot_1']['srv1']['enabled']
+    # The freed slot is reused
+    assert driver.apply(make_journal(proxy_path='science'))
+    assert haproxy.maps[MAP_PATH] == {'/science': 'journal_slot_1'}
+
+
+def test_names_containing_error_words_are_not_failures(haproxy):
+    assert make_driver(haproxy).apply(make_journal(proxy_path='error-not-found-journal'))
+    assert haproxy.maps[MAP_PATH] == {'/error-not-found-journal': 'journal_slot_1'}
+
+
+def test_rejected_command_fails_the_apply(haproxy):
+    driver = HAProxyRuntimeDriver(HAProxyRuntimeClient(haproxy.path), '/missing.map', 2)
+    assert not driver.apply(make_journal())
+
+
+def test_exhausted_slot_pool_needs_a_reload(haproxy):
+    driver = make_driver(haproxy)
+    assert driver.apply(make_journal('a'))
+    assert driver.apply(make_journal('b'))
+
+    assert not driver.apply(make_journal('c'))
+    assert '/c' not in haproxy.maps[MAP_PATH]
+
+
+def test_exhausted_slot_pool_falls_back_to_a_full_reload(app, haproxy, monkeypatch):
+    from app.services.proxy_service import ProxyService
+
+    service = ProxyService()
+    service.runtime_driver = make_driver(haproxy, slot_count=1)
+    reloads = []
+    monkeypatch.setattr(service, 'update_main_haproxy_config', lambda: True)
+    monkeypatch.setattr(service, 'reload_haproxy', lambda: reloads.append(True) or True)
+
+    assert service.apply_journal_change(make_journal('a'))
+    assert reloads == []
+
+    assert service.apply_journal_change(make_journal('b'))
+    assert reloads == [True]
+
+
+@pytest.mark.parametrize('response, failed', [
+    ('\n', False),
+    ('New server registered.\n', False),
+    ("IP changed from '0.0.0.0' to '10.0.0.1' by 'stats socket command'\n", False),
+    ('0x1 /error-pages journal_slot_1\n', False),
+    ('No such server.\n', True),
+    ('Unknown command. Please enter one of the following commands only :\n', True),
+    ('Key not found.\n', True),
+    ('Permission denied\n', True),
+])
+def test_error_detection_reads_the_reply_prefix(response, failed):
+    assert is_error_response(response) is failed
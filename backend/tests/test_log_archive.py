@@ -0,0 +1,100 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models.analytics_log import AnalyticsLog
+from app.models.user import User
+from app.services.analytics_columnar import analytics_columnar
+from app.services.token_service import token_versions
+from app.utils.log_archive import ArchiveError, log_archiver
+
+
+@pytest.fixture
+def archiver(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(log_archiver, 'directory', str(tmp_path / 'archive'))
+    monkeypatch.setattr(log_archiver, 'archive_format', 'ndjson')
+    monkeypatch.setattr(log_archiver, 'hot_days', {'analytics_logs': 30, 'access_logs': 0})
+    monkeypatch.setattr(analytics_columnar, 'directory', str(tmp_path / 'columnar'))
+    monkeypatch.setattr(analytics_columnar, '_state', (None, None))
+    return log_archiver
+
+
+def refreshed(at):
+    """Record a snapshot refresh at ``at``"""
+    os.makedirs(analytics_columnar.directory, exist_ok=True)
+    with open(os.path.join(analytics_columnar.directory, 'state.json'), 'w') as state_file:
+        json.dump({'watermark': 0, 'refreshed_at': at.isoformat(), 'days': {}}, state_file)
+
+
+def add_log(timestamp, user_id=None):
+    db.session.add(AnalyticsLog(
+        ip_address='10.0.0.1', resource_name='Journal', access_timestamp=timestamp, user_id=user_id
+    ))
+    db.session.commit()
+
+
+def test_analytics_logs_are_not_archived_on_the_postgres_backend(archiver, monkeypatch):
+    monkeypatch.setattr(archiver, 'analytics_backend', 'postgres')
+    add_log(datetime.utcnow() - timedelta(days=60))
+
+    with pytest.raises(ArchiveError):
+        archiver.archive('analytics_logs')
+    assert AnalyticsLog.query.count() == 1
+
+
+def test_analytics_logs_are_archived_up_to_the_snapshot(archiver, monkeypatch):
+    monkeypatch.setattr(archiver, 'analytics_backend', 'auto')
+    monkeypatch.setattr(analytics_columnar, 'backend', 'auto')
+    now = datetime(2026, 10, 17, 12)
+    add_log(now - timedelta(days=90))
+    add_log(now - timedelta(days=45))
+
+    with pytest.raises(ArchiveError):
+        archiver.archive('analytics_logs', now)
+
+    # Rows after the snapshot's last refresh stay in the database
+    refreshed(now - timedelta(days=60))
+    result = archiver.archive('analytics_logs', now)
+    assert result['deleted'] == 1
+    assert AnalyticsLog.query.one().access_timestamp == now - timedelta(days=45)
+
+
+def test_ranges_reaching_archived_days_read_the_snapshot(archiver, monkeypatch):
+    monkeypatch.setattr(analytics_columnar, 'backend', 'auto')
+    now = datetime.utcnow()
+    # Stale for live ranges
+    refreshed(now - timedelta(days=1))
+
+    assert analytics_columnar.serves(now - timedelta(days=40), now - timedelta(days=35))
+    assert not analytics_columnar.serves(now - timedelta(days=7), now)
+
+
+def test_filtered_exports_include_archived_rows(archiver, client, monkeypatch):
+    monkeypatch.setattr(archiver, 'analytics_backend', 'auto')
+    admin = User(username='admin', email='admin@example.org', password='Admin-pass-1', is_admin=True)
+    reader = User(username='reader', email='reader@example.org', password='Reader-pass-1')
+    db.session.add_all([admin, reader])
+    db.session.commit()
+    now = datetime.utcnow()
+    add_log(now - timedelta(days=60), reader.id)
+    add_log(now - timedelta(days=59), admin.id)
+    add_log(now - timedelta(days=1), reader.id)
+    refreshed(now)
+    assert archiver.archive('analytics_logs')['deleted'] == 2
+
+    token = create_access_token(identity=str(admin.id), additional_claims=token_versions.claims(admin))
+    response = client.get(
+        '/api/analytics/logs',
+        query_string={
+            'format': 'ndjson', 'user_id': str(reader.id),
+            'start_date': (now - timedelta(days=90)).isoformat(), 'end_date': now.isoformat()
+        },
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['user_id'] for row in rows] == [reader.id, reader.id]
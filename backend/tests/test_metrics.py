@@ -0,0 +1,32 @@
+from app.models.access_log import access_log_writer
+
+
+def test_metrics_requires_admin_or_token(app, client):
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    app.config['METRICS_TOKEN'] = 'scrape-token'
+    response = client.get('/api/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    assert 'access_logs' in str(response.get_json())
+
+
+def test_failed_batch_is_retried(app, monkeypatch):
+    attempts = []
+    write_rows = access_log_writer.write_rows
+
+    def flaky(connection, rows):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise RuntimeError('connection reset')
+        write_rows(connection, rows)
+
+    monkeypatch.setattr(access_log_writer, 'write_rows', flaky)
+    monkeypatch.setattr(access_log_writer, 'flush_retries', 2)
+    monkeypatch.setattr(access_log_writer, 'retry_backoff', 0)
+    access_log_writer.reset_counters()
+
+    assert access_log_writer.write_batch([{'journal_id': 1, 'ip_address': '10.0.0.1'}])
+    assert attempts == [1, 1]
+    stats = access_log_writer.stats()
+    assert (stats['retries'], stats['failed'], stats['written']) == (1, 0, 1)
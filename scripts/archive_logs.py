@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Eski log satırlarını (analytics_logs, access_logs) soğuk arşive taşı.
+
+ANALYTICS_LOG_ARCHIVE_DAYS / ACCESS_LOG_ARCHIVE_DAYS günden eski satırlar
+gün gün LOG_ARCHIVE_DIR altındaki sıkıştırılmış dosyalara (Parquet ya da
+NDJSON) yazılır, manifest.json'a eklenir ve veritabanından parça parça
+silinir. Aynı anda tek bir arşivleyici çalıştırılmalıdır.
+
+Arşive taşınan analytics_logs günlerini raporlar yalnızca columnar
+snapshot'tan okur: analytics_logs ANALYTICS_BACKEND=auto ya da columnar
+iken ve refresh_columnar_snapshot.py en az bir kez çalışmışsa arşivlenir,
+snapshot'ın son refresh gününden ötesi arşivlenmez.
+
+Kullanım:
+  python archive_logs.py            # tek sefer çalıştır
+  python archive_logs.py loop 86400 # günde bir çalıştır
+  python archive_logs.py stats      # arşiv özetini göster
+"""
+
+import sys
+import time
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+from app import create_app
+from app.utils.log_archive import log_archiver
+
+
+def report(results):
+    for table, result in results.items():
+        if result['files']:
+            print(f"🗄️  {table}: {result['rows']} satır {len(result['files'])} dosyaya arşivlendi, "
+                  f"{result['deleted']} satır silindi")
+        for name in result['dropped']:
+            print(f"🗑️  {table}: {name} bölümü silindi")
+        if not result['files'] and not result['dropped']:
+            print(f"✅ {table}: arşivlenecek satır yok")
+
+
+def show_stats():
+    for table, stats in log_archiver.stats().items():
+        print(f"📊 {table}: {stats['rows']} satır, {stats['files']} dosya, "
+              f"{stats['bytes'] / 1024 / 1024:.1f} MB ({stats['oldest'] or '-'} → {stats['newest'] or '-'})")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'once'
+    if command not in ('once', 'loop', 'stats'):
+        print(__doc__)
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        if command == 'stats':
+            show_stats()
+            return
+        if command == 'once':
+            report(log_archiver.run())
+            return
+
+        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 86400
+        while True:
+            try:
+                report(log_archiver.run())
+            except Exception as e:
+                print(f"❌ Log arşivleme başarısız: {str(e)}")
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    main()
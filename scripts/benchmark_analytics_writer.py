@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Analytics log writer benchmark.
+
+Pushes synthetic analytics events (dicts and tuples) through the batched
+analytics log writer and reports end-to-end events per second, including the
+final flush. Uses a temporary SQLite file unless a database URL is given;
+against PostgreSQL the writer uses COPY.
+
+Usage: python benchmark_analytics_writer.py [events] [database_url]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from app import create_app, db
+from app.models.analytics_log import AnalyticsLog, analytics_log_writer
+
+TARGET_EVENTS_PER_SECOND = 20000
+DEFAULT_EVENTS = 200000
+
+
+def make_event(i):
+    """One resource access event as the proxy would log it"""
+    return {
+        'user_id': None,
+        'user_identifier': f'user-{i % 5000}',
+        'account_type': 'student',
+        'department': f'Department {i % 40}',
+        'ip_address': f'10.0.{(i >> 8) & 255}.{i & 255}',
+        'resource_name': f'Journal {i % 1000}',
+        'resource_type': 'journal',
+        'resource_provider': 'Example Publisher',
+        'session_id': f'session-{i % 20000}',
+        'auth_success': True,
+        'access_timestamp': datetime.utcnow(),
+        'request_method': 'GET',
+        'request_path': f'/journal-{i % 1000}/article/{i}',
+        'response_status': 200,
+        'response_size': 5120,
+        'response_time': 42.0
+    }
+
+
+def run_batch(label, events):
+    analytics_log_writer.reset_counters()
+    started = time.perf_counter()
+    for event in events:
+        analytics_log_writer.enqueue(event)
+    enqueued_at = time.perf_counter()
+    analytics_log_writer.shutdown()
+    finished = time.perf_counter()
+
+    stats = analytics_log_writer.stats()
+    rate = stats['written'] / (finished - started)
+    print(f"{label:<7} {stats['written']:>9} {(enqueued_at - started) * 1e6 / len(events):>10.2f}us "
+          f"{(finished - started) * 1000:>9.0f}ms {rate:>11.0f}/s {stats['dropped']:>8} "
+          f"{stats['avg_flush_ms']:>9.1f}ms {'ok' if rate >= TARGET_EVENTS_PER_SECOND else 'SLOW':>6}")
+
+
+def run(count, database_url):
+    app = create_app('testing')
+    app.config['SQLALCHEMY_ECHO'] = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not database_url:
+            database_url = f"sqlite:///{os.path.join(tmp, 'analytics.db')}"
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+
+        with app.app_context():
+            db.create_all()
+            analytics_log_writer.init_app(app, 'ANALYTICS_LOG')
+            analytics_log_writer.async_mode = True
+            analytics_log_writer.overflow_policy = 'block'
+            analytics_log_writer.block_timeout = 5.0
+            analytics_log_writer.capacity = 50000
+            analytics_log_writer.batch_size = 5000
+
+            dict_events = [make_event(i) for i in range(count)]
+            tuple_events = [analytics_log_writer.prepare(event) for event in dict_events]
+
+            print(f"{db.engine.dialect.name}, {len(analytics_log_writer.columns)} columns, "
+                  f"target {TARGET_EVENTS_PER_SECOND}/s")
+            print(f"{'input':<7} {'events':>9} {'enqueue':>12} {'total':>11} {'rate':>13} "
+                  f"{'dropped':>8} {'avg flush':>11} {'':>6}")
+            run_batch('dict', dict_events)
+            run_batch('tuple', tuple_events)
+            print(f"rows in table: {AnalyticsLog.query.count()}")
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_EVENTS,
+        sys.argv[2] if len(sys.argv) > 2 else None
+    )
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Columnar (DuckDB) vs PostgreSQL analytics report benchmark.
+
+Seeds a PostgreSQL database with synthetic analytics events spread over a
+year (unless analytics_logs already has rows), writes the Parquet snapshot,
+then runs each AnalyticsService report on both backends. It reports the best
+time of each and whether the outputs match. Top-N reports may differ on ties
+at the cut-off. Use a scratch database: tables are created with
+db.create_all() and users/events are inserted into it. Needs the duckdb and
+pyarrow packages.
+
+Usage: python benchmark_columnar_analytics.py database_url [events] [snapshot_dir]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from sqlalchemy import text
+from config import TestingConfig
+from app import create_app, db
+from app.models.user import User
+from app.models.analytics_log import AnalyticsLog, analytics_log_writer
+from app.services.analytics_service import AnalyticsService
+from app.services.analytics_columnar import analytics_columnar
+
+DEFAULT_EVENTS = 10000000
+DAYS = 365
+USERS = 2000
+BATCH = 50000
+REPEAT = 3
+
+COUNTRIES = {
+    'Turkey': [('Ankara', ['Ankara', 'Polatlı']), ('İstanbul', ['Kadıköy', 'Beşiktaş']), ('İzmir', ['Bornova'])],
+    'Germany': [('Berlin', ['Berlin']), ('Bavaria', ['Munich'])],
+    'United States': [('California', ['Berkeley', 'Los Angeles']), ('Massachusetts', ['Boston'])],
+    'France': [('Île-de-France', ['Paris'])],
+}
+
+
+def make_event(i, count, user_ids, now):
+    """Events spread evenly over DAYS, in time order like the live writer's"""
+    rng = random.Random(i)
+    country = rng.choice(list(COUNTRIES))
+    region, cities = rng.choice(COUNTRIES[country])
+    department = rng.randrange(40)
+    denied = rng.random() < 0.02
+    success = rng.random() >= 0.03
+    return {
+        'user_id': rng.choice(user_ids) if rng.random() < 0.7 else None,
+        'account_type': rng.choice(('student', 'faculty', 'staff', 'guest')),
+        'department': f'Department {department}',
+        'academic_unit': f'Unit {department}-{rng.randrange(5)}',
+        'country': country,
+        'region': region,
+        'city': rng.choice(cities),
+        'ip_address': f'10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(256)}',
+        'resource_name': f'Journal {int(rng.paretovariate(1.2)) % 5000}',
+        'resource_type': rng.choice(('journal', 'database', 'ebook')),
+        'resource_provider': f'Publisher {rng.randrange(60)}',
+        'auth_success': success,
+        'auth_failure_reason': None if success else rng.choice(('invalid_credentials', 'expired_account')),
+        'access_denied': denied,
+        'denial_reason': rng.choice(('license_limit', 'ip_not_allowed')) if denied else None,
+        'access_timestamp': now - timedelta(days=DAYS) * (1 - i / count),
+        'page_views': rng.randrange(1, 6),
+        'downloads': rng.randrange(3),
+        'searches': rng.randrange(4)
+    }
+
+
+def seed(count, now):
+    user_ids = [user.id for user in User.query.limit(USERS).all()]
+    for i in range(len(user_ids), USERS):
+        user = User(username=f'columnar-bench-{i}', email=f'columnar-bench-{i}@example.org', password='columnar-bench')
+        db.session.add(user)
+        db.session.flush()
+        user_ids.append(user.id)
+    db.session.commit()
+
+    started = time.perf_counter()
+    for start in range(0, count, BATCH):
+        analytics_log_writer.write_batch(
+            make_event(i, count, user_ids, now) for i in range(start, min(start + BATCH, count))
+        )
+        done = min(start + BATCH, count)
+        print(f"\r  {done}/{count} events ({done / (time.perf_counter() - started):.0f}/s)", end='', flush=True)
+    print()
+    with db.engine.begin() as connection:
+        connection.execute(text('ANALYZE analytics_logs'))
+
+
+def normalized(report):
+    """Order-insensitive form of a report's output"""
+    rows = report if isinstance(report, list) else [report]
+    encoded = [
+        json.dumps({
+            key: round(value, 6) if isinstance(value, float) else value
+            for key, value in row.items()
+        }, sort_keys=True, default=str)
+        for row in rows
+    ]
+    return sorted(encoded)
+
+
+def timed(backend, report):
+    analytics_columnar.backend = backend
+    best, result = None, None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = report()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        db.session.rollback()
+    return best, result
+
+
+def run(database_url, count, snapshot_dir):
+    TestingConfig.SQLALCHEMY_DATABASE_URI = database_url
+    app = create_app('testing')
+    app.config['SQLALCHEMY_ECHO'] = False
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print('The benchmark needs a PostgreSQL database URL')
+            sys.exit(1)
+        db.create_all()
+
+        now = datetime.utcnow()
+        if AnalyticsLog.query.first() is None:
+            print(f"Seeding {count} analytics events over {DAYS} days...")
+            seed(count, now)
+        else:
+            print('analytics_logs already has rows; using them as they are')
+
+        analytics_columnar.directory = snapshot_dir
+        analytics_columnar.max_lag = timedelta(days=1)
+        analytics_columnar.threads = os.cpu_count() or 1
+        started = time.perf_counter()
+        days = analytics_columnar.rebuild()
+        size = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(snapshot_dir) for name in names
+        )
+        print(f"Snapshot: {days} days, {analytics_columnar.stats()['rows']} rows, "
+              f"{size / 1024 / 1024:.0f} MB in {time.perf_counter() - started:.1f}s")
+
+        service = AnalyticsService()
+        year = (now - timedelta(days=DAYS), now)
+        quarter = (now - timedelta(days=90), now)
+        cases = [
+            ('usage statistics, year', lambda: service.get_usage_statistics(*year, exact=True)),
+            ('usage statistics, department', lambda: service.get_usage_statistics(
+                *quarter, filters={'department': 'Department 7'}, exact=True)),
+            ('resource usage, year', lambda: service.get_resource_usage_report(*year)),
+            ('user activity, year', lambda: service.get_user_activity_report(*year)),
+            ('department usage, year', lambda: service.get_department_usage_report(*year)),
+            ('hourly pattern, year', lambda: service.get_hourly_usage_pattern(*year, exact=True)),
+            ('failed access, year', lambda: service.get_failed_access_analysis(*year)),
+            ('geographic, year', lambda: service.get_geographic_usage_report(*year, exact=True)),
+            ('turn-away, year', lambda: service.get_turn_away_analysis(*year)),
+            ('breakdown by country, year', lambda: service.get_custom_breakdown_report('country', *year, exact=True)),
+            ('breakdown by unit, year', lambda: service.get_custom_breakdown_report(
+                'academic_unit', *year, exact=True)),
+        ]
+
+        print(f"{'report':<32} {'postgres':>10} {'duckdb':>10} {'speedup':>8} {'output':>7}")
+        for label, report in cases:
+            postgres_time, postgres_result = timed('postgres', report)
+            columnar_time, columnar_result = timed('columnar', report)
+            match = normalized(postgres_result) == normalized(columnar_result)
+            print(f"{label:<32} {postgres_time * 1000:>8.0f}ms {columnar_time * 1000:>8.0f}ms "
+                  f"{postgres_time / columnar_time:>7.1f}x {'same' if match else 'DIFF':>7}")
+
+        counters = analytics_columnar.stats()
+        if counters['fallbacks']:
+            print(f"{counters['fallbacks']} DuckDB queries fell back to PostgreSQL")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    if len(sys.argv) > 3:
+        run(sys.argv[1], int(sys.argv[2]), sys.argv[3])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            run(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EVENTS, directory)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+HAProxy config generation benchmark.
+
+Compares the per-journal ACL frontend the generator used to emit with the
+map-based routing rule, for catalogs of 10 to 50k journals, and times a full
+refresh against an incremental refresh after a single journal change.
+
+Usage: python benchmark_haproxy_config.py [size ...]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from app import create_app, db
+from app.models.journal import Journal
+from app.services.haproxy_config import HAProxyConfigGenerator
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 50000]
+
+
+def legacy_frontend_rules(journals):
+    """Frontend rules as emitted before map-based routing (one ACL + one use_backend per journal)"""
+    acls = [f"    acl is_{j.slug} path_beg /{j.proxy_path}" for j in journals]
+    backends = [f"    use_backend {j.slug}_backend if is_{j.slug}" for j in journals]
+    return acls + backends
+
+
+def seed_journals(count):
+    """Replace the journals table with `count` synthetic rows"""
+    Journal.query.delete()
+    now = datetime.utcnow()
+    db.session.execute(Journal.__table__.insert(), [
+        {
+            'name': f'Journal {i}',
+            'slug': f'journal-{i}',
+            'base_url': f'https://journal{i}.example.org',
+            'proxy_path': f'journal-{i}',
+            'requires_auth': True,
+            'timeout': 30,
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def run(sizes):
+    app = create_app('testing')
+    app.config['SQLALCHEMY_ECHO'] = False
+
+    with app.app_context():
+        db.create_all()
+
+        print(f"{'journals':>9} {'acl rules':>10} {'map rules':>10} {'acl frontend':>13} "
+              f"{'map frontend':>13} {'config':>11} {'map file':>10} {'full':>9} {'incremental':>12}")
+
+        for size in sizes:
+            seed_journals(size)
+            generator = HAProxyConfigGenerator('/run/haproxy/admin.sock', '/maps/journals.map', slot_count=32)
+
+            started = time.perf_counter()
+            config = generator.refresh()
+            full_ms = (time.perf_counter() - started) * 1000
+
+            # Change one journal and refresh again
+            journal = Journal.query.first()
+            journal.base_url = 'https://changed.example.org'
+            journal.updated_at = datetime.utcnow() + timedelta(seconds=1)
+            db.session.commit()
+
+            started = time.perf_counter()
+            config = generator.refresh()
+            incremental_ms = (time.perf_counter() - started) * 1000
+
+            legacy_rules = legacy_frontend_rules(Journal.query.all())
+            frontend = config[config.index('frontend libproxy_frontend'):config.index('# Backend for LibProxy API')]
+            map_rules = sum(1 for line in frontend.splitlines() if line.strip().startswith('use_backend'))
+
+            print(f"{size:>9} {len(legacy_rules):>10} {map_rules:>10} "
+                  f"{sum(len(r) + 1 for r in legacy_rules):>12}B {len(frontend):>12}B "
+                  f"{len(config):>10}B {len(generator.map_document):>9}B "
+                  f"{full_ms:>7.1f}ms {incremental_ms:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
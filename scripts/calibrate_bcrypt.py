@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Hedef gecikmeye göre bcrypt maliyet faktörünü (BCRYPT_LOG_ROUNDS) seç.
+
+Kullanım:
+  python calibrate_bcrypt.py        # hash başına en fazla 250 ms
+  python calibrate_bcrypt.py 100    # hash başına en fazla 100 ms
+
+Üretim sunucusunda çalıştırın; önerilen değeri BCRYPT_LOG_ROUNDS olarak
+ayarlayın. Eski maliyetle saklanan şifreler kullanıcı giriş yaptığında
+yeni maliyetle yeniden hash'lenir.
+"""
+
+import sys
+
+sys.path.append('/app')
+from app.services.password_hasher import calibrate
+
+
+def main():
+    try:
+        target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250.0
+    except ValueError:
+        print(__doc__)
+        sys.exit(1)
+
+    rounds, timings = calibrate(target_ms)
+    for cost, ms in timings.items():
+        marker = '  <-' if cost == rounds else ''
+        print(f"  cost {cost:2d}: {ms:8.1f} ms{marker}")
+
+    print(f"✅ Önerilen ayar: BCRYPT_LOG_ROUNDS={rounds} (hedef {target_ms:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Analytics log index check.
+
+Seeds a PostgreSQL database with synthetic analytics events (unless
+analytics_logs already has rows), runs each AnalyticsService report, and
+EXPLAINs the SQL it issues against analytics_logs. Every report must be
+planned with one of the indexes designed for it; the script exits non-zero
+if any is not. Use a scratch database: tables are created with
+db.create_all() and users/events are inserted into it.
+
+Usage: python check_analytics_indexes.py database_url [events]
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from sqlalchemy import event, text
+from config import TestingConfig
+from app import create_app, db
+from app.models.user import User
+from app.models.analytics_log import AnalyticsLog, analytics_log_writer
+from app.services.analytics_service import AnalyticsService
+
+DEFAULT_EVENTS = 200000
+DAYS = 90
+USERS = 100
+BATCH = 10000
+
+
+def make_event(i, count, user_ids, now):
+    """Events spread evenly over DAYS, in time order like the live writer's"""
+    rng = random.Random(i)
+    return {
+        'user_id': rng.choice(user_ids) if rng.random() < 0.7 else None,
+        'account_type': rng.choice(('student', 'faculty', 'staff', 'guest')),
+        'department': f'Department {rng.randrange(40)}',
+        'country': rng.choice(('Turkey', 'Germany', 'United States', 'France')),
+        'ip_address': f'10.0.{(i >> 8) & 255}.{i & 255}',
+        'resource_name': f'Journal {rng.randrange(1000)}',
+        'resource_type': 'journal',
+        'auth_success': rng.random() >= 0.03,
+        'access_denied': rng.random() < 0.02,
+        'denial_reason': 'license_limit',
+        'access_timestamp': now - timedelta(days=DAYS) * (1 - i / count),
+        'page_views': 1,
+        'downloads': rng.randrange(2),
+        'searches': 0
+    }
+
+
+def seed(count, now):
+    user_ids = [user.id for user in User.query.limit(USERS).all()]
+    for i in range(len(user_ids), USERS):
+        user = User(username=f'index-check-{i}', email=f'index-check-{i}@example.org', password='index-check')
+        db.session.add(user)
+        db.session.flush()
+        user_ids.append(user.id)
+    db.session.commit()
+
+    for start in range(0, count, BATCH):
+        analytics_log_writer.write_batch(
+            make_event(i, count, user_ids, now) for i in range(start, min(start + BATCH, count))
+        )
+    with db.engine.begin() as connection:
+        connection.execute(text('ANALYZE analytics_logs'))
+    return user_ids
+
+
+def index_names(plan):
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', ()):
+        names |= index_names(child)
+    return names
+
+
+def explain(report):
+    """Run ``report`` and return the indexes used by its analytics_logs queries"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'analytics_logs' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        report()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    used = set()
+    with db.engine.connect() as connection:
+        # On a partitioned table the plan names each partition's index;
+        # report the parent index it was created from instead
+        parents = dict(connection.execute(text(
+            "SELECT c.relname, p.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE c.relkind = 'i'"
+        )).all())
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+            used |= {parents.get(name, name) for name in index_names(plan[0]['Plan'])}
+    return used
+
+
+def run(database_url, count):
+    TestingConfig.SQLALCHEMY_DATABASE_URI = database_url
+    app = create_app('testing')
+    app.config['SQLALCHEMY_ECHO'] = False
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print('The index check needs a PostgreSQL database URL')
+            sys.exit(1)
+        db.create_all()
+
+        now = datetime.utcnow()
+        if AnalyticsLog.query.first() is None:
+            print(f"Seeding {count} analytics events over {DAYS} days...")
+            user_ids = seed(count, now)
+        else:
+            print('analytics_logs already has rows; using them as they are')
+            user_ids = [user.id for user in User.query.limit(USERS).all()]
+
+        service = AnalyticsService()
+        day = (now - timedelta(days=1), now)
+        month = (now - timedelta(days=30), now)
+        user_id = user_ids[0]
+
+        cases = [
+            ('usage statistics, 1 day', lambda: service.get_usage_statistics(*day, exact=True),
+             ('ix_analytics_logs_timestamp_resource',)),
+            ('usage statistics, department', lambda: service.get_usage_statistics(
+                *month, filters={'department': 'Department 7'}, exact=True),
+             ('ix_analytics_logs_department_timestamp',)),
+            ('usage statistics, account type', lambda: service.get_usage_statistics(
+                *day, filters={'account_type': 'guest'}, exact=True),
+             ('ix_analytics_logs_account_type_timestamp', 'ix_analytics_logs_timestamp_resource')),
+            ('usage statistics, user', lambda: service.get_usage_statistics(
+                *month, filters={'user_id': user_id}, exact=True),
+             ('ix_analytics_logs_user_timestamp',)),
+            ('resource usage, 1 day', lambda: service.get_resource_usage_report(*day),
+             ('ix_analytics_logs_timestamp_resource',)),
+            ('user activity, 1 day', lambda: service.get_user_activity_report(*day),
+             ('ix_analytics_logs_timestamp_resource', 'ix_analytics_logs_user_timestamp')),
+            ('department usage, 1 day', lambda: service.get_department_usage_report(*day),
+             ('ix_analytics_logs_timestamp_resource',)),
+            ('failed access, 30 days', lambda: service.get_failed_access_analysis(*month),
+             ('ix_analytics_logs_failed_timestamp',)),
+            ('turn-away, 30 days', lambda: service.get_turn_away_analysis(*month),
+             ('ix_analytics_logs_denied_timestamp',)),
+            ('daily trend, 7 days', lambda: service.get_daily_usage_trend(days=7, exact=True),
+             ('ix_analytics_logs_timestamp_resource', 'ix_analytics_logs_access_timestamp_brin')),
+            ('log listing, user', lambda: AnalyticsLog.query.filter(AnalyticsLog.user_id == user_id)
+                .order_by(AnalyticsLog.access_timestamp.desc()).limit(50).all(),
+             ('ix_analytics_logs_user_timestamp',)),
+        ]
+
+        failures = 0
+        print(f"{'report':<32} {'result':<6} indexes used")
+        for label, report, expected in cases:
+            used = explain(report)
+            ok = bool(used & set(expected))
+            failures += not ok
+            print(f"{label:<32} {'ok' if ok else 'MISS':<6} {', '.join(sorted(used)) or 'sequential scan'}")
+            if not ok:
+                print(f"{'':<39}expected one of: {', '.join(expected)}")
+
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    run(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EVENTS)
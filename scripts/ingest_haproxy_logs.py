@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+HAProxy httplog -> access_logs ingester.
+
+Reads HAProxy request logs ("option httplog") and bulk loads them into the
+access_logs table. Lines that cannot be parsed or mapped to a journal are
+written to a dead-letter file.
+
+Usage:
+  python ingest_haproxy_logs.py file <path> [--follow]
+  docker logs -f libproxy_haproxy 2>&1 | python ingest_haproxy_logs.py stdin
+  python ingest_haproxy_logs.py udp 0.0.0.0:5140
+
+Options:
+  --dead-letter <path>   default: $HAPROXY_LOG_DEAD_LETTER or /app/logs/haproxy_dead_letter.log
+  --batch-size <n>       rows per insert (default 1000)
+"""
+
+import os
+import sys
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+from app import create_app
+from app.services.haproxy_log_ingester import HAProxyLogIngester, read_file, read_stdin, read_udp
+
+
+def option(args, name, default):
+    """Pop "--name value" from args"""
+    if name in args:
+        index = args.index(name)
+        value = args[index + 1]
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    follow = '--follow' in args
+    if follow:
+        args.remove('--follow')
+    dead_letter = option(args, '--dead-letter',
+                         os.environ.get('HAPROXY_LOG_DEAD_LETTER', '/app/logs/haproxy_dead_letter.log'))
+    batch_size = int(option(args, '--batch-size', 1000))
+
+    if not args or args[0] not in ('file', 'stdin', 'udp') or (args[0] != 'stdin' and len(args) < 2):
+        print(__doc__)
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        if args[0] == 'file':
+            lines = read_file(args[1], follow=follow)
+        elif args[0] == 'stdin':
+            lines = read_stdin()
+        else:
+            lines = read_udp(args[1])
+
+        ingester = HAProxyLogIngester(dead_letter, batch_size=batch_size)
+        try:
+            ingester.consume(lines)
+        except KeyboardInterrupt:
+            pass
+        print(f"Ingestion finished: {ingester.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Log tablolarının (analytics_logs, access_logs) aylık bölümlerini yönet.
+
+Önümüzdeki LOG_PARTITION_MONTHS_AHEAD ay için bölümleri önceden oluşturur;
+ANALYTICS_LOG_RETENTION_MONTHS / ACCESS_LOG_RETENTION_MONTHS aydan eski
+bölümleri ayırır (LOG_PARTITION_DROP_EXPIRED=true ise siler).
+
+Kullanım:
+  python manage_log_partitions.py            # tek sefer çalıştır
+  python manage_log_partitions.py loop 3600  # saatte bir çalıştır
+"""
+
+import sys
+import time
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+from app import create_app
+from app.utils.log_partitions import log_partitions
+
+
+def report(results):
+    for table, result in results.items():
+        for name in result['created']:
+            print(f"✅ {table}: {name} oluşturuldu")
+        for name in result['expired']:
+            action = 'silindi' if log_partitions.drop else 'ayrıldı'
+            print(f"🗄️  {table}: {name} {action}")
+        if not result['created'] and not result['expired']:
+            print(f"✅ {table}: değişiklik yok")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'once'
+    if command not in ('once', 'loop'):
+        print(__doc__)
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        if command == 'once':
+            report(log_partitions.run())
+            return
+
+        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+        while True:
+            try:
+                report(log_partitions.run())
+            except Exception as e:
+                print(f"❌ Bölüm bakımı başarısız: {str(e)}")
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Analitik özet tablolarını (saatlik/günlük) güncelle.
+
+Kullanım:
+  python refresh_analytics_rollups.py            # tek sefer güncelle
+  python refresh_analytics_rollups.py loop 60    # 60 saniyede bir güncelle
+  python refresh_analytics_rollups.py rebuild    # özetleri sıfırdan oluştur
+"""
+
+import sys
+import time
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+from app import create_app
+from app.services.analytics_rollup_service import AnalyticsRollupService
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'once'
+    if command not in ('once', 'loop', 'rebuild'):
+        print(__doc__)
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        service = AnalyticsRollupService()
+
+        if command == 'rebuild':
+            processed = service.rebuild()
+            print(f"✅ Özetler yeniden oluşturuldu: {processed} log satırı")
+            return
+
+        if command == 'once':
+            # Tek seferlik çalışmada bekleyen yazımları beklemeye gerek yok
+            processed = service.refresh(settle=False)
+            print(f"✅ {processed} log satırı özetlendi")
+            return
+
+        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+        while True:
+            try:
+                processed = service.refresh()
+                print(f"✅ {processed} log satırı özetlendi")
+            except Exception as e:
+                print(f"❌ Özet güncellemesi başarısız: {str(e)}")
+                from app import db
+                db.session.rollback()
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+analytics_logs'un DuckDB raporları için Parquet snapshot'ını güncelle.
+
+Snapshot ANALYTICS_COLUMNAR_DIR altında gün başına bir dosyadır; yalnızca
+yeni satır almış günler (ve soğuk arşive taşınan günler) yeniden yazılır.
+DuckDB'nin kullanılması için ANALYTICS_BACKEND=auto ya da columnar olmalı.
+
+Kullanım:
+  python refresh_columnar_snapshot.py            # tek sefer güncelle
+  python refresh_columnar_snapshot.py loop 600   # 10 dakikada bir güncelle
+  python refresh_columnar_snapshot.py rebuild    # snapshot'ı sıfırdan oluştur
+"""
+
+import sys
+import time
+
+# Flask app context'ini oluştur
+sys.path.append('/app')
+from app import create_app
+from app.services.analytics_columnar import analytics_columnar
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'once'
+    if command not in ('once', 'loop', 'rebuild'):
+        print(__doc__)
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        if command == 'rebuild':
+            days = analytics_columnar.rebuild()
+            print(f"✅ Snapshot yeniden oluşturuldu: {days} gün")
+            return
+
+        if command == 'once':
+            days = analytics_columnar.refresh()
+            print(f"✅ {days} günün snapshot'ı yazıldı")
+            return
+
+        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+        while True:
+            try:
+                days = analytics_columnar.refresh()
+                print(f"✅ {days} günün snapshot'ı yazıldı")
+            except Exception as e:
+                print(f"❌ Snapshot güncellemesi başarısız: {str(e)}")
+                from app import db
+                db.session.rollback()
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    main()